@@ -1,41 +1,145 @@
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, request, jsonify, Response, current_app
 from flask_cors import CORS
 import sqlite3
-from datetime import datetime
-import uuid
+from datetime import datetime, date
+import json
+import time
 import random
 import string
 import os
 from dotenv import load_dotenv
-from werkzeug.security import generate_password_hash, check_password_hash
-from flask_mail import Mail, Message
-
-# --- Load Environment Variables ---
-load_dotenv()
-
-app = Flask(__name__)
-CORS(app)
-
-# --- SECURE: Email Configuration from Environment Variables ---
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
-app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
-app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
-app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_USERNAME')
+import db
+from db import init_app as init_db_pool, get_db
+from events import init_app as init_events, get_hub, get_stream_slots, notify_after_commit, notify_all_after_commit
+from migrations import MIGRATIONS, apply_migrations, schema_version
+from pagination import parse_page_request, page_response
+from hashing import init_app as init_password_hasher, get_hasher, HasherBusy
+from flask_mail import Mail
+from mailer import init_app as init_mail_outbox, get_outbox
+from broadcasts import broadcast, broadcast_stats
+from compact_storage import EMP_NO, new_uuid, uuid_bytes, uuid_text, to_day, day_text, clock_text
+from attendance_rollups import record_session, rebuild_rollups, month_report, department_report
+from leave_calendar import (init_app as init_leave_calendar, get_calendar, invalidate_calendar, parse_range,
+                            team_availability, set_year_holidays, NOT_ABSENT_TYPES)
+from metrics import init_app as init_metrics, get_metrics
+from profile_cache import init_app as init_profile_cache, get_profile_cache, invalidate_after_commit
+from employee_io import (allocate_employee_ids, detect_format, read_records, import_employees, parse_chunk_size,
+                         export_employees, ImportFormatError)
+from retention import init_app as init_retention, get_retention, wants_archive
+from storage import init_app as init_storage, get_repository, separate_storage, DB_ERRORS, PROFILE_FIELDS
+
+# --- Application Factory ---
+# Routes live on the api blueprint; create_app() builds a configured app
+# around it. Importing this module does no I/O, so a preforking server can
+# import it once and every worker builds (or inherits) its own app.
+api = Blueprint('api', __name__)
+
+
+def create_app(config=None):
+    """Build the app from the environment; keys in ``config`` take precedence.
+
+    Unless HRMS_MIGRATE_ON_START is 0, the schema is brought up to date
+    through ensure_schema(), which does the DDL once however many workers
+    start together. No database connection is left open afterwards, so the
+    app can be built in a server's master process before it forks.
+    """
+    app = Flask(__name__)
+    CORS(app)
+    app.config.update(config or {})
+
+    # SECURE: Email configuration from environment variables
+    app.config.setdefault('MAIL_SERVER', 'smtp.gmail.com')
+    app.config.setdefault('MAIL_PORT', 587)
+    app.config.setdefault('MAIL_USE_TLS', True)
+    app.config.setdefault('MAIL_USERNAME', os.getenv('MAIL_USERNAME'))
+    app.config.setdefault('MAIL_PASSWORD', os.getenv('MAIL_PASSWORD'))
+    app.config.setdefault('MAIL_DEFAULT_SENDER', os.getenv('MAIL_USERNAME'))
+    # 'smtp' sends through the server above; 'file' writes .eml files to MAIL_OUTBOX_DIR.
+    app.config.setdefault('MAIL_TRANSPORT', os.getenv('MAIL_TRANSPORT', 'smtp'))
+    app.config.setdefault('MAIL_OUTBOX_DIR', os.getenv('MAIL_OUTBOX_DIR', 'mail_outbox'))
+
+    mail = Mail(app)
+    # Outgoing mail is queued in the mail_outbox table and sent by background workers.
+    init_mail_outbox(app, mail)
+
+    # Database
+    # Connections come from per-process reader/writer pools (see db.py) and are
+    # returned to the pool when the app context tears down.
+    app.config.setdefault('DATABASE', os.getenv('HRMS_DATABASE', 'hrms.db'))
+    init_db_pool(app)
+    # Open /notifications/stream responses per process; gunicorn.conf.py adds
+    # this many threads to each worker.
+    app.config.setdefault('SSE_MAX_STREAMS', int(os.getenv('HRMS_SSE_MAX_STREAMS', '16')))
+    init_events(app)
+
+    # Storage backend
+    # Routes read and write employees, attendance, notifications and leave
+    # through storage.Repository. 'sqlite' (default) runs on the pools above;
+    # 'sqlalchemy' runs the same operations through SQLAlchemy Core on
+    # HRMS_STORAGE_URL (default: the DATABASE file; sqlite:// is an in-memory
+    # database for a single process). A separate SQLite database is migrated
+    # at start like DATABASE. The mail outbox, broadcasts, holidays, the
+    # notification stream, employee import/export and retention still run
+    # on DATABASE through db.get_db().
+    app.config.setdefault('STORAGE_BACKEND', os.getenv('HRMS_STORAGE_BACKEND', 'sqlite'))
+    app.config.setdefault('STORAGE_URL', os.getenv('HRMS_STORAGE_URL'))
+    init_storage(app)
+
+    # Metrics (opt-in)
+    # HRMS_METRICS=1 records per-endpoint latency, SQL counts/time per request and
+    # a slow-query log, served on /metrics. Must run before the first connection.
+    app.config.setdefault('METRICS_ENABLED', os.getenv('HRMS_METRICS', '0') == '1')
+    app.config.setdefault('METRICS_SLOW_QUERY_MS', float(os.getenv('METRICS_SLOW_QUERY_MS', '100')))
+    app.config.setdefault('METRICS_SLOW_REQUEST_MS', float(os.getenv('METRICS_SLOW_REQUEST_MS', '500')))
+    app.config.setdefault('METRICS_PROFILE_SAMPLE_RATE', float(os.getenv('METRICS_PROFILE_SAMPLE_RATE', '0')))
+    init_metrics(app)
+
+    # Password hashing
+    # Hashes run on a bounded process pool (see hashing.py). Changing the method
+    # makes logins transparently upgrade stored hashes to the new cost.
+    app.config.setdefault('PASSWORD_HASH_METHOD', os.getenv('PASSWORD_HASH_METHOD', 'scrypt'))
+    if os.getenv('PASSWORD_HASH_WORKERS'):
+        app.config.setdefault('PASSWORD_HASH_WORKERS', int(os.getenv('PASSWORD_HASH_WORKERS')))
+    init_password_hasher(app)
+
+    # Profile cache
+    # Serialized /profile responses are cached per process and served with an
+    # ETag; every write to an employee row invalidates its entry.
+    app.config.setdefault('PROFILE_CACHE_TTL', int(os.getenv('PROFILE_CACHE_TTL', '60')))
+    init_profile_cache(app)
+    # Company holidays are compiled into per-year working-day tables on first use.
+    # Each process re-checks the holidays table for changes this often.
+    app.config.setdefault('HOLIDAY_RECHECK_SECONDS', float(os.getenv('HRMS_HOLIDAY_RECHECK_SECONDS', '30')))
+    init_leave_calendar(app)
+
+    # Data retention
+    # Read notifications and closed attendance years are moved into archive
+    # tables (see retention.py); the list endpoints include them with
+    # ?archived=1. HRMS_RETENTION_INTERVAL (seconds) runs the job in the
+    # background of one worker process; otherwise run
+    # scripts/run_retention.py from cron.
+    app.config.setdefault('RETENTION_INTERVAL_SECONDS', int(os.getenv('HRMS_RETENTION_INTERVAL', '0')) or None)
+    app.config.setdefault('RETENTION_NOTIFICATION_DAYS', int(os.getenv('RETENTION_NOTIFICATION_DAYS', '90')))
+    app.config.setdefault('RETENTION_ATTENDANCE_YEARS', int(os.getenv('RETENTION_ATTENDANCE_YEARS', '1')))
+    init_retention(app)
+
+    app.register_blueprint(api)
+    app.config.setdefault('MIGRATE_ON_START', os.getenv('HRMS_MIGRATE_ON_START', '1') == '1')
+    if app.config['MIGRATE_ON_START']:
+        try:
+            ensure_schema(app)
+            # Workers forked from a preloaded app inherit the compiled calendar.
+            get_calendar(app)
+        finally:
+            db.close_pools(app)
+    return app
 
-mail = Mail(app)
 
-DATABASE = 'hrms.db'
+def init_db(target_version=None):
+    create_schema(get_db(), target_version)
 
-# --- Database Initialization and Helper Functions ---
-def get_db_connection():
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
 
-def init_db():
-    conn = get_db_connection()
+def create_schema(conn, target_version=None):
     cursor = conn.cursor()
     # Employee Table
     cursor.execute('''
@@ -85,71 +189,88 @@ def init_db():
         )
     ''')
     conn.commit()
-    conn.close()
-
-def create_notification(conn, employee_id, message):
+    # Indexes and later schema changes are versioned in migrations.py
+    apply_migrations(conn, target=target_version)
+
+def ensure_schema(app):
+    """Run init_db() unless the database is already at the latest version.
+
+    The check is one PRAGMA read, so workers starting against a current
+    database skip the DDL entirely. The first one to find it behind takes
+    a lock file next to the database, checks again and migrates while the
+    others wait. Returns True if this call migrated. A separate STORAGE_URL database
+    (see storage.separate_storage) is brought up to date the same way.
+    """
+    latest = MIGRATIONS[-1][0]
+    migrated = False
+    with db.connection(app, readonly=True) as conn:
+        current = schema_version(conn) >= latest
+    if not current:
+        with db.file_lock(app.config['DATABASE'] + '.migrate-lock'):
+            with app.app_context():
+                if schema_version(get_db()) < latest:
+                    init_db()
+                    migrated = True
+    if separate_storage(app):
+        with app.app_context():
+            conn = get_repository().connection
+            if schema_version(conn) < latest:
+                create_schema(conn)
+                migrated = True
+    return migrated
+
+def create_notification(repo, employee_id, message):
     try:
-        cursor = conn.cursor()
-        notification_id = str(uuid.uuid4())
-        cursor.execute(
-            'INSERT INTO notifications (notification_id, employee_id, message) VALUES (?, ?, ?)',
-            (notification_id, employee_id, message)
-        )
-    except sqlite3.Error as e:
-        print(f"Database error creating notification: {e}")
-
-with app.app_context():
-    init_db()
+        repo.add_notification(employee_id, message)
+        notify_after_commit(employee_id)
+    except DB_ERRORS as e:
+        current_app.logger.error("Database error creating notification for %s: %s", employee_id, e)
+
+def rehash_password(employee_id, old_hash, password):
+    # Upgrade a hash made under an older cost policy. Best effort: the login
+    # has already succeeded, and the compare-and-set leaves concurrent
+    # password changes alone.
+    try:
+        new_hash = get_hasher().hash(password)
+        repo = get_repository()
+        if not repo.set_password(employee_id, new_hash, expected=old_hash):
+            repo.rollback()
+            return
+        invalidate_after_commit(employee_id)
+        repo.commit()
+        get_hasher().record_rehash()
+    except (HasherBusy, *DB_ERRORS) as e:
+        current_app.logger.warning("Could not rehash password for %s: %s", employee_id, e)
+
+def public_employee(employee):
+    # Drop the columns that never leave the server.
+    return {key: value for key, value in employee.items() if key not in ('password', 'emp_no', 'profile_version')}
 
 # --- API Endpoints ---
-@app.route('/register', methods=['POST'])
+@api.route('/register', methods=['POST'])
 def register_employee():
     data = request.get_json()
     required_fields = ["first_name", "last_name", "email", "password"]
     if not all(field in data for field in required_fields):
         return jsonify({"message": "Missing required fields"}), 400
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    # Hash before taking the writer so the slow part never holds the write lock.
+    try:
+        hashed_password = get_hasher().hash(data['password'])
+    except HasherBusy:
+        return jsonify({"message": "Server is busy, please try again"}), 503
+    repo = get_repository()
     try:
-        cursor.execute("SELECT email FROM employees WHERE email = ?", (data['email'],))
-        if cursor.fetchone():
+        if repo.employee_by_email(data['email']):
             return jsonify({"message": "Email already exists"}), 409
-        cursor.execute("SELECT MAX(CAST(SUBSTR(id, 5) AS INTEGER)) FROM employees WHERE id LIKE 'SSQ-%'")
-        last_id_num = cursor.fetchone()[0]
-        new_id_num = (last_id_num if last_id_num else 1000) + 1
-        new_id = f"SSQ-{new_id_num}"
-        hashed_password = generate_password_hash(data['password'])
-        cursor.execute('''
-            INSERT INTO employees (id, first_name, last_name, email, password, gender, dob,
-                permanent_address, current_address, pan_number, aadhar_number,
-                contactnumber, alternate_contact_number, alternate_contact_person,
-                alternate_contact_relation, emergency_number, account_number,
-                ifsc_code, account_holder_name, branch, department,
-                reporting_manager1, reporting_manager1_mail,
-                reporting_manager2, reporting_manager2_mail,
-                employee_role, employment_status, join_date
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            new_id, data['first_name'], data['last_name'], data['email'], hashed_password,
-            data.get('gender'), data.get('dob'), data.get('permanent_address'),
-            data.get('current_address'), data.get('pan_number'), data.get('aadhar_number'),
-            data.get('contactnumber'), data.get('alternate_contact_number'),
-            data.get('alternate_contact_person'), data.get('alternate_contact_relation'),
-            data.get('emergency_number'), data.get('account_number'), data.get('ifsc_code'),
-            data.get('account_holder_name'), data.get('branch'), data.get('department'),
-            data.get('reporting_manager1'), data.get('reporting_manager1_mail'),
-            data.get('reporting_manager2'), data.get('reporting_manager2_mail'),
-            data.get('employee_role'), data.get('employment_status'), data.get('join_date')
-        ))
-        conn.commit()
+        new_id = allocate_employee_ids(repo.connection, 1)[0]
+        repo.add_employees([{**data, 'id': new_id, 'password': hashed_password}])
+        repo.commit()
         return jsonify({"message": "Registration successful!", "id": new_id}), 201
-    except sqlite3.Error as e:
-        conn.rollback()
+    except DB_ERRORS as e:
+        repo.rollback()
         return jsonify({"message": f"Database error: {e}"}), 500
-    finally:
-        conn.close()
 
-@app.route('/login', methods=['POST'])
+@api.route('/login', methods=['POST'])
 def login_employee():
     ADMIN_EMAIL = "admin@gmail.com"
     ADMIN_PASSWORD = "123"
@@ -183,16 +304,17 @@ def login_employee():
         if username == ADMIN_EMAIL:
                 return jsonify({"message": "Invalid employee credentials"}), 401
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM employees WHERE email = ?", (username,))
-        employee = cursor.fetchone()
-        conn.close()
+        employee = get_repository(readonly=True).employee_by_email(username)
 
-        if employee and check_password_hash(employee['password'], password):
-            employee_dict = dict(employee)
-            employee_dict.pop('password', None)
-            return jsonify({"message": "Login successful!", "user": employee_dict}), 200
+        hasher = get_hasher()
+        try:
+            valid = employee is not None and hasher.verify(employee['password'], password)
+        except HasherBusy:
+            return jsonify({"message": "Server is busy, please try again"}), 503
+        if valid:
+            if hasher.needs_rehash(employee['password']):
+                rehash_password(employee['id'], employee['password'], password)
+            return jsonify({"message": "Login successful!", "user": public_employee(employee)}), 200
         else:
             return jsonify({"message": "Invalid employee credentials"}), 401
     
@@ -201,170 +323,286 @@ def login_employee():
         return jsonify({"message": "Invalid user type specified"}), 400
 
 
-@app.route('/forgot-password', methods=['POST'])
+@api.route('/forgot-password', methods=['POST'])
 def forgot_password():
     data = request.get_json()
     email = data.get('email')
     if not email:
         return jsonify({"message": "Email is required"}), 400
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM employees WHERE email = ?", (email,))
-    employee = cursor.fetchone()
+    employee = get_repository(readonly=True).employee_by_email(email)
     if employee:
         new_password = ''.join(random.choices(string.ascii_letters + string.digits, k=10))
-        hashed_new_password = generate_password_hash(new_password)
         try:
-            cursor.execute("UPDATE employees SET password = ? WHERE email = ?", (hashed_new_password, email))
-            create_notification(conn, employee['id'], "Your password was reset via email request.")
-            conn.commit()
-            msg = Message('Your HRMS Password has been Reset', recipients=[email])
-            msg.body = f"""Hello {employee['first_name']},
+            hashed_new_password = get_hasher().hash(new_password)
+        except HasherBusy:
+            return jsonify({"message": "Server is busy, please try again"}), 503
+        repo = get_repository()
+        try:
+            repo.set_password(employee['id'], hashed_new_password)
+            invalidate_after_commit(employee['id'])
+            create_notification(repo, employee['id'], "Your password was reset via email request.")
+            body = f"""Hello {employee['first_name']},
             Your password for the HRMS portal has been reset.
             Your new temporary password is: {new_password}
             Please log in with this password and change it immediately from the 'Change Password' section.
             Thank you,
             HRMS System"""
-            mail.send(msg)
+            # Queued in the same transaction as the password change; sent after commit.
+            get_outbox().enqueue(repo.connection, [email], 'Your HRMS Password has been Reset', body)
+            repo.commit()
             return jsonify({"message": "A new password has been sent to your email address."}), 200
-        except Exception as e:
-            conn.rollback()
+        except DB_ERRORS as e:
+            repo.rollback()
             return jsonify({"message": f"Failed to reset password. Error: {e}"}), 500
-        finally:
-            conn.close()
     else:
-        conn.close()
         return jsonify({"message": "If an account with that email exists, a new password has been sent."}), 200
 
-@app.route('/profile/change-password/<string:employee_id>', methods=['PUT'])
+@api.route('/profile/change-password/<string:employee_id>', methods=['PUT'])
 def change_password(employee_id):
     data = request.get_json()
     old_password = data.get('old_password')
     new_password = data.get('new_password')
     if not all([old_password, new_password]):
         return jsonify({"message": "Old and new passwords are required"}), 400
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    employee = get_repository(readonly=True).employee(employee_id)
+    if not employee:
+        return jsonify({"message": "Employee not found"}), 404
     try:
-        cursor.execute("SELECT * FROM employees WHERE id = ?", (employee_id,))
-        employee = cursor.fetchone()
-        if not employee:
-            return jsonify({"message": "Employee not found"}), 404
-        if not check_password_hash(employee['password'], old_password):
+        if not get_hasher().verify(employee['password'], old_password):
             return jsonify({"message": "Incorrect old password"}), 400
-        hashed_new_password = generate_password_hash(new_password)
-        cursor.execute("UPDATE employees SET password = ? WHERE id = ?", (hashed_new_password, employee_id))
-        create_notification(conn, employee_id, "Your password was changed successfully.")
-        conn.commit()
+        hashed_new_password = get_hasher().hash(new_password)
+    except HasherBusy:
+        return jsonify({"message": "Server is busy, please try again"}), 503
+    repo = get_repository()
+    try:
+        # Only replace the hash that was verified above.
+        if not repo.set_password(employee_id, hashed_new_password, expected=employee['password']):
+            return jsonify({"message": "Password was changed by another request, please retry"}), 409
+        invalidate_after_commit(employee_id)
+        create_notification(repo, employee_id, "Your password was changed successfully.")
+        repo.commit()
         return jsonify({"message": "Password updated successfully!"}), 200
-    except sqlite3.Error as e:
-        conn.rollback()
+    except DB_ERRORS as e:
+        repo.rollback()
         return jsonify({"message": f"Database error: {e}"}), 500
-    finally:
-        conn.close()
 
-@app.route('/profile/reset-password-internal/<string:employee_id>', methods=['PUT'])
+@api.route('/profile/reset-password-internal/<string:employee_id>', methods=['PUT'])
 def reset_password_internal(employee_id):
     data = request.get_json()
     new_password = data.get('new_password')
     if not new_password:
         return jsonify({"message": "New password is required"}), 400
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM employees WHERE id = ?", (employee_id,))
-        employee = cursor.fetchone()
-        if not employee:
+        hashed_new_password = get_hasher().hash(new_password)
+    except HasherBusy:
+        return jsonify({"message": "Server is busy, please try again"}), 503
+    repo = get_repository()
+    try:
+        if not repo.set_password(employee_id, hashed_new_password):
             return jsonify({"message": "Employee not found"}), 404
-        hashed_new_password = generate_password_hash(new_password)
-        cursor.execute("UPDATE employees SET password = ? WHERE id = ?", (hashed_new_password, employee_id))
-        create_notification(conn, employee_id, "Your password was reset from within your session.")
-        conn.commit()
+        invalidate_after_commit(employee_id)
+        create_notification(repo, employee_id, "Your password was reset from within your session.")
+        repo.commit()
         return jsonify({"message": "Password reset successfully!"}), 200
-    except sqlite3.Error as e:
-        conn.rollback()
+    except DB_ERRORS as e:
+        repo.rollback()
         return jsonify({"message": f"Database error: {e}"}), 500
-    finally:
-        conn.close()
 
-@app.route('/profile/<string:employee_id>', methods=['GET'])
+@api.route('/profile/<string:employee_id>', methods=['GET'])
 def get_employee_profile(employee_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM employees WHERE id = ?", (employee_id,))
-    employee = cursor.fetchone()
-    conn.close()
-    if employee:
-        employee_dict = dict(employee)
-        employee_dict.pop('password', None)
-        return jsonify(employee_dict), 200
-    else:
+    cache = get_profile_cache()
+    repo = get_repository(readonly=True)
+    # One key lookup tells whether a cached copy is current, even when
+    # another worker process made the last change.
+    version = repo.profile_version(employee_id)
+    if version is None:
         return jsonify({"message": "Employee not found"}), 404
+    entry, generation = cache.get(employee_id, version)
+    if entry is None:
+        employee = repo.employee(employee_id)
+        if not employee:
+            return jsonify({"message": "Employee not found"}), 404
+        version = employee['profile_version']
+        entry = cache.put(employee_id, current_app.json.dumps(public_employee(employee)).encode(), version,
+                          generation)
+    # no-cache makes the browser revalidate every time, which costs a 304 at most.
+    if request.if_none_match.contains(entry.etag):
+        cache.count_not_modified()
+        response = Response(status=304)
+    else:
+        response = Response(entry.body, mimetype='application/json')
+    response.set_etag(entry.etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
-@app.route('/profile/<string:employee_id>', methods=['PUT'])
+@api.route('/profile/<string:employee_id>', methods=['PUT'])
 def update_employee_profile(employee_id):
     data = request.get_json()
-    conn = get_db_connection()
+    # Only known profile columns are written; id, email and password never are.
+    changes = {key: value for key, value in data.items() if key in PROFILE_FIELDS}
+    if not changes:
+        return jsonify({"message": "No valid fields to update"}), 400
+    repo = get_repository()
     try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT id FROM employees WHERE id = ?", (employee_id,))
-        if not cursor.fetchone():
+        # The updated row comes back from the UPDATE itself, so there is no re-select.
+        updated_employee = repo.update_profile(employee_id, changes)
+        if not updated_employee:
             return jsonify({"message": "Employee not found"}), 404
-        set_clauses = []
-        update_values = []
-        for key, value in data.items():
-            if key not in ['id', 'email', 'password']:
-                set_clauses.append(f"{key} = ?")
-                update_values.append(value)
-        if not set_clauses:
-            return jsonify({"message": "No valid fields to update"}), 400
-        update_query = f"UPDATE employees SET {', '.join(set_clauses)} WHERE id = ?"
-        update_values.append(employee_id)
-        cursor.execute(update_query, tuple(update_values))
-        create_notification(conn, employee_id, "Your profile details have been updated.")
-        conn.commit()
-        cursor.execute("SELECT * FROM employees WHERE id = ?", (employee_id,))
-        updated_employee = cursor.fetchone()
-        updated_employee_dict = dict(updated_employee)
-        updated_employee_dict.pop('password', None)
-        return jsonify({"message": "Profile updated successfully!", "user": updated_employee_dict}), 200
-    except sqlite3.Error as e:
-        conn.rollback()
+        invalidate_after_commit(employee_id)
+        create_notification(repo, employee_id, "Your profile details have been updated.")
+        repo.commit()
+        return jsonify({"message": "Profile updated successfully!", "user": public_employee(updated_employee)}), 200
+    except DB_ERRORS as e:
+        repo.rollback()
         return jsonify({"message": f"Database error: {e}"}), 500
-    finally:
-        conn.close()
         
-@app.route('/notifications/<string:employee_id>', methods=['GET'])
-def get_notifications(employee_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT message, is_read FROM notifications WHERE employee_id = ? ORDER BY timestamp DESC",
-        (employee_id,)
+# Notification reads and clock-in/out are also served on asyncio by
+# async_api.py, which runs the same statements through these helpers.
+def needs_watermark(page):
+    """True when a history page also reports the latest change (Repository.latest_change)."""
+    return page is not None and not page.incremental and not page.after
+
+
+def notification_list_body(rows, page, latest=None):
+    """The GET /notifications response from the notification_list statements' rows."""
+    if page is None:
+        return [{'message': row['message'], 'is_read': row['is_read']} for row in rows]
+    notifications = []
+    for row in rows:
+        notification = dict(row)
+        notification['notification_id'] = uuid_text(notification.pop('uuid'))
+        notifications.append(notification)
+    return page_response(
+        notifications, page,
+        sort_key=lambda n: (n['created_s'], n['seq']),
+        change_key=lambda n: (n['updated_ms'], n['seq']),
+        latest_change=tuple(latest) if latest else None,
+        hidden=('created_s', 'seq', 'updated_ms')
     )
-    notifications = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return jsonify(notifications), 200
 
-@app.route('/notifications/mark-read/<string:employee_id>', methods=['PUT'])
+@api.route('/notifications/<string:employee_id>', methods=['GET'])
+def get_notifications(employee_id):
+    try:
+        page = parse_page_request(request.args, sort_size=2)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    repo = get_repository(readonly=True)
+    rows = repo.history('notification_list', employee_id, page, wants_archive(request.args))
+    latest = repo.latest_change('notification_list', employee_id) if needs_watermark(page) else None
+    return jsonify(notification_list_body(rows, page, latest)), 200
+
+@api.route('/notifications/mark-read/<string:employee_id>', methods=['PUT'])
 def mark_notifications_as_read(employee_id):
-    conn = get_db_connection()
+    repo = get_repository()
     try:
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE notifications SET is_read = 1 WHERE employee_id = ? AND is_read = 0",
-            (employee_id,)
-        )
+        count = repo.mark_all_read(employee_id)
+        repo.commit()
+        return jsonify({"message": f"{count} notifications marked as read."}), 200
+    except DB_ERRORS as e:
+        repo.rollback()
+        return jsonify({"message": f"Database error: {e}"}), 500
+
+@api.route('/notifications/unread-count/<string:employee_id>', methods=['GET'])
+def get_unread_notification_count(employee_id):
+    return jsonify({"unread": get_repository(readonly=True).unread_count(employee_id)}), 200
+
+@api.route('/notifications/stream/<string:employee_id>', methods=['GET'])
+def stream_notifications(employee_id):
+    # Server-Sent Events: each new notification row is pushed as an event whose
+    # id is the row's integer key, so a reconnecting EventSource resumes via Last-Event-ID.
+    flask_app = current_app._get_current_object()
+    hub = get_hub()
+    heartbeat = flask_app.config['SSE_HEARTBEAT_SECONDS']
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    # A stream occupies a server thread until the client goes away; past the
+    # per-process limit the client is told to come back rather than starving
+    # ordinary requests of threads.
+    slots = get_stream_slots()
+    if not slots.acquire(blocking=False):
+        response = jsonify({"message": "Too many open notification streams, please try again later"})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+
+    def generate():
+        nonlocal last_event_id
+        wakeup = hub.subscribe(employee_id)
+        try:
+            if last_event_id is None:
+                with db.connection(flask_app, readonly=True) as conn:
+                    latest = conn.execute(
+                        f"SELECT id FROM notifications WHERE emp_no = {EMP_NO} ORDER BY id DESC LIMIT 1",
+                        (employee_id,)
+                    ).fetchone()
+                    last_event_id = latest[0] if latest else 0
+            yield "retry: 5000\n\n"
+            while True:
+                # Borrow a reader only for the query, never for the life of the stream.
+                with db.connection(flask_app, readonly=True) as conn:
+                    rows = conn.execute(
+                        f'''SELECT seq, notification_id, message, is_read, timestamp FROM notification_feed
+                            WHERE emp_no = {EMP_NO} AND seq > ? ORDER BY seq''',
+                        (employee_id, last_event_id)
+                    ).fetchall()
+                for row in rows:
+                    last_event_id = row['seq']
+                    payload = {key: row[key] for key in ('notification_id', 'message', 'is_read', 'timestamp')}
+                    yield f"id: {last_event_id}\nevent: notification\ndata: {json.dumps(payload)}\n\n"
+                # Also wake on the heartbeat so rows written by other worker
+                # processes are picked up without an in-process signal.
+                if not wakeup.wait(heartbeat):
+                    yield ": keep-alive\n\n"
+                wakeup.clear()
+        finally:
+            hub.unsubscribe(employee_id, wakeup)
+
+    response = Response(generate(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Runs when the server closes the response, even if the body was never read.
+    response.call_on_close(slots.release)
+    return response
+
+# --- Admin: Broadcast Notifications ---
+@api.route('/admin/notifications/broadcast', methods=['POST'])
+def broadcast_notification():
+    # The message is stored once in broadcasts; recipients matching every given
+    # department/employee_role/employment_status filter get a row pointing at it.
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"message": "Request body must be a JSON object"}), 400
+    message = data.get('message')
+    if message is not None and not isinstance(message, str):
+        return jsonify({"message": "message must be a string"}), 400
+    message = (message or '').strip()
+    if not message:
+        return jsonify({"message": "Message is required"}), 400
+    audience = data.get('audience') or {}
+    if not isinstance(audience, dict):
+        return jsonify({"message": "audience must be an object"}), 400
+    conn = get_db()
+    try:
+        started = time.perf_counter()
+        broadcast_id, recipients = broadcast(conn, message, audience)
         conn.commit()
-        return jsonify({"message": f"{cursor.rowcount} notifications marked as read."}), 200
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+    except ValueError as e:
+        conn.rollback()
+        return jsonify({"message": str(e)}), 400
     except sqlite3.Error as e:
         conn.rollback()
         return jsonify({"message": f"Database error: {e}"}), 500
-    finally:
-        conn.close()
+    notify_all_after_commit()
+    return jsonify({"message": f"Notification sent to {recipients} employees.", "broadcast_id": broadcast_id,
+                    "recipients": recipients, "elapsed_ms": elapsed_ms}), 201
+
+@api.route('/admin/notifications/broadcast/<int:broadcast_id>', methods=['GET'])
+def get_broadcast(broadcast_id):
+    stats = broadcast_stats(get_db(readonly=True), broadcast_id)
+    if stats is None:
+        return jsonify({"message": "Broadcast not found"}), 404
+    return jsonify(stats), 200
 
 # --- NEW: Leave Application Endpoints ---
-@app.route('/leave-application', methods=['POST'])
+@api.route('/leave-application', methods=['POST'])
 def submit_leave_application():
     data = request.get_json()
     employee_id = data.get('employee_id')
@@ -375,91 +613,355 @@ def submit_leave_application():
 
     if not all([employee_id, leave_type, from_date]):
         return jsonify({"message": "Missing required fields for leave application"}), 400
+    try:
+        start, end = parse_range(from_date, to_date)
+    except ValueError as e:
+        return jsonify({"message": f"Invalid leave dates: {e}"}), 400
+    leave_days = get_calendar().chargeable_days(leave_type, start, end)
+    if leave_type not in NOT_ABSENT_TYPES and leave_days == 0:
+        return jsonify({"message": "The selected dates fall entirely on weekends or holidays"}), 400
+
+    repo = get_repository()
+    try:
+        # Write-locked up front so a concurrent request cannot slip an overlapping leave in after the check.
+        repo.begin_write()
+        if leave_type != 'Comp-off':
+            conflicts = repo.overlapping_leaves(employee_id, start, end)
+            if conflicts:
+                repo.rollback()
+                return jsonify({"message": "These dates overlap an existing application", "conflicts": conflicts}), 409
+        if not repo.submit_leave(employee_id, leave_type, start, end, description, leave_days):
+            repo.rollback()
+            return jsonify({"message": "Employee not found"}), 404
+        create_notification(repo, employee_id, f"Your request for {leave_type} has been submitted.")
+        repo.commit()
+        return jsonify({"message": f"{leave_type} application submitted successfully!", "leave_days": leave_days}), 201
+    except DB_ERRORS as e:
+        repo.rollback()
+        return jsonify({"message": f"Database error: {e}"}), 500
 
-    conn = get_db_connection()
+@api.route('/leave-applications/<string:employee_id>', methods=['GET'])
+def get_leave_applications(employee_id):
     try:
-        cursor = conn.cursor()
-        record_id = str(uuid.uuid4())
-        cursor.execute(
-            '''INSERT INTO leave_applications (record_id, employee_id, leave_type, from_date, to_date, description)
-               VALUES (?, ?, ?, ?, ?, ?)''',
-            (record_id, employee_id, leave_type, from_date, to_date, description)
-        )
-        create_notification(conn, employee_id, f"Your request for {leave_type} has been submitted.")
+        page = parse_page_request(request.args, sort_size=2)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    repo = get_repository(readonly=True)
+    applications = repo.history('leave_list', employee_id, page)
+    for application in applications:
+        application['record_id'] = uuid_text(application.pop('uuid'))
+    if page is None:
+        return jsonify(applications), 200
+    return jsonify(page_response(
+        applications, page,
+        sort_key=lambda a: (a['submitted_s'], a['id']),
+        change_key=lambda a: (a['updated_ms'], a['id']),
+        latest_change=repo.latest_change('leave_list', employee_id) if needs_watermark(page) else None,
+        hidden=('submitted_s', 'id', 'updated_ms')
+    )), 200
+
+# --- Holiday Calendar and Team Availability ---
+@api.route('/holidays/<int:year>', methods=['GET'])
+def get_holidays(year):
+    if not 1 <= year <= 9999:
+        return jsonify({"message": "Invalid year"}), 400
+    return jsonify(get_calendar().holidays_between(date(year, 1, 1), date(year, 12, 31))), 200
+
+@api.route('/admin/holidays/<int:year>', methods=['PUT'])
+def set_holidays(year):
+    # Body: {"holidays": [{"date": "YYYY-MM-DD", "name": ..., "optional": false}, ...]}
+    # replaces that year's list; leave already filed in the year is re-charged.
+    if not 1 <= year <= 9999:
+        return jsonify({"message": "Invalid year"}), 400
+    data = request.get_json()
+    entries = data.get('holidays') if isinstance(data, dict) else None
+    if not isinstance(entries, list):
+        return jsonify({"message": "holidays must be a list"}), 400
+    holidays = []
+    for entry in entries:
+        try:
+            day = date.fromisoformat(entry['date'])
+            name = str(entry['name']).strip()
+        except (KeyError, TypeError, ValueError):
+            return jsonify({"message": f"Invalid holiday entry: {entry!r}"}), 400
+        if day.year != year or not name:
+            return jsonify({"message": f"Each holiday needs a name and a date in {year}: {entry!r}"}), 400
+        holidays.append((day, name, bool(entry.get('optional'))))
+    if len({day for day, _, _ in holidays}) != len(holidays):
+        return jsonify({"message": "Duplicate holiday dates"}), 400
+    conn = get_db()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        recharged = set_year_holidays(conn, year, holidays)
         conn.commit()
-        return jsonify({"message": f"{leave_type} application submitted successfully!"}), 201
     except sqlite3.Error as e:
         conn.rollback()
         return jsonify({"message": f"Database error: {e}"}), 500
-    finally:
-        conn.close()
+    invalidate_calendar()
+    return jsonify({"year": year, "holidays": len(holidays), "recharged_applications": recharged}), 200
 
-@app.route('/leave-applications/<string:employee_id>', methods=['GET'])
-def get_leave_applications(employee_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT * FROM leave_applications WHERE employee_id = ? ORDER BY submitted_at DESC",
-        (employee_id,)
-    )
-    applications = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return jsonify(applications), 200
+@api.route('/leave-calendar/working-days', methods=['GET'])
+def get_working_days():
+    # Preview for the leave forms: chargeable days, holidays in range and,
+    # given an employee_id, any applications the range would overlap.
+    try:
+        start, end = parse_range(request.args.get('from_date', ''), request.args.get('to_date'))
+    except ValueError as e:
+        return jsonify({"message": f"Invalid dates: {e}"}), 400
+    calendar = get_calendar()
+    result = {
+        "from_date": start.isoformat(),
+        "to_date": end.isoformat(),
+        "working_days": calendar.working_days(start, end),
+        "holidays": calendar.holidays_between(start, end),
+    }
+    employee_id = request.args.get('employee_id')
+    if employee_id:
+        result["overlaps"] = get_repository(readonly=True).overlapping_leaves(employee_id, start, end)
+    return jsonify(result), 200
+
+@api.route('/team-availability', methods=['GET'])
+def get_team_availability():
+    # ?department=... or ?employee_id=... (that employee's department); date defaults to today.
+    repo = get_repository(readonly=True)
+    department = request.args.get('department')
+    if not department and request.args.get('employee_id'):
+        employee = repo.employee(request.args['employee_id'])
+        if not employee:
+            return jsonify({"message": "Employee not found"}), 404
+        department = employee['department']
+    if not department:
+        return jsonify({"message": "department or employee_id is required"}), 400
+    try:
+        day, _ = parse_range(request.args.get('date') or datetime.now().strftime('%Y-%m-%d'))
+    except ValueError as e:
+        return jsonify({"message": f"Invalid date: {e}"}), 400
+    availability = team_availability(department, day, repo.team_on_leave(department, day), repo.team_size(department))
+    availability["working_day"] = get_calendar().is_working_day(day)
+    return jsonify(availability), 200
 
 # --- Attendance Endpoints ---
-@app.route('/attendance/login', methods=['POST'])
-def attendance_login():
-    data = request.get_json()
+# Shared with the asyncio path in async_api.py, like the notification helpers.
+LOGOUT_NOT_FOUND = "Attendance record not found or already logged out"
+
+
+def seconds_now():
+    now = datetime.now()
+    return now.hour * 3600 + now.minute * 60 + now.second
+
+
+def parse_attendance_login(data):
+    """(employee_id, day, date, work_location, employee_name) from a clock-in body.
+
+    Raises ValueError with the message to return as a 400.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Request body must be a JSON object")
     employee_id, date_str, work_location, employee_name = data.get('employee_id'), data.get('date'), data.get('work_location'), data.get('employee_name')
     if not all([employee_id, date_str, work_location, employee_name]):
-        return jsonify({"message": "Missing required attendance login fields"}), 400
-    conn = get_db_connection()
+        raise ValueError("Missing required attendance login fields")
     try:
-        cursor = conn.cursor()
-        record_id = str(uuid.uuid4())
-        login_time = datetime.now().strftime('%H:%M:%S')
-        cursor.execute('INSERT INTO attendance_records (record_id, employee_id, date, login_time, work_location) VALUES (?, ?, ?, ?, ?)',
-                       (record_id, employee_id, date_str, login_time, work_location))
-        conn.commit()
-        return jsonify({"message": "Login recorded successfully!", "record": {"record_id": record_id, "employee_id": employee_id, "date": date_str, "login_time": login_time, "employee_name": employee_name, "work_location": work_location, "logout_time": None}}), 201
-    except sqlite3.Error as e:
-        conn.rollback()
+        day = to_day(date_str)
+    except (TypeError, ValueError):
+        raise ValueError("date must be YYYY-MM-DD")
+    return employee_id, day, date_str, work_location, employee_name
+
+
+def attendance_login_body(record_uuid, login_s, employee_id, date_str, work_location, employee_name):
+    return {"message": "Login recorded successfully!", "record": {"record_id": str(record_uuid), "employee_id": employee_id, "date": date_str, "login_time": clock_text(login_s), "employee_name": employee_name, "work_location": work_location, "logout_time": None}}
+
+@api.route('/attendance/login', methods=['POST'])
+def attendance_login():
+    try:
+        employee_id, day, date_str, work_location, employee_name = parse_attendance_login(
+            request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    repo = get_repository()
+    try:
+        record_uuid = new_uuid()
+        login_s = seconds_now()
+        if not repo.clock_in(record_uuid, employee_id, day, login_s, work_location):
+            repo.rollback()
+            return jsonify({"message": "Employee not found"}), 404
+        repo.commit()
+        return jsonify(attendance_login_body(record_uuid, login_s, employee_id, date_str, work_location,
+                                             employee_name)), 201
+    except DB_ERRORS as e:
+        repo.rollback()
         return jsonify({"message": f"Database error recording login: {e}"}), 500
-    finally:
-        conn.close()
 
-@app.route('/attendance/logout/<string:record_id>', methods=['PUT'])
+@api.route('/attendance/logout/<string:record_id>', methods=['PUT'])
 def attendance_logout(record_id):
-    conn = get_db_connection()
+    record_uuid = uuid_bytes(record_id)
+    if record_uuid is None:
+        return jsonify({"message": LOGOUT_NOT_FOUND}), 404
+    repo = get_repository()
     try:
-        cursor = conn.cursor()
-        logout_time = datetime.now().strftime('%H:%M:%S')
-        cursor.execute("UPDATE attendance_records SET logout_time = ? WHERE record_id = ? AND logout_time IS NULL", (logout_time, record_id))
-        if cursor.rowcount == 0:
-            return jsonify({"message": "Attendance record not found or already logged out"}), 404
-        conn.commit()
+        logout_s = seconds_now()
+        logout_time = clock_text(logout_s)
+        record = repo.clock_out(record_uuid, logout_s)
+        if record is None:
+            return jsonify({"message": LOGOUT_NOT_FOUND}), 404
+        # Keep the reporting rollups current in the same transaction.
+        record_session(repo.connection, record['employee_id'], day_text(record['day']), clock_text(record['login_s']),
+                       logout_time, record['work_location'])
+        repo.commit()
         return jsonify({"message": "Logout recorded successfully!", "logout_time": logout_time}), 200
-    except sqlite3.Error as e:
-        conn.rollback()
+    except DB_ERRORS as e:
+        repo.rollback()
         return jsonify({"message": f"Database error recording logout: {e}"}), 500
-    finally:
-        conn.close()
 
-@app.route('/attendance/<string:employee_id>', methods=['GET'])
+@api.route('/attendance/<string:employee_id>', methods=['GET'])
 def get_employee_attendance(employee_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''SELECT ar.record_id, ar.date, ar.login_time, ar.work_location, ar.logout_time, e.first_name, e.last_name
-                      FROM attendance_records ar JOIN employees e ON ar.employee_id = e.id
-                      WHERE ar.employee_id = ? ORDER BY ar.date DESC, ar.login_time DESC''', (employee_id,))
-    records = cursor.fetchall()
-    conn.close()
-    attendance_list = []
-    for record in records:
-        record_dict = dict(record)
-        record_dict['employee_name'] = f"{record_dict.pop('first_name')} {record_dict.pop('last_name')}"
-        attendance_list.append(record_dict)
-    return jsonify(attendance_list), 200
+    try:
+        page = parse_page_request(request.args, sort_size=3)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    repo = get_repository(readonly=True)
+    # The cursor columns come with every row and are dropped from the items.
+    hidden = ('day', 'login_s', 'seq', 'updated_ms')
+    attendance_list = repo.history('attendance_list', employee_id, page, wants_archive(request.args))
+    for record in attendance_list:
+        record['record_id'] = uuid_text(record.pop('uuid'))
+        record['employee_name'] = f"{record.pop('first_name')} {record.pop('last_name')}"
+    if page is None:
+        for record in attendance_list:
+            for key in hidden:
+                del record[key]
+        return jsonify(attendance_list), 200
+    return jsonify(page_response(
+        attendance_list, page,
+        sort_key=lambda r: (r['day'], r['login_s'], r['seq']),
+        change_key=lambda r: (r['updated_ms'], r['seq']),
+        latest_change=repo.latest_change('attendance_list', employee_id) if needs_watermark(page) else None,
+        hidden=hidden
+    )), 200
+
+# --- Admin: Attendance Reports ---
+# Served from the attendance_daily/attendance_monthly rollups, so a month
+# report reads one row per department however many records it covers.
+@api.route('/admin/reports/attendance/<string:month>', methods=['GET'])
+def get_attendance_month_report(month):
+    if not _valid_month(month):
+        return jsonify({"message": "Month must be in YYYY-MM format"}), 400
+    return jsonify(month_report(month, get_repository(readonly=True).month_totals(month))), 200
+
+@api.route('/admin/reports/attendance/<string:month>/<string:department>', methods=['GET'])
+def get_attendance_department_report(month, department):
+    if not _valid_month(month):
+        return jsonify({"message": "Month must be in YYYY-MM format"}), 400
+    report = department_report(month, department,
+                               get_repository(readonly=True).department_totals(month, department))
+    if report is None:
+        return jsonify({"message": "No attendance recorded for this department and month"}), 404
+    return jsonify(report), 200
+
+@api.route('/admin/reports/attendance/rebuild', methods=['POST'])
+def rebuild_attendance_rollups():
+    conn = get_db()
+    try:
+        rebuild_rollups(conn, source='attendance_history')
+        conn.commit()
+        return jsonify({"message": "Attendance rollups rebuilt."}), 200
+    except sqlite3.Error as e:
+        conn.rollback()
+        return jsonify({"message": f"Database error: {e}"}), 500
+
+def _valid_month(month):
+    try:
+        datetime.strptime(month, '%Y-%m')
+        return len(month) == 7
+    except ValueError:
+        return False
+
+# --- Admin: Bulk Employee Import/Export ---
+@api.route('/admin/employees/import', methods=['POST'])
+def import_employee_records():
+    # Body is CSV or NDJSON, either raw or as a multipart "file" field. Rows
+    # are validated as they are read and written in chunked transactions.
+    try:
+        chunk_size = parse_chunk_size(request.args.get('chunk_size'))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    upload = request.files.get('file')
+    try:
+        fmt = detect_format(request.args.get('format'),
+                            upload.mimetype if upload else request.content_type)
+        records = read_records(upload.stream if upload else request.stream, fmt)
+        report = import_employees(current_app._get_current_object(), records,
+                                  get_hasher(), get_outbox(),
+                                  chunk_size=chunk_size)
+    except (ImportFormatError, UnicodeDecodeError) as e:
+        return jsonify({"message": f"Could not read upload: {e}"}), 400
+    if not report['imported'] and not report['failed']:
+        return jsonify({"message": "No rows found in upload"}), 400
+    return jsonify(report), 201 if report['imported'] else 400
+
+@api.route('/admin/employees/export', methods=['GET'])
+def export_employee_records():
+    try:
+        fmt = detect_format(request.args.get('format', 'csv'), None)
+    except ImportFormatError as e:
+        return jsonify({"message": str(e)}), 400
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(export_employees(current_app._get_current_object(), fmt), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename=employees.{fmt}'})
+
+# --- Metrics ---
+@api.route('/metrics', methods=['GET'])
+def get_prometheus_metrics():
+    metrics = get_metrics()
+    if metrics is None:
+        return jsonify({"message": "Metrics are disabled; set HRMS_METRICS=1"}), 404
+    hashing = get_hasher().stats()
+    outbox = get_outbox().stats()
+    cache = get_profile_cache().stats()
+    gauges = [
+        ('hrms_password_hash_queue_depth', 'Hash jobs queued or running.', [({}, hashing['queue_depth'])]),
+        ('hrms_password_hash_rejected', 'Hash jobs rejected because the queue was full.', [({}, hashing['rejected'])]),
+        ('hrms_mail_outbox_messages', 'Outbox rows by status.',
+         [({'status': status}, count) for status, count in sorted(outbox['queued'].items())]),
+        ('hrms_profile_cache_hit_ratio', 'Profile cache hits / lookups.', [({}, cache['hit_ratio'])]),
+        ('hrms_profile_cache_entries', 'Profiles currently cached.', [({}, cache['size'])]),
+        ('hrms_sse_subscribers', 'Open notification streams.', [({}, get_hub().subscriber_count())]),
+    ]
+    return Response(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+
+@api.route('/admin/metrics/slow', methods=['GET'])
+def get_slow_requests():
+    # Recent slow statements and cProfile output of sampled slow requests.
+    metrics = get_metrics()
+    if metrics is None:
+        return jsonify({"message": "Metrics are disabled; set HRMS_METRICS=1"}), 404
+    return jsonify(metrics.slow_report()), 200
+
+# --- Admin: Data Retention ---
+@api.route('/admin/retention', methods=['GET'])
+def get_retention_stats():
+    return jsonify(get_retention().stats()), 200
+
+@api.route('/admin/retention/run', methods=['POST'])
+def run_retention():
+    # Runs in this request; the job commits in chunks, so it can be repeated safely.
+    try:
+        report = get_retention().run_exclusive()
+    except sqlite3.Error as e:
+        return jsonify({"message": f"Database error: {e}"}), 500
+    if report is None:
+        return jsonify({"message": "A retention run is already in progress."}), 409
+    return jsonify({"message": "Retention run complete.", **report}), 200
+
+# --- Admin: Runtime Stats ---
+@api.route('/admin/stats', methods=['GET'])
+def get_runtime_stats():
+    return jsonify({
+        "password_hashing": get_hasher().stats(),
+        "mail_outbox": get_outbox().stats(),
+        "profile_cache": get_profile_cache().stats(),
+    }), 200
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    # Development server only; see wsgi.py and gunicorn.conf.py for production.
+    load_dotenv()
+    create_app().run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,17 @@
+"""ASGI entry point: ``uvicorn asgi:app``.
+
+Clock-in/out and notification reads run on asyncio (async_api.py); every
+other route is the regular Flask app on a thread pool. Each uvicorn worker
+process builds its own app, and ensure_schema() keeps the migrations to
+one of them.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8000 --workers 4
+"""
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app import create_app  # noqa: E402
+from async_api import AsyncApi  # noqa: E402
+
+app = AsyncApi(create_app())
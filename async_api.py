@@ -0,0 +1,269 @@
+import asyncio
+import json
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import parse_qsl
+
+import aiosqlite
+from asgiref.wsgi import WsgiToAsgi
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import Map, Rule
+
+import db
+from app import (LOGOUT_NOT_FOUND, api, attendance_login_body, needs_watermark, notification_list_body,
+                 parse_attendance_login, seconds_now)
+from attendance_rollups import record_session_async
+from compact_storage import clock_text, day_text, new_uuid, uuid_bytes
+from metrics import get_metrics
+from pagination import parse_page_request
+from retention import wants_archive
+from storage import SQLITE_STATEMENTS, list_statement
+
+
+class AsyncConnectionPool:
+    """db.ConnectionPool for asyncio, on aiosqlite connections.
+
+    Each connection runs its statements on its own thread, so a query
+    never blocks the event loop. Opened lazily up to ``size``; ``acquire``
+    waits up to ``timeout`` seconds for one to come back. Waiters are
+    served first come, first served (asyncio.Semaphore does not let a new
+    caller jump the queue), which keeps tail latency flat when hundreds of
+    requests wait on a pool of a few connections.
+    """
+
+    def __init__(self, database, size=4, readonly=False, pragmas=None, timeout=10.0):
+        self.database = database
+        self.size = size
+        self.readonly = readonly
+        self.pragmas = dict(db.DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(size)
+        self._idle = []
+
+    async def _connect(self):
+        conn = await aiosqlite.connect(self.database, timeout=self.timeout)
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            await conn.execute(f"PRAGMA {name} = {value}")
+        if self.readonly:
+            await conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    async def acquire(self):
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            raise sqlite3.OperationalError("Timed out waiting for a database connection")
+        if self._idle:
+            return self._idle.pop()
+        try:
+            return await self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+
+    async def release(self, conn):
+        try:
+            if conn.in_transaction:
+                await conn.rollback()
+            self._idle.append(conn)
+        except (sqlite3.Error, ValueError):
+            # A broken connection is dropped; the slot reopens one later.
+            await conn.close()
+        finally:
+            self._slots.release()
+
+    @asynccontextmanager
+    async def connection(self):
+        conn = await self.acquire()
+        try:
+            yield conn
+        finally:
+            await self.release(conn)
+
+    async def close_all(self):
+        while self._idle:
+            await self._idle.pop().close()
+
+
+class Request:
+    def __init__(self, scope, body):
+        self.args = MultiDict(parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True))
+        self.body = body
+
+    def get_json(self):
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            return None
+
+
+# --- ASGI App ---
+class AsyncApi:
+    """ASGI app serving clock-in/out and notification reads on asyncio.
+
+    These are the busiest requests and are almost all waiting on SQLite,
+    so here they are coroutines on aiosqlite pools instead of each holding
+    a server thread. Every other path, and any method these routes do not
+    take (e.g. CORS preflight), goes to the Flask app through asgiref's
+    WSGI adapter, which runs it on a thread pool. Both paths use the same
+    statements (storage.SQLITE_STATEMENTS, including its history lists) and
+    response helpers, and share one database; this path is SQLite-only,
+    whatever STORAGE_BACKEND the Flask side uses. Requests served here
+    skip Flask's hooks but are timed into the same request-latency series
+    in /metrics, under the Flask view's endpoint name; their SQL is not
+    timed per statement.
+
+        uvicorn asgi:app --workers 4
+    """
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.fallback = WsgiToAsgi(flask_app)
+        self.urls = Map([
+            Rule('/attendance/login', methods=['POST'], endpoint=self.attendance_login),
+            Rule('/attendance/logout/<string:record_id>', methods=['PUT'], endpoint=self.attendance_logout),
+            Rule('/notifications/<string:employee_id>', methods=['GET'], endpoint=self.get_notifications),
+            Rule('/notifications/unread-count/<string:employee_id>', methods=['GET'],
+                 endpoint=self.get_unread_notification_count),
+        ]).bind('localhost')
+        self.readers = self.writers = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            return await self.fallback(scope, receive, send)
+        try:
+            handler, view_args = self.urls.match(scope['path'], scope['method'])
+        except HTTPException:
+            return await self.fallback(scope, receive, send)
+        start = time.perf_counter()
+        request = Request(scope, await read_body(receive))
+        try:
+            body, status = await handler(request, **view_args)
+        except sqlite3.Error as e:
+            body, status = {"message": f"Database error: {e}"}, 500
+        await self.respond(scope, send, body, status)
+        self.observe(handler, scope['method'], status, time.perf_counter() - start)
+
+    def observe(self, handler, method, status, seconds):
+        # The series metrics.Metrics.teardown_request records for the Flask view.
+        registry = get_metrics(self.flask_app)
+        if registry is not None:
+            registry.request_seconds.observe((f"{api.name}.{handler.__name__}", method, str(status)), seconds)
+
+    async def respond(self, scope, send, body, status):
+        # Same serializer and settings as jsonify, so both paths return identical bytes.
+        payload = self.flask_app.json.response(body).get_data()
+        headers = [(b'content-type', b'application/json'), (b'content-length', str(len(payload)).encode())]
+        # What flask-cors's defaults send on the Flask side.
+        origin = next((value for name, value in scope['headers'] if name == b'origin'), None)
+        if origin is not None:
+            headers += [(b'access-control-allow-origin', origin), (b'vary', b'Origin')]
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': payload})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    # Pools
+    def pool(self, readonly=False):
+        # Created on first use, inside the server's event loop.
+        if self.writers is None:
+            config = self.flask_app.config
+            self.readers = AsyncConnectionPool(config['DATABASE'], size=config['DB_READER_POOL_SIZE'],
+                                               readonly=True, timeout=config['DB_POOL_TIMEOUT'])
+            self.writers = AsyncConnectionPool(config['DATABASE'], size=config['DB_WRITER_POOL_SIZE'],
+                                               timeout=config['DB_POOL_TIMEOUT'])
+        return self.readers if readonly else self.writers
+
+    async def close(self):
+        if self.writers is not None:
+            await self.readers.close_all()
+            await self.writers.close_all()
+            self.readers = self.writers = None
+
+    # Handlers: the same routes as the Flask views of the same name.
+    async def attendance_login(self, request):
+        try:
+            employee_id, day, date_str, work_location, employee_name = parse_attendance_login(request.get_json())
+        except ValueError as e:
+            return {"message": str(e)}, 400
+        async with self.pool().connection() as conn:
+            record_uuid = new_uuid()
+            login_s = seconds_now()
+            try:
+                async with conn.execute(SQLITE_STATEMENTS['attendance_clock_in'], {
+                        'uuid': record_uuid.bytes, 'employee_id': employee_id, 'day': day, 'login_s': login_s,
+                        'work_location': work_location}) as cursor:
+                    inserted = cursor.rowcount
+                if inserted == 0:
+                    await conn.rollback()
+                    return {"message": "Employee not found"}, 404
+                await conn.commit()
+            except sqlite3.Error as e:
+                await conn.rollback()
+                return {"message": f"Database error recording login: {e}"}, 500
+        return attendance_login_body(record_uuid, login_s, employee_id, date_str, work_location, employee_name), 201
+
+    async def attendance_logout(self, request, record_id):
+        record_uuid = uuid_bytes(record_id)
+        if record_uuid is None:
+            return {"message": LOGOUT_NOT_FOUND}, 404
+        async with self.pool().connection() as conn:
+            logout_s = seconds_now()
+            logout_time = clock_text(logout_s)
+            try:
+                async with conn.execute(SQLITE_STATEMENTS['attendance_clock_out'],
+                                        {'record_uuid': record_uuid, 'logout_s': logout_s}) as cursor:
+                    record = await cursor.fetchone()
+                if record is None:
+                    return {"message": LOGOUT_NOT_FOUND}, 404
+                await record_session_async(conn, record['employee_id'], day_text(record['day']),
+                                           clock_text(record['login_s']), logout_time, record['work_location'])
+                await conn.commit()
+            except sqlite3.Error as e:
+                await conn.rollback()
+                return {"message": f"Database error recording logout: {e}"}, 500
+        return {"message": "Logout recorded successfully!", "logout_time": logout_time}, 200
+
+    async def get_notifications(self, request, employee_id):
+        try:
+            page = parse_page_request(request.args, sort_size=2)
+        except ValueError as e:
+            return {"message": str(e)}, 400
+        async with self.pool(readonly=True).connection() as conn:
+            name, params = list_statement('notification_list', employee_id, page, wants_archive(request.args))
+            rows = await conn.execute_fetchall(SQLITE_STATEMENTS[name], params)
+            latest = None
+            if needs_watermark(page):
+                async with conn.execute(SQLITE_STATEMENTS['notification_list_latest'],
+                                        {'employee_id': employee_id}) as cursor:
+                    latest = await cursor.fetchone()
+        return notification_list_body(rows, page, latest), 200
+
+    async def get_unread_notification_count(self, request, employee_id):
+        async with self.pool(readonly=True).connection() as conn:
+            async with conn.execute(SQLITE_STATEMENTS['notification_unread_count'],
+                                    {'employee_id': employee_id}) as cursor:
+                row = await cursor.fetchone()
+        return {"unread": row['unread']}, 200
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
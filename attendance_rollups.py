@@ -0,0 +1,255 @@
+from datetime import datetime
+
+from compact_storage import sql_clock_text, sql_day_text
+
+# A day counts as late when its first completed session started after this.
+LATE_AFTER = '09:30:00'
+LOCATION_GROUPS = {'Office': 'office', 'Home': 'wfh', 'Remote': 'wfh'}  # anything else: 'other'
+UNASSIGNED = 'Unassigned'
+
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS attendance_daily (
+        employee_id TEXT NOT NULL,
+        date TEXT NOT NULL,
+        sessions INTEGER NOT NULL,
+        worked_seconds INTEGER NOT NULL,
+        office_seconds INTEGER NOT NULL,
+        wfh_seconds INTEGER NOT NULL,
+        other_seconds INTEGER NOT NULL,
+        first_login TEXT NOT NULL,
+        PRIMARY KEY (employee_id, date)
+    ) WITHOUT ROWID''',
+    '''CREATE TABLE IF NOT EXISTS attendance_monthly (
+        month TEXT NOT NULL,
+        department TEXT NOT NULL,
+        employee_days INTEGER NOT NULL,
+        late_days INTEGER NOT NULL,
+        sessions INTEGER NOT NULL,
+        worked_seconds INTEGER NOT NULL,
+        office_seconds INTEGER NOT NULL,
+        wfh_seconds INTEGER NOT NULL,
+        other_seconds INTEGER NOT NULL,
+        PRIMARY KEY (month, department)
+    ) WITHOUT ROWID''',
+]
+TOTAL_COLUMNS = ['employee_days', 'late_days', 'sessions', 'worked_seconds',
+                 'office_seconds', 'wfh_seconds', 'other_seconds']
+
+
+def location_group(work_location):
+    return LOCATION_GROUPS.get(work_location, 'other')
+
+
+def session_seconds(login_time, logout_time):
+    """Length of a session from 'HH:MM:SS' strings; a logout past midnight wraps."""
+    try:
+        start = datetime.strptime(login_time, '%H:%M:%S')
+        end = datetime.strptime(logout_time, '%H:%M:%S')
+    except (TypeError, ValueError):
+        return 0
+    return int((end - start).total_seconds()) % 86400
+
+
+# --- Incremental Maintenance ---
+# Folding a session reads the day's row (first login and department) and,
+# for a new day, the employee's department, then runs the two upserts with
+# the parameters from session_upserts(). session_statements() is that
+# sequence; record_session and record_session_async only run it on their
+# connection.
+DAY_SQL = "SELECT first_login, department FROM attendance_daily WHERE employee_id = ? AND date = ?"
+DEPARTMENT_SQL = "SELECT COALESCE(NULLIF(department, ''), ?) FROM employees WHERE id = ?"
+# The department is set by the day's first session and kept after that.
+DAILY_UPSERT_SQL = '''INSERT INTO attendance_daily (employee_id, date, sessions, worked_seconds,
+       office_seconds, wfh_seconds, other_seconds, first_login, department)
+   VALUES (?, ?, 1, ?, ?, ?, ?, ?, ?)
+   ON CONFLICT (employee_id, date) DO UPDATE SET
+       sessions = sessions + 1,
+       worked_seconds = worked_seconds + excluded.worked_seconds,
+       office_seconds = office_seconds + excluded.office_seconds,
+       wfh_seconds = wfh_seconds + excluded.wfh_seconds,
+       other_seconds = other_seconds + excluded.other_seconds,
+       first_login = MIN(first_login, excluded.first_login)'''
+MONTHLY_UPSERT_SQL = '''INSERT INTO attendance_monthly (month, department, employee_days, late_days, sessions,
+       worked_seconds, office_seconds, wfh_seconds, other_seconds)
+   VALUES (?, ?, ?, ?, 1, ?, ?, ?, ?)
+   ON CONFLICT (month, department) DO UPDATE SET
+       employee_days = employee_days + excluded.employee_days,
+       late_days = late_days + excluded.late_days,
+       sessions = sessions + 1,
+       worked_seconds = worked_seconds + excluded.worked_seconds,
+       office_seconds = office_seconds + excluded.office_seconds,
+       wfh_seconds = wfh_seconds + excluded.wfh_seconds,
+       other_seconds = other_seconds + excluded.other_seconds'''
+
+
+def session_upserts(employee_id, date, login_time, logout_time, work_location, previous, department):
+    """(daily params, monthly params) for one session.
+
+    ``previous`` is the day's (first_login, department) row, or None for the
+    day's first session; ``department`` is the employee's current one.
+    """
+    seconds = session_seconds(login_time, logout_time)
+    group = location_group(work_location)
+    by_group = {key: seconds if group == key else 0 for key in ('office', 'wfh', 'other')}
+    # The day's late flag depends on its earliest session, which may have just changed.
+    was_late = previous is not None and previous[0] > LATE_AFTER
+    first_login = min(previous[0], login_time) if previous is not None else login_time
+    late_delta = int(first_login > LATE_AFTER) - int(was_late)
+    if previous is not None and previous[1] is not None:
+        department = previous[1]
+    daily = (employee_id, date, seconds, by_group['office'], by_group['wfh'], by_group['other'], login_time,
+             department or UNASSIGNED)
+    monthly = (date[:7], department or UNASSIGNED, int(previous is None), late_delta,
+               seconds, by_group['office'], by_group['wfh'], by_group['other'])
+    return daily, monthly
+
+
+def session_statements(employee_id, date, login_time, logout_time, work_location):
+    """Generator of the (sql, params) that fold one session; send it each statement's first row."""
+    previous = yield DAY_SQL, (employee_id, date)
+    department = None
+    if previous is None or previous[1] is None:
+        row = yield DEPARTMENT_SQL, (UNASSIGNED, employee_id)
+        department = row[0] if row else None
+    daily, monthly = session_upserts(employee_id, date, login_time, logout_time, work_location,
+                                     previous, department)
+    yield DAILY_UPSERT_SQL, daily
+    yield MONTHLY_UPSERT_SQL, monthly
+
+
+def record_session(conn, employee_id, date, login_time, logout_time, work_location):
+    """Fold one completed session into the rollups, in the caller's transaction."""
+    statements = session_statements(employee_id, date, login_time, logout_time, work_location)
+    row = None
+    while True:
+        try:
+            sql, params = statements.send(row)
+        except StopIteration:
+            return
+        row = conn.execute(sql, params).fetchone()
+
+
+async def record_session_async(conn, employee_id, date, login_time, logout_time, work_location):
+    """record_session on an aiosqlite connection (the asyncio path, see async_api.py)."""
+    statements = session_statements(employee_id, date, login_time, logout_time, work_location)
+    row = None
+    while True:
+        try:
+            sql, params = statements.send(row)
+        except StopIteration:
+            return
+        async with conn.execute(sql, params) as cursor:
+            row = await cursor.fetchone()
+
+
+def _location_group_sql():
+    return "CASE work_location " + " ".join(
+        f"WHEN '{location}' THEN '{key}'" for location, key in LOCATION_GROUPS.items()
+    ) + " ELSE 'other' END"
+
+
+def rebuild_rollups(conn, source='attendance_records'):
+    """Recompute both rollup tables from attendance_records in two set-based passes.
+
+    Days are attributed to each employee's current department, whereas
+    ``record_session`` uses the department at the day's first session.
+    Pass source='attendance_history' to include archived years.
+    """
+    # Migrations 6 and 9 rebuild before migration 14 adds the department column.
+    with_department = _has_day_department(conn)
+    conn.execute("DELETE FROM attendance_daily")
+    conn.execute("DELETE FROM attendance_monthly")
+    conn.execute(f'''
+        INSERT INTO attendance_daily (employee_id, date, sessions, worked_seconds,
+            office_seconds, wfh_seconds, other_seconds, first_login{', department' if with_department else ''})
+        SELECT e.id, {sql_day_text('a.day')}, COUNT(*), SUM(secs),
+               SUM(CASE grp WHEN 'office' THEN secs ELSE 0 END),
+               SUM(CASE grp WHEN 'wfh' THEN secs ELSE 0 END),
+               SUM(CASE grp WHEN 'other' THEN secs ELSE 0 END),
+               {sql_clock_text('MIN(login_s)')}{", COALESCE(NULLIF(e.department, ''), ?)" if with_department else ''}
+        FROM (SELECT emp_no, day, login_s, (logout_s - login_s + 86400) % 86400 AS secs,
+                     {_location_group_sql()} AS grp
+              FROM {source} WHERE logout_s IS NOT NULL) a
+        JOIN employees e ON e.emp_no = a.emp_no
+        GROUP BY a.emp_no, a.day
+    ''', (UNASSIGNED,) if with_department else ())
+    _rebuild_monthly(conn)
+
+
+def rebuild_rollups_from_text(conn):
+    """``rebuild_rollups`` for the TEXT attendance_records columns migration 6 runs against."""
+    seconds = ("(CAST(strftime('%s', logout_time) AS INTEGER)"
+               " - CAST(strftime('%s', login_time) AS INTEGER) + 86400) % 86400")
+    group = _location_group_sql()
+    conn.execute("DELETE FROM attendance_daily")
+    conn.execute("DELETE FROM attendance_monthly")
+    conn.execute(f'''
+        INSERT INTO attendance_daily (employee_id, date, sessions, worked_seconds,
+            office_seconds, wfh_seconds, other_seconds, first_login)
+        SELECT employee_id, date, COUNT(*), SUM(secs),
+               SUM(CASE grp WHEN 'office' THEN secs ELSE 0 END),
+               SUM(CASE grp WHEN 'wfh' THEN secs ELSE 0 END),
+               SUM(CASE grp WHEN 'other' THEN secs ELSE 0 END),
+               MIN(login_time)
+        FROM (SELECT employee_id, date, login_time, COALESCE({seconds}, 0) AS secs, {group} AS grp
+              FROM attendance_records WHERE logout_time IS NOT NULL)
+        GROUP BY employee_id, date
+    ''')
+    _rebuild_monthly(conn)
+
+
+def _has_day_department(conn):
+    return any(row[1] == 'department' for row in conn.execute("PRAGMA table_info(attendance_daily)"))
+
+
+def _rebuild_monthly(conn):
+    department = 'd.department' if _has_day_department(conn) else "NULLIF(e.department, '')"
+    conn.execute(f'''
+        INSERT INTO attendance_monthly (month, department, employee_days, late_days, sessions,
+            worked_seconds, office_seconds, wfh_seconds, other_seconds)
+        SELECT substr(d.date, 1, 7), COALESCE({department}, ?), COUNT(*),
+               SUM(d.first_login > ?), SUM(d.sessions), SUM(d.worked_seconds),
+               SUM(d.office_seconds), SUM(d.wfh_seconds), SUM(d.other_seconds)
+        FROM attendance_daily d LEFT JOIN employees e ON e.id = d.employee_id
+        GROUP BY 1, 2
+    ''', (UNASSIGNED, LATE_AFTER))
+
+
+# Each day is counted in the department its first session was folded under,
+# so a department change mid-day cannot move the day's late flag (or its
+# later sessions) to a department that never counted the day.
+DAY_DEPARTMENT_STEPS = [
+    "ALTER TABLE attendance_daily ADD COLUMN department TEXT",
+    rebuild_rollups,
+]
+
+
+# --- Reports ---
+def _summary(totals):
+    totals = {column: totals.get(column) or 0 for column in TOTAL_COLUMNS}
+    days, worked = totals['employee_days'], totals['worked_seconds']
+    return {
+        **totals,
+        'worked_hours': round(worked / 3600, 2),
+        'avg_hours_per_day': round(worked / 3600 / days, 2) if days else 0.0,
+        'late_ratio': round(totals['late_days'] / days, 4) if days else 0.0,
+        'wfh_share': round(totals['wfh_seconds'] / worked, 4) if worked else 0.0,
+        'office_share': round(totals['office_seconds'] / worked, 4) if worked else 0.0,
+    }
+
+
+def month_report(month, rows):
+    """Org-wide totals plus one entry per department, from the month's attendance_monthly ``rows``."""
+    org = {column: sum(row[column] for row in rows) for column in TOTAL_COLUMNS}
+    return {
+        'month': month,
+        'late_after': LATE_AFTER,
+        'organization': _summary(org),
+        'departments': [{'department': row['department'], **_summary(dict(row))} for row in rows],
+    }
+
+
+def department_report(month, department, row):
+    if row is None:
+        return None
+    return {'month': month, 'department': department, 'late_after': LATE_AFTER, **_summary(dict(row))}
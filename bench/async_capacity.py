@@ -0,0 +1,183 @@
+"""Sync vs asyncio serving of clock-in and notification reads under many connections.
+
+Serves a copy of a harness dataset once through gunicorn (the sync path,
+gthread workers) and once through uvicorn with asgi:app (the asyncio path
+for these routes) with the same number of worker processes. Each server
+is then driven at every --connections level by keep-alive clients that
+send requests back to back:
+
+    notifications   GET /notifications/<id>?limit=50
+    clock_in        POST /attendance/login, then PUT /attendance/logout/<record_id>
+
+Reports req/s, p50/p99 latency and failed requests (errors, timeouts,
+refused connections) per path and level. A sync worker serves at most
+--threads requests at once and queues the rest; the asyncio path keeps
+every request in flight, waiting on the aiosqlite pools instead.
+
+    python bench/async_capacity.py --scale small --connections 16 64 256 --seconds 10
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+os.environ.setdefault('HRMS_DATABASE', os.path.join(tempfile.mkdtemp(prefix='hrms-bench-'), 'hrms.db'))
+
+from attendance_load import percentile  # noqa: E402
+from dataset import DEFAULT_END, SCALES  # noqa: E402
+from harness import ensure_dataset, load_employees  # noqa: E402
+from worker_scaling import launch, start_server, stop_server  # noqa: E402
+
+SCENARIOS = ('notifications', 'clock_in')
+
+
+# --- HTTP Client ---
+# A minimal HTTP/1.1 keep-alive client on asyncio streams, so one process
+# can hold hundreds of connections without a thread each.
+async def call(reader, writer, method, path, body=None):
+    payload = json.dumps(body).encode() if body is not None else b''
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload)
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    length = next(int(line.split(':', 1)[1]) for line in lines if line.lower().startswith('content-length:'))
+    return status, await reader.readexactly(length)
+
+
+async def clock_in(reader, writer, employee, today):
+    status, body = await call(reader, writer, 'POST', '/attendance/login', {
+        "employee_id": employee['id'], "date": today, "work_location": "Office", "employee_name": employee['name']})
+    if status != 201:
+        return [status == 201]
+    record_id = json.loads(body)['record']['record_id']
+    status, _ = await call(reader, writer, 'PUT', f"/attendance/logout/{record_id}")
+    return [True, status == 200]
+
+
+async def notifications(reader, writer, employee, today):
+    status, _ = await call(reader, writer, 'GET', f"/notifications/{employee['id']}?limit=50")
+    return [status == 200]
+
+
+async def connection_loop(port, scenario, employees, today, rng, stop_at, timeout, latencies, failures):
+    func = {'clock_in': clock_in, 'notifications': notifications}[scenario]
+    reader = writer = None
+    while time.time() < stop_at:
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+            results = await asyncio.wait_for(func(reader, writer, rng.choice(employees), today), timeout)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, StopIteration):
+            failures.append(1)
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.05)
+            continue
+        elapsed = (time.perf_counter() - start) * 1000 / len(results)
+        latencies.extend([elapsed] * len(results))
+        failures.extend(0 if ok else 1 for ok in results)
+    if writer is not None:
+        writer.close()
+
+
+def client_process(job):
+    """One load-generating process; returns (latencies ms, failures)."""
+    port, scenario, employees, today, connections, start_at, stop_at, timeout, seed = job
+    latencies, failures = [], []
+
+    async def main():
+        await asyncio.sleep(max(0.0, start_at - time.time()))
+        await asyncio.gather(*(connection_loop(port, scenario, employees, today, random.Random(f"{seed}:{n}"),
+                                               stop_at, timeout, latencies, failures)
+                               for n in range(connections)))
+
+    asyncio.run(main())
+    return latencies, sum(failures)
+
+
+def run_level(port, scenario, employees, today, connections, args):
+    start_at = time.time() + 1.0
+    stop_at = start_at + args.seconds
+    share = [connections // args.clients + (n < connections % args.clients) for n in range(args.clients)]
+    jobs = [(port, scenario, employees, today, count, start_at, stop_at, args.timeout, f"{args.seed}:{n}")
+            for n, count in enumerate(share) if count]
+    with multiprocessing.Pool(len(jobs)) as pool:
+        results = pool.map(client_process, jobs)
+    latencies = [ms for samples, _ in results for ms in samples]
+    return {
+        'requests': len(latencies),
+        'failed': sum(failed for _, failed in results),
+        'throughput': round(len(latencies) / args.seconds, 1),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+    }
+
+
+# --- Servers ---
+def start(path, database, args):
+    if path == 'sync':
+        return start_server(database, args.workers, args.threads, args.port)
+    return launch(['-m', 'uvicorn', 'asgi:app', '--port', str(args.port), '--workers', str(args.workers),
+                   '--no-access-log', '--log-level', 'warning'], database, args.port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--connections', type=int, nargs='+', default=[16, 64, 256])
+    parser.add_argument('--workers', type=int, default=1, help="server processes for both paths")
+    parser.add_argument('--threads', type=int, default=4, help="gunicorn threads per worker (sync path)")
+    parser.add_argument('--clients', type=int, default=2, help="load-generating processes")
+    parser.add_argument('--seconds', type=float, default=10.0, help="measured duration per level")
+    parser.add_argument('--timeout', type=float, default=10.0, help="seconds before a request counts as failed")
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS)
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--json', metavar='PATH', help="also write the results here")
+    args = parser.parse_args()
+
+    params = {**SCALES[args.scale], 'leaves_per_year': 8, 'seed': args.seed, 'end': DEFAULT_END}
+    dataset, _ = ensure_dataset(params)
+    employees = load_employees(dataset)
+    today = (date.fromisoformat(DEFAULT_END) + timedelta(days=1)).isoformat()
+    print(f"{len(employees)} employees, {os.cpu_count()} CPUs; {args.workers} worker(s) per server, "
+          f"{args.threads} threads per sync worker, {args.seconds:g} s per level")
+    print(f"{'path':<6} {'scenario':<14} {'conns':>6} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'failed':>7}")
+
+    results = {}
+    for path in ('sync', 'async'):
+        work = tempfile.mkdtemp(prefix='hrms-capacity-')
+        database = os.path.join(work, 'hrms.db')
+        shutil.copyfile(dataset, database)
+        server = start(path, database, args)
+        try:
+            for scenario in args.scenario or SCENARIOS:
+                for connections in args.connections:
+                    stats = run_level(args.port, scenario, employees, today, connections, args)
+                    results.setdefault(path, {}).setdefault(scenario, {})[str(connections)] = stats
+                    print(f"{path:<6} {scenario:<14} {connections:>6} {stats['throughput']:>9.1f}"
+                          f" {stats['p50_ms']:>9.2f} {stats['p99_ms']:>9.2f} {stats['failed']:>7}")
+        finally:
+            stop_server(server)
+            shutil.rmtree(work)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'config': vars(args), 'cpu_count': os.cpu_count(), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
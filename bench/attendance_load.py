@@ -0,0 +1,130 @@
+"""Concurrent clock-in load test.
+
+Drives the real Flask routes through the test client from many threads at
+once: a burst of /attendance/login + /attendance/logout writes interleaved
+with /attendance/<id> and /profile/<id> reads, the way the 9 AM rush looks.
+Runs once with one-connection-per-request in rollback-journal mode (the old
+behaviour) and once with the pooled WAL connections, and prints p50/p99
+latency for each.
+
+    python bench/attendance_load.py --employees 200 --threads 16 --requests 200
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('HRMS_DATABASE', os.path.join(tempfile.mkdtemp(prefix='hrms-bench-'), 'import.db'))
+
+from app import create_app, init_db  # noqa: E402
+
+app = create_app()
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def seed(path, employees):
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO employees (id, first_name, last_name, email, password) VALUES (?, ?, ?, ?, ?)",
+        [(f"SSQ-{1001 + i}", "Load", f"User{i}", f"load{i}@example.com", "x") for i in range(employees)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def prepare(database, pooled):
+    pools = app.extensions.pop('db_pools', None)
+    if pools:
+        pools['reader'].close_all()
+        pools['writer'].close_all()
+    app.config['DATABASE'] = database
+    app.config['DB_POOL_ENABLED'] = pooled
+    with app.app_context():
+        init_db()
+    if not pooled:
+        conn = sqlite3.connect(database)
+        conn.execute("PRAGMA journal_mode = DELETE")
+        conn.close()
+
+
+def worker(employee_ids, requests_per_thread, latencies, errors, barrier):
+    client = app.test_client()
+    barrier.wait()
+    for _ in range(requests_per_thread):
+        employee_id = random.choice(employee_ids)
+        op = random.random()
+        start = time.perf_counter()
+        if op < 0.4:
+            kind = 'write'
+            response = client.post('/attendance/login', json={
+                "employee_id": employee_id, "date": "2025-09-02",
+                "work_location": "Office", "employee_name": "Load User"
+            })
+            if response.status_code == 201:
+                record_id = response.get_json()['record']['record_id']
+                response = client.put(f'/attendance/logout/{record_id}')
+        elif op < 0.7:
+            kind = 'read'
+            response = client.get(f'/attendance/{employee_id}')
+        else:
+            kind = 'read'
+            response = client.get(f'/profile/{employee_id}')
+        elapsed = (time.perf_counter() - start) * 1000
+        latencies[kind].append(elapsed)
+        if response.status_code >= 500:
+            errors.append(response.status_code)
+
+
+def run(label, pooled, args):
+    database = os.path.join(tempfile.mkdtemp(prefix='hrms-bench-'), 'hrms.db')
+    prepare(database, pooled)
+    seed(database, args.employees)
+    employee_ids = [f"SSQ-{1001 + i}" for i in range(args.employees)]
+    latencies = {'read': [], 'write': []}
+    errors = []
+    barrier = threading.Barrier(args.threads)
+    threads = [
+        threading.Thread(target=worker, args=(employee_ids, args.requests, latencies, errors, barrier))
+        for _ in range(args.threads)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    total = len(latencies['read']) + len(latencies['write'])
+    print(f"{label:<28} {total / wall:8.1f} req/s  errors={len(errors)}")
+    for kind in ('write', 'read'):
+        samples = latencies[kind]
+        print(f"  {kind:<6} n={len(samples):<6} p50={percentile(samples, 50):7.2f} ms"
+              f"  p99={percentile(samples, 99):7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--employees', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=200, help="requests per thread")
+    parser.add_argument('--mode', choices=['both', 'legacy', 'pooled'], default='both')
+    args = parser.parse_args()
+    if args.mode in ('both', 'legacy'):
+        run("per-request connection", False, args)
+    if args.mode in ('both', 'pooled'):
+        run("pooled WAL connections", True, args)
+
+
+if __name__ == '__main__':
+    main()
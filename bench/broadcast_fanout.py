@@ -0,0 +1,81 @@
+"""Broadcast fan-out timing.
+
+Seeds a scratch database with N employees spread over a few departments,
+then times an org-wide announcement three ways: the old path (one
+create_notification() call per employee), the set-based broadcast through
+POST /admin/notifications/broadcast, and a single-department broadcast.
+
+    python bench/broadcast_fanout.py --employees 10000
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('HRMS_DATABASE', os.path.join(tempfile.mkdtemp(prefix='hrms-bench-'), 'hrms.db'))
+
+from app import create_app, create_notification  # noqa: E402
+from db import get_db  # noqa: E402
+from storage import Repository, SQLiteAdapter  # noqa: E402
+
+app = create_app()
+
+DEPARTMENTS = ['Engineering', 'Finance', 'HR', 'Operations', 'Sales']
+
+
+def seed(database, employees):
+    conn = sqlite3.connect(database)
+    conn.executemany(
+        "INSERT INTO employees (id, first_name, last_name, email, password, department) VALUES (?, ?, ?, ?, ?, ?)",
+        [(f"SSQ-{1001 + i}", "Bench", f"User{i}", f"bench{i}@example.com", "x", DEPARTMENTS[i % len(DEPARTMENTS)])
+         for i in range(employees)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--employees', type=int, default=10000)
+    args = parser.parse_args()
+    seed(app.config['DATABASE'], args.employees)
+    client = app.test_client()
+
+    with app.app_context():
+        conn = get_db()
+        repo = Repository(SQLiteAdapter(conn))
+        ids = [row[0] for row in conn.execute("SELECT id FROM employees")]
+        start = time.perf_counter()
+        for employee_id in ids:
+            create_notification(repo, employee_id, "Office closed on Friday for maintenance.")
+        repo.commit()
+        legacy_ms = (time.perf_counter() - start) * 1000
+    print(f"per-employee inserts   {len(ids):>6} rows  {legacy_ms:8.1f} ms")
+
+    start = time.perf_counter()
+    result = client.post('/admin/notifications/broadcast', json={
+        "message": "Office closed on Friday for maintenance."
+    }).get_json()
+    wall_ms = (time.perf_counter() - start) * 1000
+    print(f"broadcast (org-wide)   {result['recipients']:>6} rows  {result['elapsed_ms']:8.1f} ms"
+          f"  ({wall_ms:.1f} ms end to end)")
+
+    result = client.post('/admin/notifications/broadcast', json={
+        "message": "Finance town hall at 4 PM.", "audience": {"department": "Finance"}
+    }).get_json()
+    print(f"broadcast (department) {result['recipients']:>6} rows  {result['elapsed_ms']:8.1f} ms")
+
+    with app.app_context():
+        conn = get_db(readonly=True)
+        body_bytes = conn.execute(
+            "SELECT SUM(length(message)) FROM notifications WHERE broadcast_id IS NULL"
+        ).fetchone()[0]
+        shared_bytes = conn.execute("SELECT SUM(length(message)) FROM broadcasts").fetchone()[0]
+    print(f"message text stored: {body_bytes} bytes per-employee vs {shared_bytes} bytes for both broadcasts")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+"""Synthetic HRMS dataset generator.
+
+Builds a database with the real schema (init_db() plus every migration) and
+fills employees, attendance_records, leave_applications and notifications
+with realistic volumes. The output is fully determined by the scale and
+seed, so two runs with the same arguments produce the same rows (only the
+password hash salt differs).
+
+    python bench/dataset.py --scale medium --out /tmp/hrms-medium.db
+    python bench/dataset.py --employees 50000 --years 3 --notifications 60 --out big.db
+
+Every employee's password is BENCH_PASSWORD. The generation parameters are
+written next to the database as <out>.json; the benchmark harness uses
+them to decide whether a cached dataset can be reused.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('HRMS_DATABASE', os.path.join(tempfile.mkdtemp(prefix='hrms-bench-'), 'hrms.db'))
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from app import create_app, init_db  # noqa: E402
+from attendance_rollups import rebuild_rollups  # noqa: E402
+from migrations import MIGRATIONS  # noqa: E402
+from leave_calendar import HOLIDAYS_2025, NOT_ABSENT_TYPES, HolidayCalendar  # noqa: E402
+
+app = create_app()
+
+BENCH_PASSWORD = 'bench-password'
+# Rows are committed in batches of this many employees.
+EMPLOYEE_BATCH = 500
+
+SCALES = {
+    'small': {'employees': 500, 'years': 1, 'notifications': 20},
+    'medium': {'employees': 5000, 'years': 2, 'notifications': 60},
+    'large': {'employees': 50000, 'years': 3, 'notifications': 60},
+}
+DEFAULT_END = '2025-09-30'
+# Stored in the manifest so cached datasets are rebuilt after a layout change.
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+EPOCH = datetime(1970, 1, 1)
+
+DEPARTMENTS = [('Engineering', 40), ('Operations', 20), ('Sales', 15), ('Finance', 10),
+               ('HR', 8), ('Marketing', 7)]
+ROLES = ['Associate', 'Senior Associate', 'Lead', 'Manager', 'Director']
+FIRST_NAMES = ['Aarav', 'Ananya', 'Arjun', 'Divya', 'Ishaan', 'Kavya', 'Lakshmi', 'Manoj', 'Meera',
+               'Nikhil', 'Priya', 'Rahul', 'Rohith', 'Sai', 'Sneha', 'Suresh', 'Tanvi', 'Vikram']
+LAST_NAMES = ['Reddy', 'Sharma', 'Rao', 'Iyer', 'Naidu', 'Patel', 'Kumar', 'Menon', 'Gupta', 'Varma']
+LOCATIONS = [('Office', 68), ('Home', 24), ('Remote', 5), ('Client', 3)]
+LEAVE_TYPES = [('Casual Leave', 40), ('Sick Leave', 30), ('Earned Leave', 15), ('WFH', 12),
+               ('Comp-off', 3)]
+MESSAGES = [
+    "Your request for {leave} has been submitted.",
+    "Your {leave} application has been approved.",
+    "Payslip for {month} is now available.",
+    "Reminder: submit your timesheet for {month}.",
+    "Your profile was updated.",
+    "Quarterly town hall on {day} at 4 PM.",
+]
+PRESENT_RATE = 0.93
+
+
+def _weighted(choices):
+    values = [value for value, _ in choices]
+    weights = [weight for _, weight in choices]
+    return lambda rng: rng.choices(values, weights)[0]
+
+
+pick_department = _weighted(DEPARTMENTS)
+pick_location = _weighted(LOCATIONS)
+pick_leave_type = _weighted(LEAVE_TYPES)
+
+
+def _uuid(rng, moment):
+    """Stored form of a version 7 UUID for a row created at ``moment``."""
+    millis = int((moment - EPOCH).total_seconds() * 1000)
+    value = millis << 80 | 0x7 << 76 | rng.getrandbits(12) << 64 | 0b10 << 62 | rng.getrandbits(62)
+    return value.to_bytes(16, 'big')
+
+
+def _epoch(moment):
+    return int((moment - EPOCH).total_seconds())
+
+
+# --- Row Builders ---
+def employee_rows(rng, first_index, count, password_hash, start):
+    rows = []
+    for index in range(first_index, first_index + count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        joined = start - timedelta(days=rng.randint(0, 3650))
+        rows.append((
+            f"SSQ-{1001 + index}", first, last, f"{first}.{last}{index}@example.com".lower(),
+            password_hash, rng.choice(['Male', 'Female']),
+            (joined - timedelta(days=rng.randint(22 * 365, 50 * 365))).isoformat(),
+            f"{rng.randint(1, 999)}, Road No. {rng.randint(1, 80)}, Hyderabad",
+            f"{rng.randint(1, 999)}, Road No. {rng.randint(1, 80)}, Hyderabad",
+            f"9{rng.randint(100000000, 999999999)}", pick_department(rng), rng.choice(ROLES),
+            'Active' if rng.random() < 0.97 else 'On Notice', joined.isoformat(), 1001 + index,
+        ))
+    return rows
+
+
+def leave_rows(rng, emp_no, calendar, working_days, per_year, end):
+    """Non-overlapping applications spread over ``working_days``; returns (rows, days off)."""
+    rows, absent, last = [], set(), -1
+    count = min(len(working_days), int(per_year * len(working_days) / 250))
+    for first in sorted(rng.sample(range(len(working_days)), count)):
+        if first <= last:
+            continue
+        last = min(first + rng.choice([0, 0, 0, 1, 1, 2, 4]), len(working_days) - 1)
+        start, finish = working_days[first], working_days[last]
+        leave_type = pick_leave_type(rng)
+        if (end - start).days < 21 and rng.random() < 0.6:
+            status = 'Pending'
+        else:
+            status = rng.choices(['Approved', 'Rejected', 'Cancelled'], [88, 8, 4])[0]
+        submitted = datetime.combine(start, datetime.min.time()) - timedelta(
+            days=rng.randint(1, 20), seconds=-rng.randint(9 * 3600, 19 * 3600))
+        rows.append((
+            _uuid(rng, submitted), emp_no, leave_type, start.toordinal(), finish.toordinal(),
+            f"{leave_type} request", status, _epoch(submitted), _epoch(submitted) * 1000,
+            calendar.chargeable_days(leave_type, start, finish),
+        ))
+        if status == 'Approved' and leave_type not in NOT_ABSENT_TYPES:
+            absent.update(working_days[first:last + 1])
+    return rows, absent
+
+
+def attendance_rows(rng, emp_no, working_days, absent):
+    rows = []
+    for day in working_days:
+        if day in absent or rng.random() > PRESENT_RATE:
+            continue
+        login = max(7 * 3600, min(12 * 3600, int(rng.gauss(9 * 3600 + 15 * 60, 25 * 60))))
+        worked = max(3600, int(rng.gauss(8.5 * 3600, 45 * 60)))
+        logout = min(login + worked, 86399)
+        midnight = datetime.combine(day, datetime.min.time())
+        rows.append((_uuid(rng, midnight + timedelta(seconds=login)), emp_no, day.toordinal(), login,
+                     pick_location(rng), logout, (_epoch(midnight) + logout) * 1000))
+    return rows
+
+
+def notification_rows(rng, emp_no, count, start, end):
+    span = int((end - start).total_seconds())
+    rows = []
+    for offset in sorted(rng.randrange(span) for _ in range(count)):
+        moment = start + timedelta(seconds=offset)
+        message = rng.choice(MESSAGES).format(
+            leave=pick_leave_type(rng), month=moment.strftime('%B %Y'), day=moment.strftime('%d %b'))
+        is_read = 1 if (end - moment).days > 14 or rng.random() < 0.5 else 0
+        rows.append((_uuid(rng, moment), emp_no, message, is_read, _epoch(moment), _epoch(moment) * 1000))
+    return rows
+
+
+# --- Generation ---
+def create_schema(path, target_version=None):
+    """Run init_db() against ``path`` on a private set of pools, then close them."""
+    previous, pools = app.config['DATABASE'], app.extensions.pop('db_pools', None)
+    app.config['DATABASE'] = path
+    try:
+        with app.app_context():
+            init_db(target_version)
+    finally:
+        created = app.extensions.pop('db_pools', None)
+        if created is not None:
+            created['reader'].close_all()
+            created['writer'].close_all()
+        app.config['DATABASE'] = previous
+        if pools is not None:
+            app.extensions['db_pools'] = pools
+
+
+def generate(path, employees, years, notifications, leaves_per_year=8, seed=1, end=DEFAULT_END,
+             password_hash=None):
+    """Create ``path`` with the full schema and fill it; returns the parameters and row counts.
+
+    ``path`` must not exist yet. The schema comes from app.init_db() so the
+    dataset always matches the code under test.
+    """
+    if os.path.exists(path):
+        raise FileExistsError(path)
+    params = {'employees': employees, 'years': years, 'notifications': notifications,
+              'leaves_per_year': leaves_per_year, 'seed': seed, 'end': end}
+    create_schema(path)
+
+    rng = random.Random(seed)
+    end_day = date.fromisoformat(end)
+    start_day = end_day - timedelta(days=365 * years - 1)
+    calendar = HolidayCalendar((date.fromisoformat(day), name, optional)
+                               for day, name, optional in HOLIDAYS_2025)
+    working_days = [start_day + timedelta(days=n) for n in range((end_day - start_day).days + 1)]
+    working_days = [day for day in working_days if calendar.is_working_day(day)]
+    window = (datetime.combine(start_day, datetime.min.time()),
+              datetime.combine(end_day, datetime.max.time().replace(microsecond=0)))
+    password_hash = password_hash or generate_password_hash(BENCH_PASSWORD, app.config['PASSWORD_HASH_METHOD'])
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -200000")
+    counts = dict.fromkeys(('employees', 'attendance_records', 'leave_applications', 'notifications'), 0)
+    started = time.perf_counter()
+    for first in range(0, employees, EMPLOYEE_BATCH):
+        batch = employee_rows(rng, first, min(EMPLOYEE_BATCH, employees - first), password_hash, start_day)
+        attendance, leaves, notes = [], [], []
+        for row in batch:
+            emp_no = row[-1]
+            employee_leaves, absent = leave_rows(rng, emp_no, calendar, working_days, leaves_per_year, end_day)
+            leaves += employee_leaves
+            attendance += attendance_rows(rng, emp_no, working_days, absent)
+            notes += notification_rows(rng, emp_no, notifications, *window)
+        with conn:
+            conn.executemany(
+                '''INSERT INTO employees (id, first_name, last_name, email, password, gender, dob,
+                       permanent_address, current_address, contactnumber, department, employee_role,
+                       employment_status, join_date, emp_no)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                batch)
+            # updated_ms is supplied so rows carry their historical change stamp.
+            conn.executemany(
+                '''INSERT INTO attendance_records (uuid, emp_no, day, login_s, work_location, logout_s,
+                       updated_ms) VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                attendance)
+            conn.executemany(
+                '''INSERT INTO leave_applications (uuid, emp_no, leave_type, from_day, to_day,
+                       description, status, submitted_s, updated_ms, leave_days)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                leaves)
+            conn.executemany(
+                '''INSERT INTO notifications (uuid, emp_no, message, is_read, created_s, updated_ms)
+                   VALUES (?, ?, ?, ?, ?, ?)''',
+                notes)
+        for table, rows in (('employees', batch), ('attendance_records', attendance),
+                            ('leave_applications', leaves), ('notifications', notes)):
+            counts[table] += len(rows)
+        print(f"\r  {first + len(batch)}/{employees} employees", end='', file=sys.stderr, flush=True)
+    print(file=sys.stderr)
+    with conn:
+        conn.execute("UPDATE id_sequences SET next_value = ? WHERE name = 'employees'", (1001 + employees,))
+        rebuild_rollups(conn)
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+
+    manifest = {'params': params, 'schema': SCHEMA_VERSION, 'rows': counts, 'bytes': os.path.getsize(path),
+                'seconds': round(time.perf_counter() - started, 1)}
+    with open(path + '.json', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_manifest(path):
+    try:
+        with open(path + '.json') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--out', required=True, help="database file to create")
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--employees', type=int)
+    parser.add_argument('--years', type=int)
+    parser.add_argument('--notifications', type=int, help="notifications per employee")
+    parser.add_argument('--leaves-per-year', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--end', default=DEFAULT_END, help="last day of generated history")
+    args = parser.parse_args()
+    params = dict(SCALES[args.scale])
+    for key in params:
+        if getattr(args, key) is not None:
+            params[key] = getattr(args, key)
+    manifest = generate(args.out, leaves_per_year=args.leaves_per_year, seed=args.seed, end=args.end, **params)
+    rows = ', '.join(f"{count} {table}" for table, count in manifest['rows'].items())
+    print(f"{args.out}: {rows}; {manifest['bytes'] / 1e6:.1f} MB in {manifest['seconds']} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,296 @@
+"""Endpoint benchmark suite with stored baselines.
+
+Generates (or reuses) a synthetic dataset from bench/dataset.py, copies it
+to a scratch file and drives the real Flask routes through the test client
+from several threads, one scenario at a time:
+
+    login                POST /login
+    attendance_login     POST /attendance/login
+    attendance_history   GET  /attendance/<id>?limit=200
+    notifications        GET  /notifications/<id>?limit=50
+    leave_applications   GET  /leave-applications/<id>?limit=200
+
+Each scenario reports throughput and p50/p99 latency. --save-baseline
+stores the results under bench/baselines/<name>.json; --baseline compares
+a run against one and exits with status 1 if any scenario got slower than
+--tolerance allows. Baselines are only comparable on the same machine with
+the same dataset and load settings; each records the machine it ran on
+(including its core count) and the commit it was run at. None are
+committed: save one on the machine you compare on, from the commit you
+want to compare against, then rerun with --baseline after your change:
+
+    git stash && python bench/harness.py --scale small --save-baseline laptop
+    git stash pop && python bench/harness.py --scale small --baseline laptop
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('HRMS_DATABASE', os.path.join(tempfile.mkdtemp(prefix='hrms-bench-'), 'hrms.db'))
+
+from app import create_app  # noqa: E402
+from attendance_load import percentile  # noqa: E402
+from dataset import BENCH_PASSWORD, DEFAULT_END, SCALES, SCHEMA_VERSION, generate, load_manifest  # noqa: E402
+
+app = create_app()
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_DIR = os.path.join(BENCH_DIR, 'baselines')
+DATASET_DIR = os.getenv('HRMS_BENCH_DATA', os.path.join(tempfile.gettempdir(), 'hrms-bench-datasets'))
+
+
+# --- Scenarios ---
+# Each takes (client, employee, context) and returns the response; a status
+# other than the expected one counts as an error.
+def login(client, employee, context):
+    return client.post('/login', json={
+        "username": employee['email'], "password": BENCH_PASSWORD, "user_type": "employee"
+    })
+
+
+def attendance_login(client, employee, context):
+    return client.post('/attendance/login', json={
+        "employee_id": employee['id'], "date": context['today'], "work_location": "Office",
+        "employee_name": employee['name']
+    })
+
+
+def attendance_history(client, employee, context):
+    return client.get(f"/attendance/{employee['id']}?limit=200")
+
+
+def notifications(client, employee, context):
+    return client.get(f"/notifications/{employee['id']}?limit=50")
+
+
+def leave_applications(client, employee, context):
+    return client.get(f"/leave-applications/{employee['id']}?limit=200")
+
+
+SCENARIOS = {
+    'login': (login, 200),
+    'attendance_login': (attendance_login, 201),
+    'attendance_history': (attendance_history, 200),
+    'notifications': (notifications, 200),
+    'leave_applications': (leave_applications, 200),
+}
+
+
+# --- Dataset ---
+def ensure_dataset(params):
+    """Path of a generated dataset matching ``params``, generating it if needed."""
+    os.makedirs(DATASET_DIR, exist_ok=True)
+    name = '-'.join(f"{key}{value}" for key, value in sorted(params.items())) + '.db'
+    path = os.path.join(DATASET_DIR, name)
+    manifest = load_manifest(path)
+    if (manifest is None or manifest['params'] != params or manifest.get('schema') != SCHEMA_VERSION
+            or not os.path.exists(path)):
+        for stale in (path, path + '.json', path + '-wal', path + '-shm'):
+            if os.path.exists(stale):
+                os.remove(stale)
+        print(f"generating dataset {path}", file=sys.stderr)
+        manifest = generate(path, **params)
+    return path, manifest
+
+
+def use_database(path):
+    """Point the app at ``path`` with fresh pools and caches."""
+    pools = app.extensions.pop('db_pools', None)
+    if pools:
+        pools['reader'].close_all()
+        pools['writer'].close_all()
+    app.config['DATABASE'] = path
+    app.extensions['leave_calendar'] = None
+    app.extensions['profile_cache'].clear()
+
+
+def load_employees(path):
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT id, email, first_name || ' ' || last_name FROM employees ORDER BY id").fetchall()
+    conn.close()
+    return [{'id': row[0], 'email': row[1], 'name': row[2]} for row in rows]
+
+
+# --- Runner ---
+def run_scenario(name, employees, context, args):
+    func, expected = SCENARIOS[name]
+    latencies, errors = [], []
+    lock = threading.Lock()
+    barrier = threading.Barrier(args.threads + 1)
+
+    def worker(index):
+        rng = random.Random(f"{args.seed}:{name}:{index}")
+        client = app.test_client()
+        for _ in range(args.warmup):
+            func(client, rng.choice(employees), context)
+        barrier.wait()
+        samples, failed = [], []
+        for _ in range(args.requests):
+            employee = rng.choice(employees)
+            start = time.perf_counter()
+            response = func(client, employee, context)
+            samples.append((time.perf_counter() - start) * 1000)
+            if response.status_code != expected:
+                failed.append(response.status_code)
+        with lock:
+            latencies.extend(samples)
+            errors.extend(failed)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'seconds': round(wall, 3),
+        'throughput': round(len(latencies) / wall, 1),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'mean_ms': round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'processor': processor(),
+        'cpu_count': os.cpu_count(),
+        'memory_mb': memory_mb(),
+        'commit': commit,
+    }
+
+
+def processor():
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def memory_mb():
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // 2 ** 20
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+# --- Baselines ---
+def baseline_path(name):
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def compare(results, baseline, tolerance):
+    """Print current vs baseline per scenario; returns the list of regressions."""
+    regressions = []
+    print(f"\n{'scenario':<20} {'metric':<11} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, current in results['scenarios'].items():
+        previous = baseline['scenarios'].get(name)
+        if previous is None:
+            print(f"{name:<20} (not in baseline)")
+            continue
+        # p50/p99 regress when they grow; throughput when it drops.
+        for metric, higher_is_worse in (('throughput', False), ('p50_ms', True), ('p99_ms', True)):
+            old, new = previous[metric], current[metric]
+            change = (new - old) / old if old else 0.0
+            worse = change > tolerance if higher_is_worse else change < -tolerance
+            flag = '  REGRESSION' if worse else ''
+            print(f"{name:<20} {metric:<11} {old:>10.2f} {new:>10.2f} {change:>+8.1%}{flag}")
+            if worse:
+                regressions.append((name, metric, old, new))
+        if current['errors'] > previous['errors']:
+            regressions.append((name, 'errors', previous['errors'], current['errors']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help="run only these scenarios (repeatable)")
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=100, help="measured requests per thread")
+    parser.add_argument('--warmup', type=int, default=5, help="unmeasured requests per thread")
+    parser.add_argument('--save-baseline', metavar='NAME')
+    parser.add_argument('--baseline', metavar='NAME', help="compare against a stored baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed relative slowdown before a metric counts as a regression")
+    parser.add_argument('--json', metavar='PATH', help="also write the results here")
+    args = parser.parse_args()
+
+    params = {**SCALES[args.scale], 'leaves_per_year': 8, 'seed': args.seed, 'end': DEFAULT_END}
+    dataset, manifest = ensure_dataset(params)
+    work = os.path.join(tempfile.mkdtemp(prefix='hrms-bench-'), 'hrms.db')
+    shutil.copyfile(dataset, work)
+    use_database(work)
+    employees = load_employees(work)
+    context = {'today': (date.fromisoformat(DEFAULT_END) + timedelta(days=1)).isoformat()}
+
+    config = {'scale': args.scale, 'dataset': params, 'threads': args.threads,
+              'requests': args.requests, 'warmup': args.warmup}
+    results = {'created_at': datetime.now().isoformat(timespec='seconds'), 'config': config,
+               'environment': environment(), 'dataset_rows': manifest['rows'], 'scenarios': {}}
+    rows = ', '.join(f"{count} {table}" for table, count in manifest['rows'].items())
+    print(f"dataset: {rows}; {args.threads} threads x {args.requests} requests")
+    print(f"{'scenario':<20} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for name in args.scenario or SCENARIOS:
+        stats = run_scenario(name, employees, context, args)
+        results['scenarios'][name] = stats
+        print(f"{name:<20} {stats['throughput']:>9.1f} {stats['p50_ms']:>9.2f} {stats['p99_ms']:>9.2f}"
+              f" {stats['errors']:>7}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(baseline_path(args.save_baseline), 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"saved baseline {baseline_path(args.save_baseline)}")
+    if args.baseline:
+        with open(baseline_path(args.baseline)) as f:
+            baseline = json.load(f)
+        if baseline['config'] != config:
+            print(f"baseline {args.baseline} was recorded with different settings: {baseline['config']}")
+            sys.exit(2)
+        changed = [key for key in ('python', 'sqlite', 'platform', 'processor', 'cpu_count', 'memory_mb')
+                   if baseline['environment'].get(key) != results['environment'][key]]
+        if changed:
+            print(f"warning: environment differs from the baseline ({', '.join(changed)})")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%} "
+                  f"against {baseline['environment'].get('commit') or args.baseline}")
+            sys.exit(1)
+        print("\nno regressions")
+
+
+if __name__ == '__main__':
+    main()
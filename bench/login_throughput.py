@@ -0,0 +1,105 @@
+"""Login throughput per core.
+
+Fires concurrent /login requests through the Flask test client and reports
+logins/second, logins/second/core and p50/p99 latency, once with hashing
+inline on the request threads and once on the hashing process pool. A
+stream of /profile reads runs alongside to show how much a login burst
+slows down everything else.
+
+    python bench/login_throughput.py --users 50 --threads 16 --logins 20
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('HRMS_DATABASE', os.path.join(tempfile.mkdtemp(prefix='hrms-bench-'), 'import.db'))
+
+from attendance_load import app, percentile, prepare  # noqa: E402
+from hashing import PasswordHasher  # noqa: E402
+
+PASSWORD = 'bench-password'
+
+
+def seed(database, users, hasher):
+    hashes = hasher.hash_many([PASSWORD] * users)
+    conn = sqlite3.connect(database)
+    conn.executemany(
+        "INSERT INTO employees (id, first_name, last_name, email, password) VALUES (?, ?, ?, ?, ?)",
+        [(f"SSQ-{1001 + i}", "Bench", f"User{i}", f"bench{i}@example.com", hashes[i]) for i in range(users)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def run(label, workers, args):
+    hasher = PasswordHasher(method=args.method, workers=workers,
+                            max_pending=max(args.threads, workers * 8), timeout=60)
+    app.extensions['password_hasher'] = hasher
+    database = os.path.join(tempfile.mkdtemp(prefix='hrms-bench-'), 'hrms.db')
+    prepare(database, pooled=True)
+    seed(database, args.users, hasher)
+
+    login_latencies, read_latencies = [], []
+    done = threading.Event()
+    barrier = threading.Barrier(args.threads + 1)
+
+    def login_worker(index):
+        client = app.test_client()
+        barrier.wait()
+        for n in range(args.logins):
+            user = (index * args.logins + n) % args.users
+            start = time.perf_counter()
+            response = client.post('/login', json={
+                "username": f"bench{user}@example.com", "password": PASSWORD, "user_type": "employee"
+            })
+            login_latencies.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200, response.get_json()
+
+    def read_worker():
+        client = app.test_client()
+        barrier.wait()
+        while not done.is_set():
+            start = time.perf_counter()
+            client.get('/profile/SSQ-1001')
+            read_latencies.append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=login_worker, args=(i,)) for i in range(args.threads)]
+    reader = threading.Thread(target=read_worker)
+    for t in threads + [reader]:
+        t.start()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    done.set()
+    reader.join()
+    hasher.shutdown()
+
+    cores = os.cpu_count() or 1
+    rate = len(login_latencies) / wall
+    print(f"{label:<22} {rate:7.1f} logins/s  {rate / cores:6.1f} logins/s/core ({cores} cores)")
+    print(f"  login   p50={percentile(login_latencies, 50):8.1f} ms  p99={percentile(login_latencies, 99):8.1f} ms")
+    print(f"  profile p50={percentile(read_latencies, 50):8.1f} ms  p99={percentile(read_latencies, 99):8.1f} ms"
+          f"  (n={len(read_latencies)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--logins', type=int, default=20, help="logins per thread")
+    parser.add_argument('--method', default='scrypt')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="hashing processes for the pooled run")
+    args = parser.parse_args()
+    run("inline hashing", 0, args)
+    run(f"process pool ({args.workers})", args.workers, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""Process startup cost: imports, app construction and migrations.
+
+Every measurement runs in a fresh interpreter, the way a server worker or
+a cron script starts:
+
+    import     python -X importtime -c "import app"; total and the slowest
+               top-level imports
+    cold       import + create_app() against a new database (full schema
+               and every migration) + the first request
+    warm       the same against an already-migrated database, which only
+               reads PRAGMA user_version
+    stampede   --processes interpreters calling create_app() on one new
+               database at the same moment; exactly one must migrate
+
+    python bench/startup.py --repeat 5 --processes 8
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child; prints one JSON line of timings in milliseconds.
+CHILD = r'''
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+import app as module
+imported = time.perf_counter()
+application = module.create_app({{'MIGRATE_ON_START': False}})
+built = time.perf_counter()
+migrated = module.ensure_schema(application)
+module.get_calendar(application)
+ready = time.perf_counter()
+status = application.test_client().get('/holidays/2025').status_code
+served = time.perf_counter()
+print(json.dumps({{
+    'import_ms': (imported - start) * 1000, 'create_ms': (built - imported) * 1000,
+    'schema_ms': (ready - built) * 1000, 'first_request_ms': (served - ready) * 1000,
+    'total_ms': (served - start) * 1000, 'migrated': migrated, 'status': status,
+}}))
+'''
+
+
+def child_env(database):
+    return {**os.environ, 'HRMS_DATABASE': database, 'PYTHONDONTWRITEBYTECODE': '1'}
+
+
+def run_child(database):
+    result = subprocess.run([sys.executable, '-c', CHILD.format(root=ROOT)], env=child_env(database),
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def import_profile(database, top):
+    """(total ms, [(ms, module)]) for ``import app``: its slowest direct imports."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=ROOT,
+                            env=child_env(database), capture_output=True, text=True, check=True)
+    # Lines read "import time: self [us] | cumulative | <indent>package", two
+    # spaces of indent per nesting level, children listed before their parent.
+    children = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children.append((int(cumulative) / 1000, name.strip()))
+        elif depth == 0:
+            if name.strip() == 'app':
+                return int(cumulative) / 1000, sorted(children, reverse=True)[:top]
+            children = []
+    raise RuntimeError("app not found in -X importtime output")
+
+
+def summarize(label, runs):
+    keys = ('import_ms', 'create_ms', 'schema_ms', 'first_request_ms', 'total_ms')
+    medians = {key: statistics.median(run[key] for run in runs) for key in keys}
+    print(f"{label:<6} " + ' '.join(f"{medians[key]:>10.1f}" for key in keys))
+    return medians
+
+
+def stampede(work, processes):
+    database = os.path.join(work, 'stampede.db')
+    start = time.perf_counter()
+    children = [subprocess.Popen([sys.executable, '-c', CHILD.format(root=ROOT)], env=child_env(database),
+                                 stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+                for _ in range(processes)]
+    results = []
+    for child in children:
+        out, err = child.communicate()
+        if child.returncode:
+            raise RuntimeError(err)
+        results.append(json.loads(out.strip().splitlines()[-1]))
+    wall = (time.perf_counter() - start) * 1000
+    migrated = sum(result['migrated'] for result in results)
+    errors = sum(result['status'] != 200 for result in results)
+    print(f"\nstampede: {processes} processes on a new database in {wall:.0f} ms; "
+          f"{migrated} migrated, {errors} failed first requests, "
+          f"slowest schema step {max(result['schema_ms'] for result in results):.1f} ms")
+    return migrated == 1 and not errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--processes', type=int, default=8, help="interpreters in the stampede run")
+    parser.add_argument('--top', type=int, default=10, help="slowest imports to list")
+    args = parser.parse_args()
+    work = tempfile.mkdtemp(prefix='hrms-startup-')
+
+    total, slowest = import_profile(os.path.join(work, 'import.db'), args.top)
+    print(f"import app: {total:.1f} ms (-X importtime, cumulative)")
+    for ms, name in slowest:
+        print(f"  {ms:>8.1f} ms  {name}")
+
+    print(f"\nmedian of {args.repeat} runs, ms")
+    print(f"{'':<6} {'import':>10} {'create':>10} {'schema':>10} {'1st req':>10} {'total':>10}")
+    cold = []
+    for n in range(args.repeat):
+        cold.append(run_child(os.path.join(work, f"cold{n}.db")))
+    summarize('cold', cold)
+    warm_db = os.path.join(work, 'cold0.db')
+    summarize('warm', [run_child(warm_db) for _ in range(args.repeat)])
+
+    ok = stampede(work, args.processes)
+    shutil.rmtree(work)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
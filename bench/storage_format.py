@@ -0,0 +1,154 @@
+"""Storage layout before/after: database size and insert rate.
+
+Builds two scratch databases holding the same rows, one stopped at schema
+version 8 (TEXT uuid keys, 'SSQ-NNNN' foreign keys, TEXT dates) and one on
+the current compact layout, plus a copy of the first upgraded by the real
+migration. Reports per-table bytes (table plus its indexes, after VACUUM)
+from dbstat, then times single-row inserts with one commit each, the way
+attendance login and notifications write, against the prefilled tables.
+
+    python bench/storage_format.py --employees 2000 --rows 300000 --inserts 5000
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('HRMS_DATABASE', os.path.join(tempfile.mkdtemp(prefix='hrms-bench-'), 'hrms.db'))
+
+from compact_storage import clock_text, new_uuid  # noqa: E402
+from dataset import create_schema  # noqa: E402
+from db import ConnectionPool  # noqa: E402
+from migrations import apply_migrations  # noqa: E402
+
+TEXT_LAYOUT_VERSION = 8
+TABLES = ('employees', 'attendance_records', 'notifications')
+FIRST_DAY = date(2023, 1, 2)
+MESSAGE = "Your request for Casual Leave has been submitted."
+
+STATEMENTS = {
+    'text': {
+        'attendance_records': '''INSERT INTO attendance_records (record_id, employee_id, date, login_time,
+                                     work_location, logout_time) VALUES (?, ?, ?, ?, ?, ?)''',
+        'notifications': 'INSERT INTO notifications (notification_id, employee_id, message) VALUES (?, ?, ?)',
+    },
+    'compact': {
+        'attendance_records': '''INSERT INTO attendance_records (uuid, emp_no, day, login_s, work_location, logout_s)
+                                     SELECT ?, emp_no, ?, ?, ?, ? FROM employees WHERE id = ?''',
+        'notifications': 'INSERT INTO notifications (uuid, emp_no, message) SELECT ?, emp_no, ? FROM employees WHERE id = ?',
+    },
+}
+
+
+# --- Rows ---
+def attendance_row(layout, rng, employees, n):
+    employee_id = f"SSQ-{1001 + rng.randrange(employees)}"
+    day = FIRST_DAY + timedelta(days=n // employees)
+    login, logout = 9 * 3600 + rng.randrange(3600), 18 * 3600 + rng.randrange(3600)
+    if layout == 'text':
+        return (str(uuid.uuid4()), employee_id, day.isoformat(), clock_text(login), 'Office', clock_text(logout))
+    return (new_uuid().bytes, day.toordinal(), login, 'Office', logout, employee_id)
+
+
+def notification_row(layout, rng, employees, n):
+    employee_id = f"SSQ-{1001 + rng.randrange(employees)}"
+    if layout == 'text':
+        return (str(uuid.uuid4()), employee_id, MESSAGE)
+    return (new_uuid().bytes, MESSAGE, employee_id)
+
+
+ROWS = {'attendance_records': attendance_row, 'notifications': notification_row}
+
+
+# --- Steps ---
+def connect(path):
+    return ConnectionPool(path, size=1).acquire()
+
+
+def build(path, layout, employees, rows, seed):
+    create_schema(path, TEXT_LAYOUT_VERSION if layout == 'text' else None)
+    conn = connect(path)
+    rng = random.Random(seed)
+    with conn:
+        conn.executemany(
+            "INSERT INTO employees (id, first_name, last_name, email, password) VALUES (?, ?, ?, ?, ?)",
+            [(f"SSQ-{1001 + i}", "Bench", f"User{i}", f"bench{i}@example.com", "x") for i in range(employees)])
+        for table, make in ROWS.items():
+            conn.executemany(STATEMENTS[layout][table], (make(layout, rng, employees, n) for n in range(rows)))
+    conn.close()
+
+
+def insert_rate(path, layout, table, employees, count, seed):
+    """Rows per second for ``count`` single-row transactions."""
+    conn = connect(path)
+    rng = random.Random(seed)
+    sql = STATEMENTS[layout][table]
+    rows = [ROWS[table](layout, rng, employees, n) for n in range(count)]
+    start = time.perf_counter()
+    for row in rows:
+        conn.execute(sql, row)
+        conn.commit()
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return count / elapsed
+
+
+def table_bytes(path):
+    """Bytes per table, indexes included, after a VACUUM."""
+    conn = connect(path)
+    conn.execute("VACUUM")
+    sizes = dict(conn.execute(
+        '''SELECT m.tbl_name, SUM(s.pgsize) FROM dbstat s JOIN sqlite_master m ON m.name = s.name
+           GROUP BY m.tbl_name'''
+    ).fetchall())
+    conn.close()
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--employees', type=int, default=2000)
+    parser.add_argument('--rows', type=int, default=300000, help="prefilled rows per table")
+    parser.add_argument('--inserts', type=int, default=5000, help="timed single-row inserts per table")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    work = tempfile.mkdtemp(prefix='hrms-storage-')
+    paths = {layout: os.path.join(work, f"{layout}.db") for layout in ('text', 'compact', 'migrated')}
+
+    for layout in ('text', 'compact'):
+        start = time.perf_counter()
+        build(paths[layout], layout, args.employees, args.rows, args.seed)
+        print(f"built {layout:<8} layout in {time.perf_counter() - start:6.1f} s", file=sys.stderr)
+    shutil.copyfile(paths['text'], paths['migrated'])
+    conn = connect(paths['migrated'])
+    start = time.perf_counter()
+    apply_migrations(conn)
+    migrate_seconds = time.perf_counter() - start
+    conn.close()
+
+    sizes = {layout: table_bytes(path) for layout, path in paths.items()}
+    print(f"\n{args.rows} rows per table, {args.employees} employees; migration took {migrate_seconds:.1f} s")
+    print(f"{'table':<20} {'text MB':>9} {'compact MB':>11} {'migrated MB':>12} {'change':>8}")
+    for table in (*TABLES, 'total'):
+        before, after, migrated = (
+            sum(size.values()) if table == 'total' else size.get(table, 0)
+            for size in (sizes['text'], sizes['compact'], sizes['migrated']))
+        print(f"{table:<20} {before / 1e6:>9.2f} {after / 1e6:>11.2f} {migrated / 1e6:>12.2f}"
+              f" {(after - before) / before:>+8.1%}")
+
+    print(f"\n{'single-row inserts':<20} {'text rows/s':>12} {'compact rows/s':>15} {'change':>8}")
+    for table in ROWS:
+        before, after = (insert_rate(paths[layout], layout, table, args.employees, args.inserts, args.seed + 1)
+                         for layout in ('text', 'compact'))
+        print(f"{table:<20} {before:>12.0f} {after:>15.0f} {(after - before) / before:>+8.1%}")
+    shutil.rmtree(work)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""Throughput against the number of gunicorn workers.
+
+Starts the production configuration (gunicorn.conf.py, wsgi:app) on a copy
+of a harness dataset once per --workers value and drives it over HTTP from
+--clients load-generating processes, each with --threads keep-alive
+connections, for --seconds per scenario:
+
+    read    GET  /attendance/<id>?limit=200
+    write   POST /attendance/login
+    mixed   nine reads to one write
+
+Prints req/s and p50/p99 latency per worker count. SQLite serializes
+writers, so write throughput should flatten once one worker can keep the
+write lock busy, while reads keep scaling up to the number of cores. Run
+it on the deployment hardware: on a single core the workers only
+time-share it.
+
+    python bench/worker_scaling.py --scale small --workers 1 2 4 8
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+os.environ.setdefault('HRMS_DATABASE', os.path.join(tempfile.mkdtemp(prefix='hrms-bench-'), 'hrms.db'))
+
+from attendance_load import percentile  # noqa: E402
+from dataset import DEFAULT_END, SCALES  # noqa: E402
+from harness import ensure_dataset, load_employees  # noqa: E402
+
+SCENARIOS = ('read', 'write', 'mixed')
+
+
+# --- Server ---
+def start_server(database, workers, threads, port):
+    env = {'HRMS_WORKERS': str(workers), 'HRMS_THREADS': str(threads), 'HRMS_BIND': f"127.0.0.1:{port}",
+           'HRMS_ACCESS_LOG': ''}
+    return launch(['-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'], database, port, env)
+
+
+def launch(args, database, port, env=None):
+    """Run ``python <args>`` from the repo root and wait until it answers on ``port``."""
+    env = {**os.environ, 'HRMS_DATABASE': database, **(env or {})}
+    server = subprocess.Popen([sys.executable, *args], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(server.stderr.read().decode())
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/holidays/2025')
+            conn.getresponse().read()
+            conn.close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("gunicorn did not start")
+
+
+def stop_server(server):
+    server.terminate()
+    try:
+        server.wait(10)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+# --- Load ---
+def request(conn, scenario, employee, rng, today):
+    if scenario == 'write' or (scenario == 'mixed' and rng.random() < 0.1):
+        body = json.dumps({"employee_id": employee['id'], "date": today, "work_location": "Office",
+                           "employee_name": employee['name']})
+        conn.request('POST', '/attendance/login', body, {'Content-Type': 'application/json'})
+        expected = 201
+    else:
+        conn.request('GET', f"/attendance/{employee['id']}?limit=200")
+        expected = 200
+    response = conn.getresponse()
+    response.read()
+    return response.status == expected
+
+
+def client_process(job):
+    """Runs ``threads`` connections until ``stop_at``; returns (latencies ms, errors)."""
+    port, scenario, employees, threads, start_at, stop_at, seed, today = job
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def worker(index):
+        rng = random.Random(f"{seed}:{index}")
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        samples, failed = [], 0
+        time.sleep(max(0.0, start_at - time.time()))
+        while time.time() < stop_at:
+            start = time.perf_counter()
+            try:
+                ok = request(conn, scenario, rng.choice(employees), rng, today)
+            except (OSError, http.client.HTTPException):
+                ok = False
+                conn.close()
+            samples.append((time.perf_counter() - start) * 1000)
+            failed += not ok
+        conn.close()
+        with lock:
+            latencies.extend(samples)
+            errors.append(failed)
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return latencies, sum(errors)
+
+
+def run_scenario(port, scenario, employees, today, args):
+    start_at = time.time() + 1.0
+    stop_at = start_at + args.seconds
+    jobs = [(port, scenario, employees, args.threads, start_at, stop_at, f"{args.seed}:{scenario}:{n}", today)
+            for n in range(args.clients)]
+    with multiprocessing.Pool(args.clients) as pool:
+        results = pool.map(client_process, jobs)
+    latencies = [ms for samples, _ in results for ms in samples]
+    return {
+        'requests': len(latencies),
+        'errors': sum(errors for _, errors in results),
+        'throughput': round(len(latencies) / args.seconds, 1),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--server-threads', type=int, default=4, help="gunicorn threads per worker")
+    parser.add_argument('--clients', type=int, default=4, help="load-generating processes")
+    parser.add_argument('--threads', type=int, default=8, help="connections per client process")
+    parser.add_argument('--seconds', type=float, default=10.0, help="measured duration per scenario")
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--json', metavar='PATH', help="also write the results here")
+    args = parser.parse_args()
+
+    params = {**SCALES[args.scale], 'leaves_per_year': 8, 'seed': args.seed, 'end': DEFAULT_END}
+    dataset, _ = ensure_dataset(params)
+    employees = load_employees(dataset)
+    today = (date.fromisoformat(DEFAULT_END) + timedelta(days=1)).isoformat()
+    print(f"{len(employees)} employees, {os.cpu_count()} CPUs; {args.clients} clients x {args.threads} "
+          f"connections, {args.server_threads} threads per worker, {args.seconds:g} s per scenario")
+    print(f"{'workers':>7} {'scenario':<8} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+
+    results = {}
+    for workers in args.workers:
+        # A fresh copy per worker count so earlier writes do not skew later runs.
+        work = tempfile.mkdtemp(prefix='hrms-scaling-')
+        database = os.path.join(work, 'hrms.db')
+        shutil.copyfile(dataset, database)
+        server = start_server(database, workers, args.server_threads, args.port)
+        try:
+            for scenario in args.scenario or SCENARIOS:
+                stats = run_scenario(args.port, scenario, employees, today, args)
+                results.setdefault(str(workers), {})[scenario] = stats
+                print(f"{workers:>7} {scenario:<8} {stats['throughput']:>9.1f} {stats['p50_ms']:>9.2f}"
+                      f" {stats['p99_ms']:>9.2f} {stats['errors']:>7}")
+        finally:
+            stop_server(server)
+            shutil.rmtree(work)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'config': vars(args), 'cpu_count': os.cpu_count(), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
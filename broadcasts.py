@@ -0,0 +1,89 @@
+import json
+
+from compact_storage import new_uuid
+
+# Employee columns a broadcast can be targeted on; each takes one value or a list.
+AUDIENCE_FIELDS = ('department', 'employee_role', 'employment_status')
+
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS broadcasts (
+        id INTEGER PRIMARY KEY,
+        message TEXT NOT NULL,
+        audience TEXT NOT NULL,
+        recipients INTEGER NOT NULL DEFAULT 0,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )''',
+    # Broadcast rows keep message = '' and point at the shared body instead.
+    'ALTER TABLE notifications ADD COLUMN broadcast_id INTEGER REFERENCES broadcasts(id)',
+    '''CREATE INDEX IF NOT EXISTS idx_notifications_broadcast
+       ON notifications (broadcast_id, is_read) WHERE broadcast_id IS NOT NULL''',
+    # Readers select from the feed so a broadcast's text is resolved with one
+    # primary-key lookup; seq exposes the notifications rowid for the SSE stream.
+    # Migration 9 replaces it with the compact_storage version.
+    '''CREATE VIEW IF NOT EXISTS notification_feed AS
+       SELECT n.rowid AS seq, n.notification_id, n.employee_id,
+              COALESCE(b.message, n.message) AS message, n.is_read, n.timestamp,
+              n.updated_at, n.broadcast_id
+       FROM notifications n LEFT JOIN broadcasts b ON b.id = n.broadcast_id''',
+]
+
+
+def audience_filter(audience):
+    """WHERE clause and params selecting the employees in ``audience``.
+
+    Raises ValueError for unknown keys or empty value lists.
+    """
+    unknown = set(audience) - set(AUDIENCE_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown audience fields: {', '.join(sorted(unknown))}")
+    clauses, params = ["user_type = 'employee'"], []
+    for field in AUDIENCE_FIELDS:
+        values = audience.get(field)
+        if values is None:
+            continue
+        values = [values] if isinstance(values, str) else list(values)
+        if not values or not all(isinstance(value, str) for value in values):
+            raise ValueError(f"{field} must be a string or a non-empty list of strings")
+        clauses.append(f"{field} IN ({', '.join('?' * len(values))})")
+        params += values
+    return ' AND '.join(clauses), params
+
+
+def broadcast(conn, message, audience):
+    """Store ``message`` once and give every matching employee a notification row.
+
+    The fan-out is one INSERT ... SELECT over employees; each row's uuid
+    comes from the same generator create_notification uses. Runs in the
+    caller's transaction; returns (broadcast_id, recipients).
+    """
+    where, params = audience_filter(audience)
+    conn.create_function('new_uuid', 0, lambda: new_uuid().bytes)
+    broadcast_id = conn.execute(
+        "INSERT INTO broadcasts (message, audience) VALUES (?, ?)",
+        (message, json.dumps(audience, sort_keys=True))
+    ).lastrowid
+    cursor = conn.execute(
+        f'''INSERT INTO notifications (uuid, emp_no, message, broadcast_id)
+            SELECT new_uuid(), emp_no, '', ? FROM employees WHERE {where}''',
+        [broadcast_id, *params]
+    )
+    recipients = cursor.rowcount
+    conn.execute("UPDATE broadcasts SET recipients = ? WHERE id = ?", (recipients, broadcast_id))
+    return broadcast_id, recipients
+
+
+def broadcast_stats(conn, broadcast_id):
+    row = conn.execute(
+        "SELECT id, message, audience, recipients, created_at FROM broadcasts WHERE id = ?",
+        (broadcast_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    # Archived notifications were all read.
+    read = conn.execute(
+        '''SELECT (SELECT COUNT(*) FROM notifications WHERE broadcast_id = ? AND is_read = 1)
+                + (SELECT COUNT(*) FROM notification_archive WHERE broadcast_id = ?)''',
+        (broadcast_id, broadcast_id)
+    ).fetchone()[0]
+    return {**dict(row), 'audience': json.loads(row['audience']), 'read': read}
+
@@ -0,0 +1,313 @@
+import os
+import sqlite3
+import time
+import uuid
+from datetime import date
+
+# Storage layout introduced by migration 9. attendance_records, notifications
+# and leave_applications are keyed by an INTEGER PRIMARY KEY and point at
+# employees through the integer employees.emp_no. The ids the API has always
+# returned are unchanged: record/notification ids live on as a 16-byte uuid
+# column and employees.id keeps the 'SSQ-NNNN' string. Dates are day ordinals
+# (date.toordinal(), as in leave_intervals), clock times are seconds since
+# midnight, and timestamps are Unix seconds (*_s) or milliseconds (*_ms).
+# The *_feed views turn rows back into the text the API serves.
+
+# julianday() of a date minus this is its proleptic Gregorian ordinal,
+# the same number Python's date.toordinal() returns.
+JULIAN_ORDINAL_OFFSET = 1721424.5
+# Unix epoch milliseconds/seconds, for change tracking and insert defaults.
+NOW_MS = "CAST((julianday('now') - 2440587.5) * 86400000 + 0.5 AS INTEGER)"
+NOW_S = "CAST(strftime('%s', 'now') AS INTEGER)"
+# Resolves an external employee id parameter to its emp_no inside a statement.
+EMP_NO = "(SELECT emp_no FROM employees WHERE id = ?)"
+
+
+# --- Python Conversions ---
+def new_uuid():
+    """A version 7 UUID: 48-bit Unix milliseconds followed by random bits.
+
+    Ids of new rows sort by creation time, so the uuid index grows at its
+    right-hand edge instead of taking inserts on random pages. The text
+    form is the same 8-4-4-4-12 layout as the uuid4 ids issued before.
+    """
+    millis = time.time_ns() // 1000000
+    rand = int.from_bytes(os.urandom(10), 'big')
+    value = ((millis & 0xFFFFFFFFFFFF) << 80 | 0x7 << 76 | (rand >> 62 & 0xFFF) << 64
+             | 0b10 << 62 | rand & 0x3FFFFFFFFFFFFFFF)
+    return uuid.UUID(int=value)
+
+
+def uuid_bytes(value):
+    """Stored form of an external id, or None when ``value`` is not a UUID."""
+    try:
+        return uuid.UUID(value).bytes
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def uuid_text(value):
+    """Text form of a stored uuid column, for readers that select ``uuid`` raw.
+
+    Formatting here costs a fraction of sql_uuid_text() per row, which
+    matters on the long list pages.
+    """
+    digits = value.hex()
+    return f"{digits[:8]}-{digits[8:12]}-{digits[12:16]}-{digits[16:20]}-{digits[20:]}"
+
+
+def to_day(value):
+    """Day ordinal of an ISO date string; raises ValueError if it is not one."""
+    return date.fromisoformat(value).toordinal()
+
+
+def day_text(day):
+    return date.fromordinal(day).isoformat()
+
+
+def clock_text(seconds):
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def clock_seconds(value):
+    hours, minutes, seconds = (int(part) for part in value.split(':'))
+    return hours * 3600 + minutes * 60 + seconds
+
+
+# --- SQL Conversions ---
+def sql_uuid_text(column):
+    digits = f"hex({column})"
+    return (f"lower(substr({digits}, 1, 8) || '-' || substr({digits}, 9, 4) || '-' || "
+            f"substr({digits}, 13, 4) || '-' || substr({digits}, 17, 4) || '-' || substr({digits}, 21))")
+
+
+def sql_day_text(column):
+    return f"date({column} + {JULIAN_ORDINAL_OFFSET})"
+
+
+def sql_clock_text(column):
+    return f"time({column}, 'unixepoch')"
+
+
+def sql_seconds_text(column):
+    return f"datetime({column}, 'unixepoch')"
+
+
+def sql_ms_text(column):
+    return f"strftime('%Y-%m-%d %H:%M:%f', {column} / 1000.0, 'unixepoch')"
+
+
+# Parsers for the TEXT columns of the old layout; NULL when a value does not parse.
+def _sql_day(column):
+    return f"CAST(julianday({column}) - {JULIAN_ORDINAL_OFFSET} AS INTEGER)"
+
+
+def _sql_clock(column):
+    return f"CAST(round((julianday({column}) - julianday('00:00')) * 86400) AS INTEGER)"
+
+
+def _sql_epoch_s(column):
+    return f"CAST(strftime('%s', {column}) AS INTEGER)"
+
+
+def _sql_epoch_ms(column):
+    return f"CAST((julianday({column}) - 2440587.5) * 86400000 + 0.5 AS INTEGER)"
+
+
+# --- Schema ---
+# 'SSQ-NNNN' ids map to NNNN; anything else gets the negated rowid, which can
+# never collide with a sequence-allocated number. So does an id whose number
+# is already taken: 'SSQ-0001' and 'SSQ-1' are different ids under the old
+# TEXT key, and only the first one to claim 1 keeps it.
+_EMP_NUMBER = "CAST(substr({row}id, 5) AS INTEGER)"
+_EMP_NUMERIC = "{row}id GLOB 'SSQ-[0-9]*' AND substr({row}id, 5) NOT GLOB '*[^0-9]*'"
+_EMP_NO_VALUE = (f"CASE WHEN {_EMP_NUMERIC} AND NOT EXISTS "
+                 f"(SELECT 1 FROM employees taken WHERE taken.emp_no = {_EMP_NUMBER}) "
+                 f"THEN {_EMP_NUMBER} ELSE -{{row}}rowid END")
+
+
+def _emp_no_trigger():
+    return f'''CREATE TRIGGER trg_employees_emp_no AFTER INSERT ON employees
+               WHEN NEW.emp_no IS NULL
+               BEGIN
+                   UPDATE employees SET emp_no = {_EMP_NO_VALUE.format(row='NEW.')} WHERE rowid = NEW.rowid;
+               END'''
+
+
+def _number_employees(conn):
+    """Give every existing employee an emp_no, in rowid order (see _EMP_NO_VALUE)."""
+    taken, updates = set(), []
+    for rowid, employee_id in conn.execute("SELECT rowid, id FROM employees ORDER BY rowid").fetchall():
+        suffix = employee_id[4:] if employee_id.startswith('SSQ-') else ''
+        number = int(suffix) if suffix.isascii() and suffix.isdigit() else None
+        if number is None or number in taken:
+            number = -rowid
+        taken.add(number)
+        updates.append((number, rowid))
+    conn.executemany("UPDATE employees SET emp_no = ? WHERE rowid = ?", updates)
+
+
+def emp_no_trigger_steps():
+    """Replace the insert trigger of migration 9 with the collision-safe one."""
+    return ['DROP TRIGGER IF EXISTS trg_employees_emp_no', _emp_no_trigger()]
+
+TABLES = {
+    'attendance_records': f'''(
+        id INTEGER PRIMARY KEY,
+        uuid BLOB NOT NULL UNIQUE,
+        emp_no INTEGER NOT NULL REFERENCES employees(emp_no),
+        day INTEGER NOT NULL,
+        login_s INTEGER NOT NULL,
+        logout_s INTEGER,
+        work_location TEXT,
+        updated_ms INTEGER NOT NULL DEFAULT ({NOW_MS})
+    )''',
+    'notifications': f'''(
+        id INTEGER PRIMARY KEY,
+        uuid BLOB NOT NULL UNIQUE,
+        emp_no INTEGER NOT NULL REFERENCES employees(emp_no),
+        message TEXT NOT NULL,
+        is_read INTEGER NOT NULL DEFAULT 0,
+        created_s INTEGER NOT NULL DEFAULT ({NOW_S}),
+        updated_ms INTEGER NOT NULL DEFAULT ({NOW_MS}),
+        broadcast_id INTEGER REFERENCES broadcasts(id)
+    )''',
+    'leave_applications': f'''(
+        id INTEGER PRIMARY KEY,
+        uuid BLOB NOT NULL UNIQUE,
+        emp_no INTEGER NOT NULL REFERENCES employees(emp_no),
+        leave_type TEXT NOT NULL,
+        from_day INTEGER NOT NULL,
+        to_day INTEGER,
+        description TEXT,
+        status TEXT NOT NULL DEFAULT 'Pending',
+        leave_days INTEGER,
+        submitted_s INTEGER NOT NULL DEFAULT ({NOW_S}),
+        updated_ms INTEGER NOT NULL DEFAULT ({NOW_MS})
+    )''',
+}
+
+# Old rows keep their rowid as the new id, so notification SSE event ids and
+# leave_intervals entries stay valid.
+_COPIES = {
+    'attendance_records': (
+        'id, uuid, emp_no, day, login_s, logout_s, work_location, updated_ms',
+        f'''t.rowid, uuid_blob(t.record_id), e.emp_no, {_sql_day('t.date')}, {_sql_clock('t.login_time')},
+            {_sql_clock('t.logout_time')}, t.work_location,
+            COALESCE({_sql_epoch_ms('t.updated_at')}, {NOW_MS})''',
+        [('record_id', 'uuid_blob(t.record_id) IS NULL'),
+         ('date', f"{_sql_day('t.date')} IS NULL"),
+         ('login_time', f"{_sql_clock('t.login_time')} IS NULL"),
+         ('logout_time', f"t.logout_time IS NOT NULL AND {_sql_clock('t.logout_time')} IS NULL")],
+    ),
+    'notifications': (
+        'id, uuid, emp_no, message, is_read, created_s, updated_ms, broadcast_id',
+        f'''t.rowid, uuid_blob(t.notification_id), e.emp_no, t.message, t.is_read,
+            COALESCE({_sql_epoch_s('t.timestamp')}, {NOW_S}),
+            COALESCE({_sql_epoch_ms('t.updated_at')}, {NOW_MS}), t.broadcast_id''',
+        [('notification_id', 'uuid_blob(t.notification_id) IS NULL')],
+    ),
+    'leave_applications': (
+        'id, uuid, emp_no, leave_type, from_day, to_day, description, status, leave_days, '
+        'submitted_s, updated_ms',
+        f'''t.rowid, uuid_blob(t.record_id), e.emp_no, t.leave_type, {_sql_day('t.from_date')},
+            {_sql_day('t.to_date')}, t.description, t.status, t.leave_days,
+            COALESCE({_sql_epoch_s('t.submitted_at')}, {NOW_S}),
+            COALESCE({_sql_epoch_ms('t.updated_at')}, {NOW_MS})''',
+        [('record_id', 'uuid_blob(t.record_id) IS NULL'),
+         ('from_date', f"{_sql_day('t.from_date')} IS NULL"),
+         ('to_date', f"t.to_date IS NOT NULL AND {_sql_day('t.to_date')} IS NULL")],
+    ),
+}
+
+INDEXES = [
+    'CREATE INDEX idx_attendance_employee_date ON attendance_records (emp_no, day DESC, login_s DESC, id DESC)',
+    'CREATE INDEX idx_attendance_records_employee_changes ON attendance_records (emp_no, updated_ms, id)',
+    'CREATE INDEX idx_notifications_employee_read ON notifications (emp_no, is_read)',
+    'CREATE INDEX idx_notifications_employee_timestamp ON notifications (emp_no, created_s DESC, id DESC)',
+    'CREATE INDEX idx_notifications_employee_changes ON notifications (emp_no, updated_ms, id)',
+    # Trailing rowid makes "emp_no = ? AND id > ?" a range seek for the SSE stream.
+    'CREATE INDEX idx_notifications_employee_stream ON notifications (emp_no)',
+    '''CREATE INDEX idx_notifications_broadcast
+       ON notifications (broadcast_id, is_read) WHERE broadcast_id IS NOT NULL''',
+    'CREATE INDEX idx_leave_employee_submitted ON leave_applications (emp_no, submitted_s DESC, id DESC)',
+    'CREATE INDEX idx_leave_applications_employee_changes ON leave_applications (emp_no, updated_ms, id)',
+]
+
+# Readers select from these; the raw numeric columns stay available for
+# filtering and keyset cursors.
+VIEWS = [
+    f'''CREATE VIEW attendance_feed AS
+        SELECT a.id, a.emp_no, {sql_uuid_text('a.uuid')} AS record_id, e.id AS employee_id,
+               {sql_day_text('a.day')} AS date, {sql_clock_text('a.login_s')} AS login_time,
+               a.work_location, {sql_clock_text('a.logout_s')} AS logout_time,
+               {sql_ms_text('a.updated_ms')} AS updated_at, a.uuid, a.day, a.login_s, a.logout_s, a.updated_ms
+        FROM attendance_records a LEFT JOIN employees e ON e.emp_no = a.emp_no''',
+    f'''CREATE VIEW notification_feed AS
+        SELECT n.id AS seq, n.emp_no, {sql_uuid_text('n.uuid')} AS notification_id, e.id AS employee_id,
+               COALESCE(b.message, n.message) AS message, n.is_read,
+               {sql_seconds_text('n.created_s')} AS timestamp, {sql_ms_text('n.updated_ms')} AS updated_at,
+               n.broadcast_id, n.uuid, n.created_s, n.updated_ms
+        FROM notifications n
+        LEFT JOIN broadcasts b ON b.id = n.broadcast_id
+        LEFT JOIN employees e ON e.emp_no = n.emp_no''',
+    f'''CREATE VIEW leave_feed AS
+        SELECT l.id, l.emp_no, {sql_uuid_text('l.uuid')} AS record_id, e.id AS employee_id, l.leave_type,
+               {sql_day_text('l.from_day')} AS from_date, {sql_day_text('l.to_day')} AS to_date,
+               l.description, l.status, {sql_seconds_text('l.submitted_s')} AS submitted_at,
+               {sql_ms_text('l.updated_ms')} AS updated_at, l.leave_days, l.uuid, l.from_day, l.to_day,
+               l.submitted_s, l.updated_ms
+        FROM leave_applications l LEFT JOIN employees e ON e.emp_no = l.emp_no''',
+]
+
+
+def _stamp_trigger(table):
+    # Inserts are stamped by the column default; updates that leave
+    # updated_ms alone get the current time.
+    return f'''CREATE TRIGGER trg_{table}_stamp_update AFTER UPDATE ON {table}
+               WHEN NEW.updated_ms IS OLD.updated_ms
+               BEGIN
+                   UPDATE {table} SET updated_ms = {NOW_MS} WHERE id = NEW.id;
+               END'''
+
+
+def _copy_rows(conn):
+    """Fill the new_* tables from the TEXT-keyed ones.
+
+    Refuses (and so rolls the migration back) when a row cannot be
+    represented: an employee_id with no employee, an id that is not a UUID
+    or a date/time SQLite cannot parse. Fix those rows and restart.
+    """
+    conn.create_function('uuid_blob', 1, uuid_bytes, deterministic=True)
+    problems = []
+    for table, (_, _, checks) in _COPIES.items():
+        orphans = conn.execute(
+            f"SELECT COUNT(*) FROM {table} t WHERE NOT EXISTS (SELECT 1 FROM employees e WHERE e.id = t.employee_id)"
+        ).fetchone()[0]
+        if orphans:
+            problems.append(f"{orphans} {table} rows reference a missing employee")
+        for column, condition in checks:
+            count = conn.execute(f"SELECT COUNT(*) FROM {table} t WHERE {condition}").fetchone()[0]
+            if count:
+                problems.append(f"{count} {table} rows have an unreadable {column}")
+    if problems:
+        raise sqlite3.IntegrityError("Cannot convert to the compact layout: " + '; '.join(problems))
+    for table, (columns, values, _) in _COPIES.items():
+        conn.execute(f'''INSERT INTO new_{table} ({columns})
+                         SELECT {values} FROM {table} t JOIN employees e ON e.id = t.employee_id''')
+
+
+def migration_steps():
+    steps = [
+        'ALTER TABLE employees ADD COLUMN emp_no INTEGER',
+        _number_employees,
+        'CREATE UNIQUE INDEX idx_employees_emp_no ON employees (emp_no)',
+        _emp_no_trigger(),
+        *(f"CREATE TABLE new_{table} {columns}" for table, columns in TABLES.items()),
+        _copy_rows,
+        # The feed view reads notifications, so it has to go before the swap.
+        'DROP VIEW IF EXISTS notification_feed',
+    ]
+    for table in TABLES:
+        steps += [f"DROP TABLE {table}", f"ALTER TABLE new_{table} RENAME TO {table}", _stamp_trigger(table)]
+    return [*steps, *INDEXES, *VIEWS]
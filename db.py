@@ -0,0 +1,255 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from flask import current_app, g
+
+# --- Connection Settings ---
+# Applied once when a pooled connection is opened, not on every request.
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -16000,        # negative = KiB, so ~16 MB of page cache per connection
+    'mmap_size': 134217728,      # 128 MB
+    'busy_timeout': 5000,        # ms to wait on a locked database before SQLITE_BUSY
+    'temp_store': 'MEMORY',
+}
+
+# Callables run against every newly opened connection (e.g. trace callbacks).
+connection_hooks = []
+
+
+class ConnectionPool:
+    """A bounded pool of reusable SQLite connections.
+
+    Connections are opened lazily up to ``size`` and handed out one at a
+    time; ``acquire`` blocks for up to ``timeout`` seconds when the pool is
+    exhausted. Reader pools put their connections in ``query_only`` mode.
+    ``factory`` is the sqlite3.Connection subclass to open.
+    """
+
+    def __init__(self, database, size=4, readonly=False, pragmas=None, timeout=10.0,
+                 factory=sqlite3.Connection):
+        self.database = database
+        self.size = size
+        self.readonly = readonly
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self.timeout = timeout
+        self.factory = factory
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.database, timeout=self.timeout, check_same_thread=False,
+                               factory=self.factory)
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        if self.readonly:
+            conn.execute("PRAGMA query_only = ON")
+        for hook in connection_hooks:
+            hook(conn)
+        return conn
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._opened -= 1
+                    raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError("Timed out waiting for a database connection")
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # A broken connection is dropped rather than returned to the pool.
+            with self._lock:
+                self._opened -= 1
+            conn.close()
+            return
+        self._idle.put(conn)
+
+    def close_all(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+
+# --- Flask Integration ---
+_pools_lock = threading.Lock()
+
+
+def init_app(app):
+    app.config.setdefault('DATABASE', 'hrms.db')
+    app.config.setdefault('DB_POOL_ENABLED', True)
+    app.config.setdefault('DB_READER_POOL_SIZE', 8)
+    app.config.setdefault('DB_WRITER_POOL_SIZE', 1)
+    app.config.setdefault('DB_POOL_TIMEOUT', 10.0)
+    app.teardown_appcontext(close_db)
+
+
+def connection_factory(app):
+    """The sqlite3.Connection subclass this app's connections use (metrics.py sets a timed one)."""
+    return app.extensions.get('db_connection_factory', sqlite3.Connection)
+
+
+def get_pools(app=None):
+    """Return the (reader, writer) pools for this process, creating them on first use.
+
+    Pools are keyed by pid so a forked worker never reuses its parent's
+    connections.
+    """
+    app = app or current_app._get_current_object()
+    pools = app.extensions.get('db_pools')
+    if pools is None or pools['pid'] != os.getpid():
+        with _pools_lock:
+            pools = app.extensions.get('db_pools')
+            if pools is None or pools['pid'] != os.getpid():
+                database = app.config['DATABASE']
+                timeout = app.config['DB_POOL_TIMEOUT']
+                factory = connection_factory(app)
+                pools = {
+                    'pid': os.getpid(),
+                    'reader': ConnectionPool(database, app.config['DB_READER_POOL_SIZE'],
+                                             readonly=True, timeout=timeout, factory=factory),
+                    'writer': ConnectionPool(database, app.config['DB_WRITER_POOL_SIZE'],
+                                             timeout=timeout, factory=factory),
+                }
+                app.extensions['db_pools'] = pools
+    return pools['reader'], pools['writer']
+
+
+def close_pools(app):
+    """Close this process's idle pooled connections; the pools reopen lazily.
+
+    Call before forking so children never inherit open SQLite handles.
+    """
+    pools = app.extensions.pop('db_pools', None)
+    if pools is not None:
+        pools['reader'].close_all()
+        pools['writer'].close_all()
+
+
+def _open_unpooled(app):
+    conn = sqlite3.connect(app.config['DATABASE'], factory=connection_factory(app))
+    conn.row_factory = sqlite3.Row
+    for hook in connection_hooks:
+        hook(conn)
+    return conn
+
+
+def get_db(readonly=False):
+    """Return the connection bound to the current app context.
+
+    Read-only callers get a connection from the reader pool unless this
+    context already holds the writer, in which case they share it so they
+    see their own uncommitted writes.
+    """
+    if 'db_writer' in g:
+        return g.db_writer
+    if readonly and 'db_reader' in g:
+        return g.db_reader
+    app = current_app._get_current_object()
+    if not app.config['DB_POOL_ENABLED']:
+        conn = _open_unpooled(app)
+    else:
+        reader, writer = get_pools(app)
+        conn = (reader if readonly else writer).acquire()
+    setattr(g, 'db_reader' if readonly else 'db_writer', conn)
+    return conn
+
+
+def close_db(exception=None):
+    for key in ('db_writer', 'db_reader'):
+        conn = g.pop(key, None)
+        if conn is None:
+            continue
+        if not current_app.config['DB_POOL_ENABLED']:
+            conn.close()
+            continue
+        reader, writer = get_pools()
+        (writer if key == 'db_writer' else reader).release(conn)
+
+
+@contextmanager
+def connection(app, readonly=False):
+    """Borrow a pooled connection outside of a request (workers, streams)."""
+    if not app.config['DB_POOL_ENABLED']:
+        conn = _open_unpooled(app)
+        try:
+            yield conn
+        finally:
+            conn.close()
+        return
+    reader, writer = get_pools(app)
+    pool = reader if readonly else writer
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+
+# --- Cross-Process Locking ---
+@contextmanager
+def file_lock(path, blocking=True):
+    """Hold an exclusive lock on ``path`` (created if missing) for the block.
+
+    Blocks until other processes holding it let go. The lock is released if
+    the holder dies, so a crashed migration never wedges later starts. With
+    ``blocking=False`` it makes one attempt and yields whether it got the
+    lock; the block runs either way.
+    """
+    with open(path, 'a+') as f:
+        if fcntl is not None:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            return
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                break
+            except OSError:
+                if not blocking:
+                    yield False
+                    return
+                time.sleep(0.1)
+        try:
+            yield True
+        finally:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
@@ -278,7 +278,6 @@ async function saveProfileChanges(sectionId) {
             toggleSectionEditMode(sectionId, false);
             fillUserEverywhere(currentUser);
             showCustomAlert(`✅ ${sectionId.replace('-', ' ')} updated successfully!`);
-            fetchAndRenderNotifications(currentUser.id);
             console.log(`${sectionId} changes saved successfully.`);
         } catch (error) {
             showCustomAlert(`❌ Failed to update ${sectionId.replace('-', ' ')}: ${error.message}`);
@@ -400,6 +399,42 @@ async function submitCompoff() {
     }
 }
 
+// --- Incremental History Sync ---
+// Keeps a local copy of each history list. The first load pages through the
+// full list; later loads only fetch rows changed since the saved watermark.
+const historyCache = {};
+
+async function syncHistory(path, idKey) {
+    let state = historyCache[path];
+    if (!state || !state.watermark) {
+        state = { rows: new Map(), watermark: null };
+        let cursor = null;
+        do {
+            const query = cursor ? `limit=200&after=${cursor}` : 'limit=200';
+            const page = await makeApiRequest(`${API_BASE_URL}${path}?${query}`, { method: 'GET' });
+            if (!cursor) state.watermark = page.watermark;
+            page.items.forEach(item => state.rows.set(item[idKey], item));
+            cursor = page.next_cursor;
+        } while (cursor);
+        historyCache[path] = state;
+    } else {
+        let page;
+        do {
+            page = await makeApiRequest(`${API_BASE_URL}${path}?limit=200&since=${state.watermark}`, { method: 'GET' });
+            page.items.forEach(item => state.rows.set(item[idKey], item));
+            state.watermark = page.watermark;
+        } while (page.next_cursor);
+    }
+    return Array.from(state.rows.values());
+}
+
+function compareDesc(a, b, keys) {
+    for (const key of keys) {
+        if (a[key] !== b[key]) return (a[key] || '') < (b[key] || '') ? 1 : -1;
+    }
+    return 0;
+}
+
 // --- Load and Display Leave History ---
 async function loadLeaveHistory(employeeId) {
     const tableBody = document.querySelector('#leaveHistoryTable tbody');
@@ -407,9 +442,8 @@ async function loadLeaveHistory(employeeId) {
     tableBody.innerHTML = '<tr><td colspan="5">Loading history...</td></tr>';
 
     try {
-        const history = await makeApiRequest(`${API_BASE_URL}/leave-applications/${employeeId}`, {
-            method: 'GET'
-        });
+        const history = (await syncHistory(`/leave-applications/${employeeId}`, 'record_id'))
+            .sort((a, b) => compareDesc(a, b, ['submitted_at', 'record_id']));
         tableBody.innerHTML = '';
         if (history && history.length > 0) {
             history.forEach(record => {
@@ -501,28 +535,51 @@ async function fetchAndRenderNotifications(employeeId) {
     if (!dropdown || !dot) return;
 
     try {
-        const notifications = await makeApiRequest(`${API_BASE_URL}/notifications/${employeeId}`, { method: 'GET' });
+        const [page, counts] = await Promise.all([
+            makeApiRequest(`${API_BASE_URL}/notifications/${employeeId}?limit=50`, { method: 'GET' }),
+            makeApiRequest(`${API_BASE_URL}/notifications/unread-count/${employeeId}`, { method: 'GET' })
+        ]);
         dropdown.innerHTML = ''; 
-        let hasUnread = false;
-
-        if (notifications && notifications.length > 0) {
-            notifications.forEach(n => {
-                addNotification(n.message, !n.is_read);
-                if (!n.is_read) {
-                    hasUnread = true;
-                }
-            });
+
+        if (page.items.length > 0) {
+            page.items.forEach(n => addNotification(n.message, !n.is_read));
         } else {
-            dropdown.innerHTML = '<div class="notification-item">No new notifications</div>';
+            dropdown.innerHTML = '<div class="notification-item notification-placeholder">No new notifications</div>';
         }
-        dot.classList.toggle('hidden', !hasUnread);
+        dot.classList.toggle('hidden', counts.unread === 0);
     } catch (error) {
         console.error("Failed to fetch notifications:", error);
         dropdown.innerHTML = '<div class="notification-item">Could not load notifications.</div>';
     }
+    subscribeToNotifications(employeeId);
 }
 
-function addNotification(message, isUnread = false) {
+// --- Live Notifications (Server-Sent Events) ---
+// New notifications are pushed by the server as they are created, so the
+// list is fetched once at login instead of after every action.
+let notificationStream = null;
+
+function subscribeToNotifications(employeeId) {
+    if (notificationStream || typeof EventSource === 'undefined') return;
+    const stream = new EventSource(`${API_BASE_URL}/notifications/stream/${employeeId}`);
+    notificationStream = stream;
+    stream.addEventListener('error', () => {
+        // The browser reconnects on its own unless the server refused the
+        // stream (503 when it is at its stream limit); try again later then.
+        if (stream.readyState === EventSource.CLOSED) {
+            notificationStream = null;
+            setTimeout(() => subscribeToNotifications(employeeId), 30000);
+        }
+    });
+    stream.addEventListener('notification', event => {
+        const n = JSON.parse(event.data);
+        document.querySelector('#notificationDropdown .notification-placeholder')?.remove();
+        addNotification(n.message, !n.is_read, true);
+        if (!n.is_read) document.getElementById('notificationDot')?.classList.remove('hidden');
+    });
+}
+
+function addNotification(message, isUnread = false, prepend = false) {
     const dropdown = document.getElementById('notificationDropdown');
     const newItem = document.createElement('div');
     newItem.className = 'notification-item';
@@ -530,7 +587,11 @@ function addNotification(message, isUnread = false) {
         newItem.classList.add('unread');
     }
     newItem.textContent = message;
-    dropdown.appendChild(newItem);
+    if (prepend) {
+        dropdown.prepend(newItem);
+    } else {
+        dropdown.appendChild(newItem);
+    }
 }
 
 async function toggleNotifications() {
@@ -845,9 +906,8 @@ async function loadAttendanceRecords(employeeId) {
     if (!tableBody) return;
     tableBody.innerHTML = '<tr><td colspan="6">Loading attendance records...</td></tr>';
     try {
-        const records = await makeApiRequest(`${API_BASE_URL}/attendance/${employeeId}`, {
-            method: 'GET'
-        });
+        const records = (await syncHistory(`/attendance/${employeeId}`, 'record_id'))
+            .sort((a, b) => compareDesc(a, b, ['date', 'login_time', 'record_id']));
         tableBody.innerHTML = '';
         if (records && records.length > 0) {
             records.forEach(record => {
@@ -899,7 +959,6 @@ document.getElementById('changePasswordForm')?.addEventListener('submit', async
              showCustomAlert(`❌ Password change failed: ${response.message}`);
         } else if (response.message === "Password updated successfully!") {
             showCustomAlert('✅ Your password has been updated successfully.');
-            fetchAndRenderNotifications(currentUser.id);
             this.reset();
         } else {
             showCustomAlert(`❌ Password change failed: ${response.message || 'An unknown error occurred.'}`);
@@ -942,7 +1001,6 @@ document.getElementById('internalResetPasswordForm')?.addEventListener('submit',
 
         if (response.message === "Password reset successfully!") {
             showCustomAlert('✅ Your password has been reset successfully.');
-            fetchAndRenderNotifications(currentUser.id);
             this.reset();
         } else {
             showCustomAlert(`❌ Password reset failed: ${response.message || 'An unknown error occurred.'}`);
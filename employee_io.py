@@ -0,0 +1,291 @@
+import csv
+import io
+import json
+import random
+import string
+
+import db
+from hashing import HasherBusy
+from storage import DB_ERRORS, EMPLOYEE_FIELDS, Repository, SQLiteAdapter
+
+ID_PREFIX = 'SSQ-'
+REQUIRED_FIELDS = ('first_name', 'last_name', 'email')
+EXPORT_COLUMNS = ['id', *EMPLOYEE_FIELDS, 'user_type']
+FORMATS = ('csv', 'ndjson')
+
+IMPORT_CHUNK_SIZE = 500
+# Each chunk is one write transaction and one IN (...) email check.
+MAX_IMPORT_CHUNK_SIZE = 1000
+EXPORT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+
+
+class ImportFormatError(ValueError):
+    """The upload as a whole cannot be read (unknown format, bad CSV header)."""
+
+
+# --- Id Allocation ---
+def allocate_employee_ids(conn, count):
+    """Reserve ``count`` consecutive employee ids in ``conn``'s transaction.
+
+    The counter lives in id_sequences, so this is a single-row update rather
+    than a scan for the current maximum. Rolling back returns the range.
+    """
+    if count <= 0:
+        return []
+    first = conn.execute(
+        "UPDATE id_sequences SET next_value = next_value + ? WHERE name = 'employees' RETURNING next_value - ?",
+        (count, count)
+    ).fetchone()[0]
+    return [f"{ID_PREFIX}{n}" for n in range(first, first + count)]
+
+
+# --- Import ---
+def detect_format(requested, content_type):
+    fmt = (requested or '').lower()
+    if not fmt:
+        content_type = (content_type or '').lower()
+        fmt = 'ndjson' if ('ndjson' in content_type or 'jsonl' in content_type) else 'csv'
+    if fmt == 'jsonl':
+        fmt = 'ndjson'
+    if fmt not in FORMATS:
+        raise ImportFormatError(f"Unsupported format '{fmt}', expected csv or ndjson")
+    return fmt
+
+
+def read_records(stream, fmt):
+    """Yield (line, record, error) for each row of a CSV or NDJSON byte stream.
+
+    The stream is decoded incrementally, so an upload is never held in memory
+    as a whole.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        try:
+            header = [name.strip() for name in reader.fieldnames or []]
+        except csv.Error as e:
+            raise ImportFormatError(f"Could not read CSV header: {e}")
+        missing = [field for field in REQUIRED_FIELDS if field not in header]
+        if missing:
+            raise ImportFormatError(f"CSV header is missing columns: {', '.join(missing)}")
+        reader.fieldnames = header
+        while True:
+            # Earlier chunks may already be committed, so a bad row is
+            # reported against its line instead of failing the upload. Each
+            # next() reads at least one more line, so this always advances.
+            try:
+                record = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                yield reader.line_num + 1, None, f"Malformed CSV row: {e}"
+                continue
+            except UnicodeDecodeError as e:
+                yield reader.line_num + 1, None, f"Upload is not valid UTF-8; rows from here on were not read: {e}"
+                return
+            if None in record:
+                yield reader.line_num, None, "Row has more values than the header"
+            else:
+                yield reader.line_num, record, None
+    lines = enumerate(text, 1)
+    line_number = 0
+    while True:
+        try:
+            line_number, line = next(lines)
+        except StopIteration:
+            return
+        except UnicodeDecodeError as e:
+            yield line_number + 1, None, f"Upload is not valid UTF-8; rows from here on were not read: {e}"
+            return
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"Invalid JSON: {e}"
+            continue
+        if isinstance(record, dict):
+            yield line_number, record, None
+        else:
+            yield line_number, None, "Each line must be a JSON object"
+
+
+def parse_chunk_size(value):
+    """Return the ``chunk_size`` query parameter as an int, or the default when absent.
+
+    Raises ValueError when it is not an integer between 1 and MAX_IMPORT_CHUNK_SIZE.
+    """
+    if value is None:
+        return IMPORT_CHUNK_SIZE
+    try:
+        size = int(value)
+    except ValueError:
+        raise ValueError("chunk_size must be an integer")
+    if not 1 <= size <= MAX_IMPORT_CHUNK_SIZE:
+        raise ValueError(f"chunk_size must be between 1 and {MAX_IMPORT_CHUNK_SIZE}")
+    return size
+
+
+def validate_employee(record):
+    """Return (employee, errors) for one uploaded record."""
+    employee, errors = {}, []
+    for field in [*EMPLOYEE_FIELDS, 'password']:
+        value = record.get(field)
+        if isinstance(value, (dict, list)):
+            errors.append(f"{field} must be a scalar value")
+            continue
+        if value is not None:
+            value = str(value).strip() or None
+        employee[field] = value
+    for field in REQUIRED_FIELDS:
+        if not employee.get(field):
+            errors.append(f"{field} is required")
+    email = employee.get('email')
+    if email and ('@' not in email or len(email) > 254):
+        errors.append("email is not a valid address")
+    return employee, errors
+
+
+def import_employees(app, records, hasher, outbox=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """Validate and insert streamed ``records`` in chunked transactions.
+
+    Each chunk is checked against existing emails, hashed on the hasher pool
+    with no connection held, then written with one id-range allocation and
+    one executemany. The writer is only borrowed for that last step. Rows
+    without a password get a generated one, mailed through ``outbox``.
+    Returns a report with the created ids and per-row errors.
+    """
+    report = {'imported': 0, 'failed': 0, 'employees': [], 'errors': []}
+    seen = set()
+    chunk = []
+
+    def fail(line, messages):
+        report['failed'] += 1
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append({'line': line, 'errors': messages})
+
+    for line, record, error in records:
+        if error is not None:
+            fail(line, [error])
+            continue
+        employee, errors = validate_employee(record)
+        if not errors and employee['email'] in seen:
+            errors.append("Duplicate email in upload")
+        if errors:
+            fail(line, errors)
+            continue
+        seen.add(employee['email'])
+        chunk.append((line, employee))
+        if len(chunk) >= chunk_size:
+            _import_chunk(app, chunk, hasher, outbox, report, fail)
+            chunk = []
+    if chunk:
+        _import_chunk(app, chunk, hasher, outbox, report, fail)
+    report['errors'].sort(key=lambda error: error['line'])
+    report['errors_truncated'] = report['failed'] > len(report['errors'])
+    return report
+
+
+def _existing_emails(conn, emails):
+    placeholders = ', '.join('?' * len(emails))
+    rows = conn.execute(f"SELECT email FROM employees WHERE email IN ({placeholders})", emails)
+    return {row[0] for row in rows}
+
+
+def _import_chunk(app, chunk, hasher, outbox, report, fail):
+    with db.connection(app, readonly=True) as conn:
+        taken = _existing_emails(conn, [employee['email'] for _, employee in chunk])
+    pending = []
+    for line, employee in chunk:
+        if employee['email'] in taken:
+            fail(line, ["Email already exists"])
+        else:
+            pending.append((line, employee))
+    if not pending:
+        return
+
+    temporary = {}
+    for line, employee in pending:
+        if not employee['password']:
+            temporary[line] = ''.join(random.choices(string.ascii_letters + string.digits, k=10))
+    try:
+        hashes = hasher.hash_many([temporary.get(line) or employee['password'] for line, employee in pending])
+    except HasherBusy:
+        for line, _ in pending:
+            fail(line, ["Server is busy, please retry this row"])
+        return
+
+    with db.connection(app) as conn:
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # Re-check under the write lock; another request may have registered one.
+            taken = _existing_emails(conn, [employee['email'] for _, employee in pending])
+            rows = [(line, employee, pw) for (line, employee), pw in zip(pending, hashes)
+                    if employee['email'] not in taken]
+            ids = allocate_employee_ids(conn, len(rows))
+            Repository(SQLiteAdapter(conn)).add_employees([
+                {**employee, 'id': new_id, 'password': pwhash}
+                for new_id, (_, employee, pwhash) in zip(ids, rows)
+            ])
+            if outbox is not None:
+                for new_id, (line, employee, _) in zip(ids, rows):
+                    if line in temporary:
+                        outbox.enqueue(conn, [employee['email']], 'Welcome to the HRMS Portal',
+                                       _welcome_body(employee, new_id, temporary[line]))
+            conn.commit()
+        except DB_ERRORS as e:
+            conn.rollback()
+            for line, _ in pending:
+                fail(line, [f"Database error: {e}"])
+            return
+    for line, employee in pending:
+        if employee['email'] in taken:
+            fail(line, ["Email already exists"])
+    for new_id, (line, employee, _) in zip(ids, rows):
+        report['imported'] += 1
+        report['employees'].append({'line': line, 'id': new_id, 'email': employee['email']})
+
+
+def _welcome_body(employee, employee_id, password):
+    return f"""Hello {employee['first_name']},
+            An account has been created for you on the HRMS portal.
+            Your employee ID is {employee_id} and your temporary password is: {password}
+            Please log in with this password and change it immediately from the 'Change Password' section.
+            Thank you,
+            HRMS System"""
+
+
+# --- Export ---
+def export_employees(app, fmt, batch_size=EXPORT_BATCH_SIZE):
+    """Yield the employees table as CSV or NDJSON text, one batch at a time.
+
+    Batches are keyset pages on rowid and each borrows a reader only for its
+    own query, so a slow download neither pins a pooled connection nor
+    holds a WAL snapshot open. Password hashes are never exported.
+    """
+    columns = ', '.join(EXPORT_COLUMNS)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == 'csv':
+        writer.writerow(EXPORT_COLUMNS)
+    last_rowid = 0
+    while True:
+        with db.connection(app, readonly=True) as conn:
+            rows = conn.execute(
+                f"SELECT rowid, {columns} FROM employees WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last_rowid, batch_size)
+            ).fetchall()
+        for row in rows:
+            values = [row[column] for column in EXPORT_COLUMNS]
+            if fmt == 'csv':
+                writer.writerow(values)
+            else:
+                buffer.write(json.dumps(dict(zip(EXPORT_COLUMNS, values))) + '\n')
+        if buffer.tell():
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if len(rows) < batch_size:
+            return
+        last_rowid = rows[-1]['rowid']
@@ -0,0 +1,100 @@
+import threading
+from collections import defaultdict
+
+from flask import current_app, g, has_app_context
+
+
+class NotificationHub:
+    """In-process fan-out of "new notifications for employee X" signals.
+
+    The hub carries no payload: subscribers are woken up and read the new
+    rows themselves, so a signal that races a rollback or reaches the wrong
+    worker costs one cheap query and nothing else. Anything with the same
+    subscribe/unsubscribe/publish/publish_all methods (e.g. a wrapper around
+    a local message broker) can be passed to init_app instead.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, employee_id):
+        wakeup = threading.Event()
+        with self._lock:
+            self._subscribers[employee_id].add(wakeup)
+        return wakeup
+
+    def unsubscribe(self, employee_id, wakeup):
+        with self._lock:
+            waiters = self._subscribers.get(employee_id)
+            if waiters is not None:
+                waiters.discard(wakeup)
+                if not waiters:
+                    del self._subscribers[employee_id]
+
+    def publish(self, employee_id):
+        with self._lock:
+            waiters = list(self._subscribers.get(employee_id, ()))
+        for wakeup in waiters:
+            wakeup.set()
+
+    def publish_all(self):
+        with self._lock:
+            waiters = [wakeup for group in self._subscribers.values() for wakeup in group]
+        for wakeup in waiters:
+            wakeup.set()
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(group) for group in self._subscribers.values())
+
+
+# --- Flask Integration ---
+def init_app(app, hub=None):
+    app.config.setdefault('SSE_HEARTBEAT_SECONDS', 15)
+    # Each open stream holds a server thread for as long as the client stays
+    # connected, so a process serves at most this many at once.
+    app.config.setdefault('SSE_MAX_STREAMS', 16)
+    app.extensions['notification_hub'] = hub or NotificationHub()
+    app.extensions['sse_stream_slots'] = threading.BoundedSemaphore(app.config['SSE_MAX_STREAMS'])
+    app.teardown_appcontext(_flush_pending)
+
+
+def get_hub(app=None):
+    return (app or current_app).extensions['notification_hub']
+
+
+def get_stream_slots(app=None):
+    return (app or current_app).extensions['sse_stream_slots']
+
+
+def notify_after_commit(employee_id):
+    """Queue a wake-up for ``employee_id`` until the app context ends.
+
+    Publishing straight away would let a subscriber read before the
+    inserting transaction commits and miss the row.
+    """
+    if not has_app_context():
+        return
+    if 'notified_employees' not in g:
+        g.notified_employees = set()
+    g.notified_employees.add(employee_id)
+
+
+def notify_all_after_commit():
+    """Like notify_after_commit, for writes that reach many employees at once."""
+    if has_app_context():
+        g.notify_everyone = True
+
+
+def _flush_pending(exception=None):
+    if g.pop('notify_everyone', False):
+        g.pop('notified_employees', None)
+        get_hub().publish_all()
+        return
+    employee_ids = g.pop('notified_employees', None)
+    if not employee_ids:
+        return
+    hub = get_hub()
+    for employee_id in employee_ids:
+        hub.publish(employee_id)
@@ -0,0 +1,38 @@
+"""Gunicorn settings for serving wsgi:app.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Each worker is a separate process with its own SQLite pools, mail and
+retention threads and password-hash pool; requests inside a worker run on
+a thread pool. SQLite allows a single writer at a time however many
+workers there are, so extra workers mostly buy read throughput and CPU
+for hashing. Every open /notifications/stream response holds one thread
+until the client disconnects, so each worker admits at most
+HRMS_SSE_MAX_STREAMS of them (later ones get a 503 and retry) and runs
+that many threads on top of the HRMS_THREADS for ordinary requests. See
+bench/worker_scaling.py to measure a setting on the target machine.
+"""
+import os
+
+cpus = os.cpu_count() or 1
+
+bind = os.getenv('HRMS_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('HRMS_WORKERS', min(2 * cpus + 1, 8)))
+worker_class = 'gthread'
+# The app reads the same variable and caps its open streams to match.
+sse_streams = int(os.getenv('HRMS_SSE_MAX_STREAMS', '16'))
+threads = int(os.getenv('HRMS_THREADS', '4')) + sse_streams
+timeout = int(os.getenv('HRMS_TIMEOUT', '30'))
+keepalive = 5
+graceful_timeout = 30
+
+# Build the app (and migrate) once in the master, then fork. Workers
+# recreate their pools and background threads on first use.
+preload_app = True
+
+# Every worker starts its own password-hash process pool; share the CPUs
+# between them instead of giving each worker all of them.
+os.environ.setdefault('PASSWORD_HASH_WORKERS', str(max(1, cpus // workers)))
+
+# Access log to stdout by default; HRMS_ACCESS_LOG= (empty) turns it off.
+accesslog = os.getenv('HRMS_ACCESS_LOG', '-') or None
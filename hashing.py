@@ -0,0 +1,178 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from metrics import record_span
+
+
+class HasherBusy(RuntimeError):
+    """Raised when too many hash jobs are already waiting for a worker."""
+
+
+class PasswordHasher:
+    """Runs werkzeug password hashing on a bounded process pool.
+
+    scrypt/pbkdf2 are deliberately CPU-heavy; running them on request
+    threads lets a login burst starve every other endpoint. Jobs go to a
+    pool of ``workers`` processes instead, and at most ``max_pending`` may be
+    queued or running at once -- beyond that callers get HasherBusy after
+    ``timeout`` seconds rather than piling up. ``workers=0`` hashes inline.
+
+    ``method`` is the cost policy (anything werkzeug accepts, e.g.
+    "scrypt:32768:8:1" or "pbkdf2:sha256:600000"). Stored hashes made with
+    a different policy are reported by ``needs_rehash``.
+    """
+
+    def __init__(self, method='scrypt', workers=None, max_pending=None, timeout=10.0):
+        self.method = method
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_pending = max_pending or max(self.workers, 1) * 8
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = None
+        self._pid = None
+        self._policy_prefix = None
+        self._lock = threading.Lock()
+        self._stats = {'hashes': 0, 'verifies': 0, 'rehashes': 0, 'rejected': 0,
+                       'pending': 0, 'total_seconds': 0.0, 'max_seconds': 0.0}
+
+    def _pool(self):
+        # A forked worker must not reuse its parent's executor.
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    # Never fork: the caller is a threaded server worker, and a
+                    # forked child inherits whatever locks its threads held.
+                    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                         mp_context=multiprocessing.get_context(method))
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _acquire(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise HasherBusy("Password hashing queue is full")
+        with self._lock:
+            self._stats['pending'] += 1
+        return time.perf_counter()
+
+    def _release(self, span, start):
+        elapsed = time.perf_counter() - start
+        self._slots.release()
+        with self._lock:
+            self._stats['pending'] -= 1
+            self._stats['total_seconds'] += elapsed
+            self._stats['max_seconds'] = max(self._stats['max_seconds'], elapsed)
+        if span is not None:
+            record_span(span, elapsed)
+
+    def _run(self, span, func, *args):
+        start = self._acquire()
+        try:
+            if self.workers <= 0:
+                return func(*args)
+            return self._pool().submit(func, *args).result()
+        finally:
+            self._release(span, start)
+
+    def hash(self, password):
+        result = self._run('password_hash', generate_password_hash, password, self.method)
+        with self._lock:
+            self._stats['hashes'] += 1
+        return result
+
+    def hash_many(self, passwords):
+        """Hash a batch of passwords in parallel across the pool.
+
+        Each job takes a pending slot like ``hash`` does, so a batch shares
+        the ``max_pending`` bound with login traffic instead of flooding the
+        pool, and raises HasherBusy (after the jobs already queued finish)
+        when no slot frees up within ``timeout``.
+        """
+        passwords = list(passwords)
+        if self.workers <= 0:
+            return [self.hash(password) for password in passwords]
+        started = time.perf_counter()
+        futures = []
+        try:
+            for password in passwords:
+                start = self._acquire()
+                try:
+                    future = self._pool().submit(generate_password_hash, password, self.method)
+                except BaseException:
+                    self._release(None, start)
+                    raise
+                # The batch as a whole is recorded as one span below.
+                future.add_done_callback(lambda _, start=start: self._release(None, start))
+                futures.append(future)
+        except HasherBusy:
+            wait(futures)
+            raise
+        results = [future.result() for future in futures]
+        record_span('password_hash_batch', time.perf_counter() - started)
+        with self._lock:
+            self._stats['hashes'] += len(passwords)
+        return results
+
+    def verify(self, pwhash, password):
+        result = self._run('password_verify', check_password_hash, pwhash, password)
+        with self._lock:
+            self._stats['verifies'] += 1
+        return result
+
+    def needs_rehash(self, pwhash):
+        if self._policy_prefix is None:
+            # Let werkzeug expand defaults (e.g. "scrypt" -> "scrypt:32768:8:1").
+            self._policy_prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return pwhash.split('$', 1)[0] != self._policy_prefix
+
+    def record_rehash(self):
+        with self._lock:
+            self._stats['rehashes'] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        calls = stats['hashes'] + stats['verifies']
+        return {
+            'method': self.method,
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'queue_depth': stats['pending'],
+            'hashes': stats['hashes'],
+            'verifies': stats['verifies'],
+            'rehashes': stats['rehashes'],
+            'rejected': stats['rejected'],
+            'avg_latency_ms': round(stats['total_seconds'] / calls * 1000, 2) if calls else 0.0,
+            'max_latency_ms': round(stats['max_seconds'] * 1000, 2),
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+# --- Flask Integration ---
+def init_app(app):
+    app.config.setdefault('PASSWORD_HASH_METHOD', 'scrypt')
+    app.config.setdefault('PASSWORD_HASH_WORKERS', os.cpu_count() or 1)
+    app.config.setdefault('PASSWORD_HASH_MAX_PENDING', None)
+    hasher = PasswordHasher(
+        method=app.config['PASSWORD_HASH_METHOD'],
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        max_pending=app.config['PASSWORD_HASH_MAX_PENDING'],
+    )
+    app.extensions['password_hasher'] = hasher
+    return hasher
+
+
+def get_hasher(app=None):
+    return (app or current_app).extensions['password_hasher']
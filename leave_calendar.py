@@ -0,0 +1,343 @@
+import logging
+import threading
+import time
+from datetime import date
+
+from flask import current_app
+
+import db
+from compact_storage import JULIAN_ORDINAL_OFFSET
+
+logger = logging.getLogger(__name__)
+
+# Company holidays from "SSQ_Holiday List_2025.pdf". Optional entries are the
+# festivals listed under "falling on Saturday/ Sunday/ Optional"; they are
+# shown in the calendar but are not days off. Later years are loaded into
+# the holidays table with PUT /admin/holidays/<year>.
+HOLIDAYS_2025 = [
+    ('2025-01-01', 'New Year Day', 0),
+    ('2025-01-14', 'Sankranti/ Pongal', 0),
+    ('2025-02-27', 'Mahashivarathri/ following day', 0),
+    ('2025-03-31', 'Ramzan', 0),
+    ('2025-04-18', 'Good Friday', 0),
+    ('2025-08-15', 'Independence Day', 0),
+    ('2025-08-27', 'Vinayaka Chavithi', 0),
+    ('2025-10-02', 'Gandhi Jayanthi/ Vijaya Dasami', 0),
+    ('2025-10-21', 'Deepavali', 0),
+    ('2025-12-25', 'Christmas Day', 0),
+    ('2025-01-15', 'Kanuma', 1),
+    ('2025-01-26', 'Republic Day', 1),
+    ('2025-03-30', 'Ugadi', 1),
+    ('2025-06-07', 'Bakrid', 1),
+    ('2025-09-06', 'Vinayaka Nimajjanam', 1),
+]
+WEEKEND = (5, 6)  # Saturday, Sunday
+# Leave types that do not take the employee out of work. WFH still occupies
+# the calendar for overlap checks; a Comp-off names a day already worked.
+NOT_ABSENT_TYPES = ('WFH', 'Comp-off')
+INACTIVE_STATUSES = ('Rejected', 'Cancelled')
+MAX_SPAN_DAYS = 366
+
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS holidays (
+        date TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        optional INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID''',
+    'ALTER TABLE leave_applications ADD COLUMN leave_days INTEGER',
+    # 1-D R*Tree over active leave intervals, keyed by leave_applications rowid.
+    'CREATE VIRTUAL TABLE IF NOT EXISTS leave_intervals USING rtree_i32(id, start_day, end_day)',
+]
+
+
+def _interval_columns(row):
+    """SQL for (id, start_day, end_day) and the "is indexed" condition of a leave row.
+
+    For the TEXT date columns migrations 7-8 run against; see
+    ``_day_interval_columns`` for the current layout.
+    """
+    prefix = f"{row}." if row else ''
+    from_date, to_date = f"{prefix}from_date", f"COALESCE({prefix}to_date, {prefix}from_date)"
+    values = (f"{prefix}rowid, CAST(julianday({from_date}) - {JULIAN_ORDINAL_OFFSET} AS INTEGER), "
+              f"CAST(julianday({to_date}) - {JULIAN_ORDINAL_OFFSET} AS INTEGER)")
+    active = (f"{prefix}status NOT IN ({', '.join(repr(s) for s in INACTIVE_STATUSES)})"
+              f" AND {prefix}leave_type != 'Comp-off'"
+              f" AND julianday({from_date}) IS NOT NULL"
+              f" AND julianday({to_date}) >= julianday({from_date})")
+    return values, active
+
+
+def _day_interval_columns(row):
+    """Like ``_interval_columns`` for the day-ordinal columns of migration 9."""
+    prefix = f"{row}." if row else ''
+    values = f"{prefix}id, {prefix}from_day, COALESCE({prefix}to_day, {prefix}from_day)"
+    active = (f"{prefix}status NOT IN ({', '.join(repr(s) for s in INACTIVE_STATUSES)})"
+              f" AND {prefix}leave_type != 'Comp-off'"
+              f" AND COALESCE({prefix}to_day, {prefix}from_day) >= {prefix}from_day")
+    return values, active
+
+
+def _employee_interval_columns(row):
+    """Like ``_day_interval_columns``, plus the employee as a second dimension."""
+    values, active = _day_interval_columns(row)
+    prefix = f"{row}." if row else ''
+    return f"{values}, {prefix}emp_no, {prefix}emp_no", active
+
+
+def _interval_triggers(columns=_interval_columns, watched='from_date, to_date, status, leave_type',
+                       names='id, start_day, end_day'):
+    values, active = columns('NEW')
+    insert = f"INSERT INTO leave_intervals ({names}) VALUES ({values});"
+    return [
+        f'''CREATE TRIGGER trg_leave_intervals_insert AFTER INSERT ON leave_applications
+           WHEN {active}
+           BEGIN {insert} END''',
+        f'''CREATE TRIGGER trg_leave_intervals_update_clear
+           AFTER UPDATE OF {watched} ON leave_applications
+           BEGIN DELETE FROM leave_intervals WHERE id = OLD.rowid; END''',
+        f'''CREATE TRIGGER trg_leave_intervals_update_add
+           AFTER UPDATE OF {watched} ON leave_applications
+           WHEN {active}
+           BEGIN {insert} END''',
+        '''CREATE TRIGGER trg_leave_intervals_delete AFTER DELETE ON leave_applications
+           BEGIN DELETE FROM leave_intervals WHERE id = OLD.rowid; END''',
+    ]
+
+
+def migration_steps():
+    def seed(conn):
+        conn.executemany("INSERT OR IGNORE INTO holidays (date, name, optional) VALUES (?, ?, ?)",
+                         HOLIDAYS_2025)
+        # Existing rows: index the intervals, then charge days with the new calendar.
+        values, active = _interval_columns(None)
+        conn.execute(f"INSERT INTO leave_intervals (id, start_day, end_day) "
+                     f"SELECT {values} FROM leave_applications WHERE {active}")
+        calendar = HolidayCalendar.from_db(conn)
+        rows = conn.execute(
+            "SELECT rowid, leave_type, from_date, to_date FROM leave_applications"
+        ).fetchall()
+        updates = []
+        for rowid, leave_type, from_date, to_date in rows:
+            try:
+                start, end = parse_range(from_date, to_date)
+            except ValueError:
+                continue
+            updates.append((calendar.chargeable_days(leave_type, start, end), rowid))
+        conn.executemany("UPDATE leave_applications SET leave_days = ? WHERE rowid = ?", updates)
+    return [*SCHEMA, *_interval_triggers(), seed]
+
+
+def day_interval_steps():
+    """Re-create the interval triggers and index for the migration 9 layout."""
+    values, active = _day_interval_columns(None)
+    return [
+        *_interval_triggers(_day_interval_columns, 'from_day, to_day, status, leave_type'),
+        'DELETE FROM leave_intervals',
+        f"INSERT INTO leave_intervals (id, start_day, end_day) SELECT {values} FROM leave_applications WHERE {active}",
+    ]
+
+
+def employee_interval_steps():
+    """Rebuild leave_intervals as a 2-D index over (day range, employee).
+
+    With the employee as a dimension, an overlap check for one employee is a
+    single R*Tree range search instead of a walk over that employee's leave
+    with one interval lookup per row.
+    """
+    values, active = _employee_interval_columns(None)
+    names = 'id, start_day, end_day, min_emp, max_emp'
+    return [
+        *(f"DROP TRIGGER IF EXISTS trg_leave_intervals_{name}" for name in ('insert', 'update_clear', 'update_add', 'delete')),
+        'DROP TABLE leave_intervals',
+        'CREATE VIRTUAL TABLE leave_intervals USING rtree_i32(id, start_day, end_day, min_emp, max_emp)',
+        *_interval_triggers(_employee_interval_columns, 'from_day, to_day, status, leave_type, emp_no', names),
+        f"INSERT INTO leave_intervals ({names}) SELECT {values} FROM leave_applications WHERE {active}",
+    ]
+
+
+# Every change to the holidays table bumps this id_sequences row, so worker
+# processes can tell their cached calendar is stale with one lookup.
+HOLIDAY_VERSION_STEPS = [
+    "INSERT OR IGNORE INTO id_sequences (name, next_value) VALUES ('holidays_version', 0)",
+    *(f'''CREATE TRIGGER trg_holidays_version_{event.lower()} AFTER {event} ON holidays
+         BEGIN UPDATE id_sequences SET next_value = next_value + 1 WHERE name = 'holidays_version'; END'''
+      for event in ('INSERT', 'UPDATE', 'DELETE')),
+]
+
+
+def holidays_version(conn):
+    row = conn.execute("SELECT next_value FROM id_sequences WHERE name = 'holidays_version'").fetchone()
+    return row[0] if row else 0
+
+
+def set_year_holidays(conn, year, holidays):
+    """Replace ``year``'s holidays and re-charge the leave that touches that year.
+
+    ``holidays`` is a list of (date, name, optional). Runs in ``conn``'s
+    transaction; returns the number of applications whose leave_days changed.
+    """
+    first, last = date(year, 1, 1), date(year, 12, 31)
+    conn.execute("DELETE FROM holidays WHERE date BETWEEN ? AND ?", (first.isoformat(), last.isoformat()))
+    conn.executemany("INSERT INTO holidays (date, name, optional) VALUES (?, ?, ?)",
+                     [(day.isoformat(), name, int(bool(optional))) for day, name, optional in holidays])
+    calendar = HolidayCalendar.from_db(conn)
+    rows = conn.execute(
+        '''SELECT id, leave_type, from_day, COALESCE(to_day, from_day), leave_days FROM leave_applications
+           WHERE from_day <= ? AND COALESCE(to_day, from_day) >= ?''',
+        (last.toordinal(), first.toordinal())
+    ).fetchall()
+    updates = []
+    for leave_id, leave_type, from_day, to_day, leave_days in rows:
+        if to_day < from_day:
+            continue
+        charged = calendar.chargeable_days(leave_type, date.fromordinal(from_day), date.fromordinal(to_day))
+        if charged != leave_days:
+            updates.append((charged, leave_id))
+    conn.executemany("UPDATE leave_applications SET leave_days = ? WHERE id = ?", updates)
+    return len(updates)
+
+
+def parse_range(from_date, to_date=None):
+    """Parse ISO from/to strings; a missing to_date means a single day."""
+    # Values come straight from JSON bodies, where a date may arrive as a number.
+    if not isinstance(from_date, str) or not isinstance(to_date, (str, type(None))):
+        raise ValueError("dates must be YYYY-MM-DD strings")
+    start = date.fromisoformat(from_date)
+    end = date.fromisoformat(to_date) if to_date else start
+    if end < start:
+        raise ValueError("to_date is before from_date")
+    if (end - start).days >= MAX_SPAN_DAYS:
+        raise ValueError(f"Date range cannot exceed {MAX_SPAN_DAYS} days")
+    return start, end
+
+
+# --- Calendar ---
+class _CompiledYear:
+    __slots__ = ('first', 'off', 'working_before')
+
+    def __init__(self, year, holidays):
+        self.first = date(year, 1, 1).toordinal()
+        # Up to December 31st rather than the next January 1st, which does not exist for 9999.
+        size = date(year, 12, 31).toordinal() + 1 - self.first
+        self.off = bytearray(size)
+        for offset in range(size):
+            if date.fromordinal(self.first + offset).weekday() in WEEKEND:
+                self.off[offset] = 1
+        for day in holidays:
+            if day.year == year:
+                self.off[day.toordinal() - self.first] = 1
+        # working_before[i] = working days in the year before day i.
+        self.working_before = [0] * (size + 1)
+        for offset in range(size):
+            self.working_before[offset + 1] = self.working_before[offset] + (not self.off[offset])
+
+
+class HolidayCalendar:
+    """Working-day arithmetic over weekends and company holidays.
+
+    Each year is compiled once into an off-day bitmap plus a running count
+    of working days, so "working days between two dates" is two lookups per
+    calendar year spanned instead of a walk over every day.
+    """
+
+    def __init__(self, holidays):
+        # holidays: iterable of (date, name, optional)
+        self.holidays = sorted((day, name, bool(optional)) for day, name, optional in holidays)
+        self._days_off = {day for day, _, optional in self.holidays if not optional}
+        self._configured_years = {day.year for day, _, _ in self.holidays}
+        self._years = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_db(cls, conn):
+        rows = conn.execute("SELECT date, name, optional FROM holidays").fetchall()
+        return cls((date.fromisoformat(row[0]), row[1], row[2]) for row in rows)
+
+    def _year(self, year):
+        compiled = self._years.get(year)
+        if compiled is None:
+            with self._lock:
+                compiled = self._years.get(year)
+                if compiled is None:
+                    if year not in self._configured_years:
+                        logger.warning("No holidays configured for %s; counting weekends only", year)
+                    compiled = self._years[year] = _CompiledYear(year, self._days_off)
+        return compiled
+
+    def is_working_day(self, day):
+        compiled = self._year(day.year)
+        return not compiled.off[day.toordinal() - compiled.first]
+
+    def working_days(self, start, end):
+        """Working days from ``start`` to ``end``, both inclusive."""
+        total = 0
+        for year in range(start.year, end.year + 1):
+            compiled = self._year(year)
+            first = start.toordinal() - compiled.first if year == start.year else 0
+            last = end.toordinal() - compiled.first + 1 if year == end.year else len(compiled.off)
+            total += compiled.working_before[last] - compiled.working_before[first]
+        return total
+
+    def chargeable_days(self, leave_type, start, end):
+        """Leave days an application uses up; WFH and Comp-off charge none."""
+        if leave_type in NOT_ABSENT_TYPES:
+            return 0
+        return self.working_days(start, end)
+
+    def holidays_between(self, start, end):
+        return [
+            {'date': day.isoformat(), 'name': name, 'optional': optional}
+            for day, name, optional in self.holidays if start <= day <= end
+        ]
+
+
+# --- Interval Queries ---
+def team_availability(department, day, rows, team_size):
+    """Who in ``department`` is on leave or working from home on ``day``, from Repository.team_on_leave() ``rows``."""
+    off, wfh = [], []
+    for row in rows:
+        entry = dict(row)
+        entry['employee_name'] = f"{entry.pop('first_name')} {entry.pop('last_name')}"
+        (wfh if entry['leave_type'] == 'WFH' else off).append(entry)
+    return {
+        'department': department,
+        'date': day.isoformat(),
+        'team_size': team_size,
+        'off': off,
+        'wfh': wfh,
+        'available': team_size - len({entry['employee_id'] for entry in off}),
+    }
+
+
+# --- Flask Integration ---
+def init_app(app):
+    app.config.setdefault('HOLIDAY_RECHECK_SECONDS', 30)
+    # (calendar, holidays_version, monotonic time of the last version check)
+    app.extensions['leave_calendar'] = None
+    app.extensions['leave_calendar_lock'] = threading.Lock()
+
+
+def get_calendar(app=None):
+    """The process-wide calendar, loaded from the holidays table on first use.
+
+    At most every HOLIDAY_RECHECK_SECONDS the holidays version is compared
+    with the database, so holidays changed by another process are picked up.
+    """
+    app = app or current_app._get_current_object()
+    state = app.extensions['leave_calendar']
+    if state is None or time.monotonic() - state[2] >= app.config['HOLIDAY_RECHECK_SECONDS']:
+        with app.extensions['leave_calendar_lock']:
+            state = app.extensions['leave_calendar']
+            now = time.monotonic()
+            if state is None or now - state[2] >= app.config['HOLIDAY_RECHECK_SECONDS']:
+                with db.connection(app, readonly=True) as conn:
+                    version = holidays_version(conn)
+                    calendar = state[0] if state is not None and state[1] == version else HolidayCalendar.from_db(conn)
+                state = app.extensions['leave_calendar'] = (calendar, version, now)
+    return state[0]
+
+
+def invalidate_calendar(app=None):
+    """Reload the calendar on next use (call after committing a holidays change)."""
+    app = app or current_app._get_current_object()
+    app.extensions['leave_calendar'] = None
@@ -0,0 +1,254 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from email.message import EmailMessage
+
+from flask import current_app, g, has_app_context
+from flask_mail import Message
+
+import db
+from metrics import record_span
+
+logger = logging.getLogger(__name__)
+
+
+# --- Transports ---
+class FlaskMailTransport:
+    """Send through Flask-Mail, reusing one SMTP connection per batch."""
+
+    def __init__(self, mail):
+        self.mail = mail
+
+    def send_batch(self, messages):
+        """Send ``messages`` and return one exception (or None) per message."""
+        results = []
+        with self.mail.connect() as smtp:
+            for message in messages:
+                try:
+                    smtp.send(Message(message['subject'], recipients=message['recipients'],
+                                      body=message['body']))
+                    results.append(None)
+                except Exception as e:
+                    results.append(e)
+        return results
+
+
+class FileTransport:
+    """Write each message as an .eml file; for development and tests."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def send_batch(self, messages):
+        os.makedirs(self.directory, exist_ok=True)
+        sender = current_app.config.get('MAIL_DEFAULT_SENDER') or 'hrms@localhost'
+        results = []
+        for message in messages:
+            email = EmailMessage()
+            email['From'] = sender
+            email['To'] = ', '.join(message['recipients'])
+            email['Subject'] = message['subject']
+            email.set_content(message['body'])
+            path = os.path.join(self.directory, f"{message['id']}-{uuid.uuid4().hex[:8]}.eml")
+            try:
+                with open(path, 'w') as f:
+                    f.write(email.as_string())
+                results.append(None)
+            except OSError as e:
+                results.append(e)
+        return results
+
+
+# --- Outbox ---
+class MailOutbox:
+    """Durable outbound mail queue drained by a pool of sender threads.
+
+    Requests call ``enqueue`` inside their own transaction, so a message is
+    only ever queued if the change it describes commits. Workers claim due
+    rows in batches, hand each batch to the transport, and reschedule
+    failures with exponential backoff until ``max_attempts`` is reached.
+    A claim is a lease: rows left in 'sending' by a crashed worker become
+    claimable again once ``lease_seconds`` have passed.
+    """
+
+    def __init__(self, app, transport, workers=2, batch_size=20, poll_interval=5.0,
+                 max_attempts=5, backoff_seconds=30.0, lease_seconds=300.0):
+        self.app = app
+        self.transport = transport
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.lease_seconds = lease_seconds
+        self.counters = {'sent': 0, 'retried': 0, 'failed': 0}
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def enqueue(self, conn, recipients, subject, body):
+        """Queue a message on ``conn``; it is sent after the caller commits."""
+        cursor = conn.execute(
+            '''INSERT INTO mail_outbox (recipients, subject, body, next_attempt_at)
+               VALUES (?, ?, ?, ?)''',
+            (json.dumps(list(recipients)), subject, body, time.time())
+        )
+        if has_app_context():
+            g.mail_enqueued = True
+        return cursor.lastrowid
+
+    def wake(self):
+        self.ensure_started()
+        self._wakeup.set()
+
+    def ensure_started(self):
+        # Threads do not survive fork, so each worker process starts its own.
+        if self.workers <= 0 or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._threads = [
+                threading.Thread(target=self._run, name=f'mail-outbox-{i}', daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._pid = None
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                handled = self.process_once()
+            except Exception:
+                logger.exception("Mail outbox worker failed")
+                handled = 0
+            if handled < self.batch_size:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def process_once(self):
+        """Claim and send one batch of due messages. Returns the batch size."""
+        now = time.time()
+        with db.connection(self.app) as conn:
+            rows = conn.execute(
+                '''UPDATE mail_outbox
+                   SET status = 'sending', attempts = attempts + 1, claimed_until = ?
+                   WHERE id IN (
+                       SELECT id FROM mail_outbox
+                       WHERE (status = 'pending' AND next_attempt_at <= ?)
+                          OR (status = 'sending' AND claimed_until < ?)
+                       ORDER BY next_attempt_at LIMIT ?
+                   )
+                   RETURNING id, recipients, subject, body, attempts''',
+                (now + self.lease_seconds, now, now, self.batch_size)
+            ).fetchall()
+            conn.commit()
+        if not rows:
+            return 0
+        messages = [
+            {'id': row['id'], 'recipients': json.loads(row['recipients']),
+             'subject': row['subject'], 'body': row['body'], 'attempts': row['attempts']}
+            for row in rows
+        ]
+        with self.app.app_context():
+            start = time.perf_counter()
+            try:
+                results = self.transport.send_batch(messages)
+            except Exception as e:
+                # Connection-level failure: every message in the batch is retried.
+                results = [e] * len(messages)
+            record_span('mail_send_batch', time.perf_counter() - start)
+        self._record_results(messages, results)
+        return len(messages)
+
+    def _record_results(self, messages, results):
+        now = time.time()
+        with db.connection(self.app) as conn:
+            for message, error in zip(messages, results):
+                if error is None:
+                    # The body can hold a temporary password; do not keep it around.
+                    conn.execute(
+                        '''UPDATE mail_outbox SET status = 'sent', body = NULL, last_error = NULL,
+                           claimed_until = NULL, sent_at = CURRENT_TIMESTAMP WHERE id = ?''',
+                        (message['id'],)
+                    )
+                    self._count('sent')
+                elif message['attempts'] >= self.max_attempts:
+                    conn.execute(
+                        '''UPDATE mail_outbox SET status = 'failed', body = NULL, last_error = ?,
+                           claimed_until = NULL WHERE id = ?''',
+                        (str(error), message['id'])
+                    )
+                    self._count('failed')
+                    logger.error("Giving up on mail %s after %s attempts: %s",
+                                 message['id'], message['attempts'], error)
+                else:
+                    delay = self.backoff_seconds * 2 ** (message['attempts'] - 1)
+                    delay *= random.uniform(0.8, 1.2)
+                    conn.execute(
+                        '''UPDATE mail_outbox SET status = 'pending', last_error = ?,
+                           claimed_until = NULL, next_attempt_at = ? WHERE id = ?''',
+                        (str(error), now + delay, message['id'])
+                    )
+                    self._count('retried')
+            conn.commit()
+
+    def _count(self, key):
+        with self._lock:
+            self.counters[key] += 1
+
+    def stats(self):
+        with db.connection(self.app, readonly=True) as conn:
+            by_status = dict(conn.execute(
+                "SELECT status, COUNT(*) FROM mail_outbox GROUP BY status"
+            ).fetchall())
+        with self._lock:
+            return {'queued': by_status, **self.counters}
+
+
+# --- Flask Integration ---
+def init_app(app, mail):
+    app.config.setdefault('MAIL_TRANSPORT', 'smtp')
+    app.config.setdefault('MAIL_OUTBOX_DIR', 'mail_outbox')
+    app.config.setdefault('MAIL_WORKERS', 2)
+    app.config.setdefault('MAIL_BATCH_SIZE', 20)
+    app.config.setdefault('MAIL_MAX_ATTEMPTS', 5)
+    if app.config['MAIL_TRANSPORT'] == 'file':
+        transport = FileTransport(app.config['MAIL_OUTBOX_DIR'])
+    else:
+        transport = FlaskMailTransport(mail)
+    outbox = MailOutbox(
+        app, transport,
+        workers=app.config['MAIL_WORKERS'],
+        batch_size=app.config['MAIL_BATCH_SIZE'],
+        max_attempts=app.config['MAIL_MAX_ATTEMPTS'],
+    )
+    app.extensions['mail_outbox'] = outbox
+    app.before_request(outbox.ensure_started)
+    app.teardown_appcontext(_wake_after_commit)
+    return outbox
+
+
+def get_outbox(app=None):
+    return (app or current_app).extensions['mail_outbox']
+
+
+def _wake_after_commit(exception=None):
+    if g.pop('mail_enqueued', False):
+        get_outbox().wake()
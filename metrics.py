@@ -0,0 +1,323 @@
+import cProfile
+import io
+import logging
+import pstats
+import random
+import sqlite3
+import threading
+import time
+from collections import defaultdict, deque
+
+from flask import current_app, g, has_app_context, has_request_context, request
+
+slow_query_logger = logging.getLogger('hrms.slow_query')
+# One sampled profile at a time per process: from Python 3.12 cProfile sits on
+# sys.monitoring, and enabling a second profiler while one runs raises ValueError.
+_profiler_slot = threading.Lock()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+# --- Primitives ---
+class Histogram:
+    """Cumulative-bucket histogram per label set, rendered in Prometheus text format."""
+
+    def __init__(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0, 0.0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: (list(counts), count, total) for labels, (counts, count, total) in self._series.items()}
+        for labels, (counts, count, total) in sorted(series.items()):
+            base = _labels(self.label_names, labels)
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le=bound)} {bucket_count}")
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le='+Inf')} {count}")
+            lines.append(f"{self.name}_sum{base} {total:.6f}")
+            lines.append(f"{self.name}_count{base} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] += amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {value:g}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, le=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _gauge(name, help_text, samples):
+    """Render a gauge from [(labels dict, value)]."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    for labels, value in samples:
+        lines.append(f"{name}{_labels(list(labels), list(labels.values()))} {value:g}")
+    return lines
+
+
+# --- SQL Timing ---
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that reports each statement's execute (and fetch) time.
+
+    Stepping through rows runs the rest of the statement, so every way of
+    reading them (fetchone, fetchmany, fetchall, iteration) is timed too.
+    """
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _record_statement(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _record_statement(sql, time.perf_counter() - start)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            _record_fetch(time.perf_counter() - start)
+
+    def fetchall(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            _record_fetch(time.perf_counter() - start)
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            _record_fetch(time.perf_counter() - start)
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            return super().__next__()
+        finally:
+            _record_fetch(time.perf_counter() - start)
+
+
+class TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    # The C-level shortcuts build a plain Cursor, so route them through ours.
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def _registry():
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('metrics')
+
+
+def _record_statement(sql, seconds):
+    registry = _registry()
+    if registry is None:
+        return
+    verb = sql.split(None, 1)[0].upper() if sql.strip() else 'EMPTY'
+    registry.sql_seconds.observe((verb,), seconds)
+    if has_request_context():
+        g.metrics_sql_count = g.get('metrics_sql_count', 0) + 1
+        g.metrics_sql_seconds = g.get('metrics_sql_seconds', 0.0) + seconds
+    if seconds * 1000 >= registry.slow_query_ms:
+        registry.record_slow_query(sql, seconds)
+
+
+def _record_fetch(seconds):
+    if has_request_context() and 'metrics_sql_seconds' in g:
+        g.metrics_sql_seconds += seconds
+
+
+def record_span(name, seconds):
+    """Time a named piece of work (password hashing, mail batches) if metrics are on."""
+    registry = _registry()
+    if registry is not None:
+        registry.span_seconds.observe((name,), seconds)
+
+
+# --- Registry ---
+class Metrics:
+    """Per-process request, SQL and span metrics.
+
+    Each worker process keeps its own numbers; scrape every worker (or run
+    one) to see the whole picture.
+    """
+
+    def __init__(self, slow_query_ms=100, slow_request_ms=500, profile_sample_rate=0.0,
+                 profile_keep=20, slow_query_keep=100):
+        self.slow_query_ms = slow_query_ms
+        self.slow_request_ms = slow_request_ms
+        self.profile_sample_rate = profile_sample_rate
+        self.request_seconds = Histogram(
+            'hrms_http_request_duration_seconds', 'Request latency by endpoint.',
+            ('endpoint', 'method', 'status'))
+        self.request_sql_statements = Counter(
+            'hrms_http_request_sql_statements_total', 'SQL statements issued, by endpoint.', ('endpoint',))
+        self.request_sql_seconds = Counter(
+            'hrms_http_request_sql_seconds_total', 'Time spent in SQLite, by endpoint.', ('endpoint',))
+        self.sql_seconds = Histogram(
+            'hrms_sql_statement_duration_seconds', 'SQL statement execute time by verb.',
+            ('verb',), SQL_BUCKETS)
+        self.span_seconds = Histogram(
+            'hrms_span_duration_seconds', 'Time spent in named operations.', ('span',))
+        self.slow_queries_total = Counter(
+            'hrms_slow_queries_total', 'Statements slower than the slow-query threshold.', ())
+        self.slow_queries = deque(maxlen=slow_query_keep)
+        self.slow_profiles = deque(maxlen=profile_keep)
+        self._lock = threading.Lock()
+
+    def record_slow_query(self, sql, seconds):
+        endpoint = request.endpoint if has_request_context() else None
+        statement = ' '.join(sql.split())
+        self.slow_queries_total.inc(())
+        with self._lock:
+            self.slow_queries.append({'at': time.time(), 'ms': round(seconds * 1000, 2),
+                                      'endpoint': endpoint, 'sql': statement})
+        slow_query_logger.warning("%.1f ms [%s] %s", seconds * 1000, endpoint, statement)
+
+    # Request hooks
+    def before_request(self):
+        g.metrics_started = time.perf_counter()
+        g.metrics_sql_count = 0
+        g.metrics_sql_seconds = 0.0
+        if (self.profile_sample_rate and random.random() < self.profile_sample_rate
+                and _profiler_slot.acquire(blocking=False)):
+            # Another request is being profiled otherwise; this one goes unsampled.
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Some other profiler (a debugger, coverage) is already active.
+                _profiler_slot.release()
+            else:
+                g.metrics_profiler = profiler
+
+    def after_request(self, response):
+        g.metrics_status = response.status_code
+        return response
+
+    def teardown_request(self, exception=None):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        profiler = g.pop('metrics_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            _profiler_slot.release()
+        endpoint = request.endpoint or 'unmatched'
+        status = g.pop('metrics_status', 500)
+        self.request_seconds.observe((endpoint, request.method, str(status)), elapsed)
+        self.request_sql_statements.inc((endpoint,), g.pop('metrics_sql_count', 0))
+        self.request_sql_seconds.inc((endpoint,), g.pop('metrics_sql_seconds', 0.0))
+        if profiler is not None and elapsed * 1000 >= self.slow_request_ms:
+            self._keep_profile(profiler, endpoint, elapsed)
+
+    def _keep_profile(self, profiler, endpoint, elapsed):
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(25)
+        with self._lock:
+            self.slow_profiles.append({'at': time.time(), 'endpoint': endpoint, 'path': request.path,
+                                       'ms': round(elapsed * 1000, 1), 'profile': out.getvalue()})
+
+    def render(self, gauges=()):
+        lines = []
+        for metric in (self.request_seconds, self.request_sql_statements, self.request_sql_seconds,
+                       self.sql_seconds, self.span_seconds, self.slow_queries_total):
+            lines += metric.render()
+        for name, help_text, samples in gauges:
+            lines += _gauge(name, help_text, samples)
+        return '\n'.join(lines) + '\n'
+
+    def slow_report(self):
+        with self._lock:
+            return {'slow_query_ms': self.slow_query_ms, 'slow_request_ms': self.slow_request_ms,
+                    'profile_sample_rate': self.profile_sample_rate,
+                    'slow_queries': list(self.slow_queries), 'slow_requests': list(self.slow_profiles)}
+
+
+# --- Flask Integration ---
+def init_app(app):
+    """Install the request hooks and timed SQLite connections when METRICS_ENABLED.
+
+    Call before the first database connection is opened so this app's
+    pooled connections are created with the timing cursor; other apps in
+    the process keep plain connections.
+    """
+    app.config.setdefault('METRICS_ENABLED', False)
+    app.config.setdefault('METRICS_SLOW_QUERY_MS', 100)
+    app.config.setdefault('METRICS_SLOW_REQUEST_MS', 500)
+    app.config.setdefault('METRICS_PROFILE_SAMPLE_RATE', 0.0)
+    if not app.config['METRICS_ENABLED']:
+        return None
+    registry = Metrics(
+        slow_query_ms=app.config['METRICS_SLOW_QUERY_MS'],
+        slow_request_ms=app.config['METRICS_SLOW_REQUEST_MS'],
+        profile_sample_rate=app.config['METRICS_PROFILE_SAMPLE_RATE'],
+    )
+    app.extensions['metrics'] = registry
+    app.extensions['db_connection_factory'] = TimedConnection
+    app.before_request(registry.before_request)
+    app.after_request(registry.after_request)
+    app.teardown_request(registry.teardown_request)
+    return registry
+
+
+def get_metrics(app=None):
+    return (app or current_app).extensions.get('metrics')
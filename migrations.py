@@ -0,0 +1,185 @@
+import attendance_rollups
+import broadcasts
+import compact_storage
+import leave_calendar
+import profile_cache
+import retention
+
+# Millisecond UTC timestamp used for updated_at change tracking.
+NOW_MS = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+
+def _change_tracking_steps(table, key, backfill):
+    """Add an updated_at column to ``table`` that triggers keep current.
+
+    Existing rows are backfilled from ``backfill``. ALTER TABLE cannot add a
+    column with a non-constant default, so inserts are stamped by an AFTER
+    INSERT trigger instead.
+    """
+    return [
+        f"ALTER TABLE {table} ADD COLUMN updated_at TEXT",
+        f"UPDATE {table} SET updated_at = COALESCE({backfill}, {NOW_MS})",
+        f'''CREATE TRIGGER trg_{table}_stamp_insert AFTER INSERT ON {table}
+           WHEN NEW.updated_at IS NULL
+           BEGIN
+               UPDATE {table} SET updated_at = {NOW_MS} WHERE rowid = NEW.rowid;
+           END''',
+        f'''CREATE TRIGGER trg_{table}_stamp_update AFTER UPDATE ON {table}
+           WHEN NEW.updated_at IS OLD.updated_at
+           BEGIN
+               UPDATE {table} SET updated_at = {NOW_MS} WHERE rowid = NEW.rowid;
+           END''',
+        f"CREATE INDEX idx_{table}_employee_changes ON {table} (employee_id, updated_at, {key})",
+    ]
+
+
+# --- Schema Migrations ---
+# Each entry is (version, description, steps). A step is either a SQL string
+# or a callable taking the connection. The applied version is stored in
+# PRAGMA user_version, so migrations run once per database file and in order.
+# Never edit a migration that has shipped; append a new one instead.
+MIGRATIONS = [
+    (1, "Index the hot per-employee query paths", [
+        '''CREATE INDEX IF NOT EXISTS idx_attendance_employee_date
+           ON attendance_records (employee_id, date DESC, login_time DESC)''',
+        '''CREATE INDEX IF NOT EXISTS idx_notifications_employee_read
+           ON notifications (employee_id, is_read, timestamp)''',
+        '''CREATE INDEX IF NOT EXISTS idx_notifications_employee_timestamp
+           ON notifications (employee_id, timestamp DESC)''',
+        '''CREATE INDEX IF NOT EXISTS idx_leave_employee_submitted
+           ON leave_applications (employee_id, submitted_at DESC)''',
+    ]),
+    (2, "Track row changes and add keyset-pagination indexes", [
+        *_change_tracking_steps(
+            'attendance_records', 'record_id',
+            # date/login_time are server local time; updated_at is UTC.
+            "strftime('%Y-%m-%d %H:%M:%f', date || ' ' || COALESCE(logout_time, login_time), 'utc')"
+        ),
+        *_change_tracking_steps(
+            'notifications', 'notification_id', "strftime('%Y-%m-%d %H:%M:%f', timestamp)"
+        ),
+        *_change_tracking_steps(
+            'leave_applications', 'record_id', "strftime('%Y-%m-%d %H:%M:%f', submitted_at)"
+        ),
+        # Replace the migration 1 listing indexes with ones that include the
+        # tie-break key, so keyset pages are served straight off the index.
+        'DROP INDEX IF EXISTS idx_attendance_employee_date',
+        '''CREATE INDEX idx_attendance_employee_date
+           ON attendance_records (employee_id, date DESC, login_time DESC, record_id DESC)''',
+        'DROP INDEX IF EXISTS idx_notifications_employee_timestamp',
+        '''CREATE INDEX idx_notifications_employee_timestamp
+           ON notifications (employee_id, timestamp DESC, notification_id DESC)''',
+        'DROP INDEX IF EXISTS idx_leave_employee_submitted',
+        '''CREATE INDEX idx_leave_employee_submitted
+           ON leave_applications (employee_id, submitted_at DESC, record_id DESC)''',
+    ]),
+    (3, "Index notifications for the SSE stream", [
+        # A single-column index keeps rowid as its implicit trailing key, so
+        # "employee_id = ? AND rowid > ?" is a range seek over new rows only.
+        'CREATE INDEX IF NOT EXISTS idx_notifications_employee_stream ON notifications (employee_id)',
+    ]),
+    (4, "Add the outbound mail outbox", [
+        '''CREATE TABLE IF NOT EXISTS mail_outbox (
+            id INTEGER PRIMARY KEY,
+            recipients TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            body TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            claimed_until REAL,
+            last_error TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            sent_at DATETIME
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_mail_outbox_due ON mail_outbox (status, next_attempt_at)',
+    ]),
+    (5, "Allocate employee ids from a sequence", [
+        '''CREATE TABLE IF NOT EXISTS id_sequences (
+            name TEXT PRIMARY KEY,
+            next_value INTEGER NOT NULL
+        )''',
+        # Seeded once from the old MAX scan; allocation is a single-row update from here on.
+        '''INSERT OR IGNORE INTO id_sequences (name, next_value)
+           SELECT 'employees', COALESCE(MAX(CAST(SUBSTR(id, 5) AS INTEGER)), 1000) + 1
+           FROM employees WHERE id LIKE 'SSQ-%' ''',
+    ]),
+    (6, "Add attendance rollup tables", [
+        *attendance_rollups.SCHEMA,
+        attendance_rollups.rebuild_rollups_from_text,
+    ]),
+    (7, "Add the holiday calendar and leave interval index", leave_calendar.migration_steps()),
+    (8, "Store broadcast notification bodies once", broadcasts.SCHEMA),
+    (9, "Integer keys and numeric dates for attendance, notifications and leave", [
+        *compact_storage.migration_steps(),
+        *leave_calendar.day_interval_steps(),
+        attendance_rollups.rebuild_rollups,
+    ]),
+    (10, "Add archive tables for retention", retention.SCHEMA),
+    (11, "Index leave intervals by employee and version the holiday calendar", [
+        *leave_calendar.employee_interval_steps(),
+        *leave_calendar.HOLIDAY_VERSION_STEPS,
+    ]),
+    (12, "Skip taken numbers when assigning emp_no to new employees", compact_storage.emp_no_trigger_steps()),
+    (13, "Keep row counts for the retention tables", retention.ROW_COUNT_STEPS),
+    (14, "Count each attendance day under the department of its first session",
+     attendance_rollups.DAY_DEPARTMENT_STEPS),
+    (15, "Version employee rows for the profile cache", profile_cache.PROFILE_VERSION_STEPS),
+]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def apply_migrations(conn, migrations=MIGRATIONS, target=None):
+    """Bring the database up to the latest schema version (or ``target``).
+
+    Every migration runs in its own IMMEDIATE transaction together with the
+    user_version bump, so a failed step leaves the database at the previous
+    version. Returns the list of versions that were applied.
+    """
+    applied = []
+    for version, description, steps in migrations:
+        if target is not None and version > target:
+            break
+        if version <= schema_version(conn):
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-check under the write lock in case another process got here first.
+            if version <= schema_version(conn):
+                conn.rollback()
+                continue
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except Exception:
+            # Callable steps can fail with any exception; none may leave a
+            # half-applied migration in an open transaction.
+            conn.rollback()
+            raise
+        applied.append(version)
+    if applied:
+        conn.execute("PRAGMA optimize")
+    return applied
+
+
+# --- Query Plan Checks ---
+def explain(conn, sql, params=()):
+    """Return the EXPLAIN QUERY PLAN detail lines for a statement."""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+
+
+def full_scans(plan):
+    """Return the plan lines that walk a whole table instead of using an index."""
+    return [
+        detail for detail in plan
+        if detail.startswith('SCAN ') and 'USING' not in detail and 'CONSTANT ROW' not in detail
+        # A virtual table (R*Tree) with a non-zero index number is using its own index.
+        and not ('VIRTUAL TABLE INDEX' in detail and 'VIRTUAL TABLE INDEX 0:' not in detail)
+    ]
@@ -0,0 +1,91 @@
+import base64
+import json
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+class PageRequest:
+    """Paging parameters parsed from a history endpoint's query string.
+
+    ``after`` is the decoded keyset cursor of the last row on the previous
+    page. ``since`` is a decoded watermark; when it is set the endpoint
+    returns only rows changed after it, oldest change first.
+    """
+
+    def __init__(self, limit, after=None, since=None):
+        self.limit = limit
+        self.after = after
+        self.since = since
+
+    @property
+    def incremental(self):
+        return self.since is not None
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, size):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    # Keys are integers since the compact storage layout; older text cursors are rejected.
+    if not all(isinstance(value, int) and not isinstance(value, bool) for value in values):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def parse_page_request(args, sort_size, change_size=2):
+    """Return a PageRequest, or None when the caller asked for the full list.
+
+    Endpoints keep returning a bare JSON array unless one of ``limit``,
+    ``after`` or ``since`` is passed, so existing clients are unaffected.
+    Raises ValueError for malformed parameters.
+    """
+    if not any(key in args for key in ('limit', 'after', 'since')):
+        return None
+    try:
+        limit = int(args.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_LIMIT}")
+    after = decode_cursor(args['after'], sort_size) if args.get('after') else None
+    since = decode_cursor(args['since'], change_size) if args.get('since') else None
+    if after is not None and since is not None:
+        raise ValueError("after and since cannot be combined")
+    return PageRequest(limit, after=after, since=since)
+
+
+def page_response(items, page, sort_key, change_key, latest_change=None, hidden=()):
+    """Build the paged response envelope from ``limit + 1`` fetched items.
+
+    ``next_cursor`` is passed back as ``after`` (or, in incremental mode, as
+    ``since``) to continue; it is null on the last page. ``watermark`` is
+    passed as ``since`` on a later call to fetch only what changed.
+    ``hidden`` names item keys that only feed the cursors and are dropped
+    from the returned items.
+    """
+    has_more = len(items) > page.limit
+    items = items[:page.limit]
+    if page.incremental:
+        watermark = change_key(items[-1]) if items else page.since
+        next_cursor = watermark if has_more else None
+    else:
+        watermark = latest_change
+        next_cursor = sort_key(items[-1]) if has_more else None
+    for item in items:
+        for key in hidden:
+            item.pop(key, None)
+    return {
+        "items": items,
+        "next_cursor": encode_cursor(next_cursor) if next_cursor else None,
+        "watermark": encode_cursor(watermark) if watermark else None,
+    }
@@ -0,0 +1,149 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, g
+
+
+# employees.profile_version goes up on every update of the row, whichever
+# process makes it. Cached entries remember the version they were built
+# from and readers compare it with the row's current one, the way the
+# holiday calendar checks its version row.
+PROFILE_VERSION_STEPS = [
+    "ALTER TABLE employees ADD COLUMN profile_version INTEGER NOT NULL DEFAULT 0",
+    '''CREATE TRIGGER trg_employees_profile_version AFTER UPDATE ON employees
+       WHEN NEW.profile_version = OLD.profile_version
+       BEGIN UPDATE employees SET profile_version = OLD.profile_version + 1 WHERE rowid = NEW.rowid; END''',
+]
+
+
+class CachedProfile:
+    __slots__ = ('body', 'etag', 'version', 'expires_at')
+
+    def __init__(self, body, etag, version, expires_at):
+        self.body = body
+        self.etag = etag
+        self.version = version
+        self.expires_at = expires_at
+
+
+class ProfileCache:
+    """In-process LRU/TTL cache of serialized profile JSON keyed by employee id.
+
+    Writers call ``invalidate`` inside their transaction and again after it
+    commits (see ``invalidate_after_commit``). Every invalidation bumps a
+    per-key generation; a reader that loaded the row before the bump cannot
+    store it afterwards, so a slow read racing a write never re-caches the
+    old row. Writes made by other worker processes are caught by ``get``,
+    which only returns an entry built from the row's current
+    profile_version. ``ttl`` bounds how long an unused entry is kept.
+    """
+
+    def __init__(self, max_entries=1024, ttl=60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0,
+                       'invalidations': 0, 'not_modified': 0}
+
+    def get(self, employee_id, version):
+        """Return (entry, generation); entry is None on a miss or if it predates ``version``."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(employee_id)
+            if entry is not None and entry.expires_at > now and entry.version == version:
+                self._entries.move_to_end(employee_id)
+                self._stats['hits'] += 1
+                return entry, None
+            if entry is not None:
+                del self._entries[employee_id]
+            self._stats['misses'] += 1
+            return None, self._generations.get(employee_id, 0)
+
+    def put(self, employee_id, body, version, generation):
+        """Store ``body``, built from the row at ``version``, unless the key was invalidated since ``generation``."""
+        entry = CachedProfile(body, make_etag(body), version, time.monotonic() + self.ttl)
+        with self._lock:
+            if self._generations.get(employee_id, 0) != generation:
+                return entry
+            self._entries[employee_id] = entry
+            self._entries.move_to_end(employee_id)
+            self._stats['stores'] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+        return entry
+
+    def invalidate(self, employee_id):
+        with self._lock:
+            self._entries.pop(employee_id, None)
+            self._generations[employee_id] = self._generations.get(employee_id, 0) + 1
+            self._stats['invalidations'] += 1
+            # Generations only need to outlive reads that are in flight.
+            if len(self._generations) > self.max_entries * 4:
+                self._generations.clear()
+
+    def clear(self):
+        with self._lock:
+            for employee_id in self._entries:
+                self._generations[employee_id] = self._generations.get(employee_id, 0) + 1
+            self._entries.clear()
+
+    def count_not_modified(self):
+        with self._lock:
+            self._stats['not_modified'] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            size = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        return {
+            **stats,
+            'size': size,
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl,
+            'hit_ratio': round(stats['hits'] / lookups, 4) if lookups else 0.0,
+        }
+
+
+def make_etag(body):
+    return hashlib.blake2b(body, digest_size=12).hexdigest()
+
+
+# --- Flask Integration ---
+def init_app(app):
+    app.config.setdefault('PROFILE_CACHE_SIZE', 1024)
+    app.config.setdefault('PROFILE_CACHE_TTL', 60)
+    cache = ProfileCache(app.config['PROFILE_CACHE_SIZE'], app.config['PROFILE_CACHE_TTL'])
+    app.extensions['profile_cache'] = cache
+    app.teardown_appcontext(_invalidate_pending)
+    return cache
+
+
+def get_profile_cache(app=None):
+    return (app or current_app).extensions['profile_cache']
+
+
+def invalidate_after_commit(employee_id):
+    """Drop ``employee_id`` now and again when the app context ends.
+
+    The second drop catches a reader that loaded the old row between the
+    first one and the writer's commit.
+    """
+    get_profile_cache().invalidate(employee_id)
+    if 'invalidated_profiles' not in g:
+        g.invalidated_profiles = set()
+    g.invalidated_profiles.add(employee_id)
+
+
+def _invalidate_pending(exception=None):
+    employee_ids = g.pop('invalidated_profiles', None)
+    if not employee_ids:
+        return
+    cache = get_profile_cache()
+    for employee_id in employee_ids:
+        cache.invalidate(employee_id)
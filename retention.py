@@ -0,0 +1,288 @@
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from flask import current_app
+
+import db
+from compact_storage import sql_clock_text, sql_day_text, sql_ms_text, sql_seconds_text, sql_uuid_text
+
+logger = logging.getLogger(__name__)
+
+# Archived rows live in the same database file so that moving a chunk is one
+# atomic transaction; WAL commits are not atomic across attached files. The
+# tables are WITHOUT ROWID and clustered on the order they are read in, so
+# they need no secondary indexes, and archived notification bodies are
+# stored once in archive_messages.
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS attendance_archive (
+        emp_no INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        login_s INTEGER NOT NULL,
+        id INTEGER NOT NULL,
+        uuid BLOB NOT NULL,
+        logout_s INTEGER,
+        work_location TEXT,
+        updated_ms INTEGER NOT NULL,
+        PRIMARY KEY (emp_no, day, login_s, id)
+    ) WITHOUT ROWID''',
+    '''CREATE TABLE IF NOT EXISTS archive_messages (
+        id INTEGER PRIMARY KEY,
+        message TEXT NOT NULL UNIQUE
+    )''',
+    # Only read notifications are archived, so is_read is implied.
+    '''CREATE TABLE IF NOT EXISTS notification_archive (
+        emp_no INTEGER NOT NULL,
+        created_s INTEGER NOT NULL,
+        id INTEGER NOT NULL,
+        uuid BLOB NOT NULL,
+        message_id INTEGER REFERENCES archive_messages(id),
+        broadcast_id INTEGER REFERENCES broadcasts(id),
+        updated_ms INTEGER NOT NULL,
+        PRIMARY KEY (emp_no, created_s, id)
+    ) WITHOUT ROWID''',
+    '''CREATE INDEX IF NOT EXISTS idx_notification_archive_broadcast
+       ON notification_archive (broadcast_id) WHERE broadcast_id IS NOT NULL''',
+    # Live plus archived attendance, for rebuilding the rollups.
+    '''CREATE VIEW IF NOT EXISTS attendance_history AS
+       SELECT emp_no, day, login_s, logout_s, work_location FROM attendance_records
+       UNION ALL
+       SELECT emp_no, day, login_s, logout_s, work_location FROM attendance_archive''',
+    # The *_archive_feed views have the same columns as the live feeds.
+    f'''CREATE VIEW IF NOT EXISTS attendance_archive_feed AS
+        SELECT a.id, a.emp_no, {sql_uuid_text('a.uuid')} AS record_id, e.id AS employee_id,
+               {sql_day_text('a.day')} AS date, {sql_clock_text('a.login_s')} AS login_time,
+               a.work_location, {sql_clock_text('a.logout_s')} AS logout_time,
+               {sql_ms_text('a.updated_ms')} AS updated_at, a.uuid, a.day, a.login_s, a.logout_s, a.updated_ms
+        FROM attendance_archive a LEFT JOIN employees e ON e.emp_no = a.emp_no''',
+    f'''CREATE VIEW IF NOT EXISTS notification_archive_feed AS
+        SELECT n.id AS seq, n.emp_no, {sql_uuid_text('n.uuid')} AS notification_id, e.id AS employee_id,
+               COALESCE(b.message, m.message) AS message, 1 AS is_read,
+               {sql_seconds_text('n.created_s')} AS timestamp, {sql_ms_text('n.updated_ms')} AS updated_at,
+               n.broadcast_id, n.uuid, n.created_s, n.updated_ms
+        FROM notification_archive n
+        LEFT JOIN archive_messages m ON m.id = n.message_id
+        LEFT JOIN broadcasts b ON b.id = n.broadcast_id
+        LEFT JOIN employees e ON e.emp_no = n.emp_no''',
+]
+ARCHIVE_FEEDS = {'attendance_feed': 'attendance_archive_feed', 'notification_feed': 'notification_archive_feed'}
+
+# Row counts for stats(), kept in id_sequences by triggers so reading them is
+# a few key lookups instead of a COUNT(*) over each table. The archive moves
+# fire them too, so live and archive counts stay in step.
+COUNTED_TABLES = ('attendance_records', 'attendance_archive', 'notifications', 'notification_archive')
+ROW_COUNT_STEPS = [
+    step
+    for table in COUNTED_TABLES
+    for step in (
+        f"""INSERT OR REPLACE INTO id_sequences (name, next_value)
+            SELECT 'rows:{table}', COUNT(*) FROM {table}""",
+        f"""CREATE TRIGGER trg_{table}_count_insert AFTER INSERT ON {table}
+            BEGIN UPDATE id_sequences SET next_value = next_value + 1 WHERE name = 'rows:{table}'; END""",
+        f"""CREATE TRIGGER trg_{table}_count_delete AFTER DELETE ON {table}
+            BEGIN UPDATE id_sequences SET next_value = next_value - 1 WHERE name = 'rows:{table}'; END""",
+    )
+]
+
+
+def row_counts(conn):
+    """{table: rows} for COUNTED_TABLES, from the trigger-kept counters."""
+    placeholders = ', '.join('?' * len(COUNTED_TABLES))
+    rows = conn.execute(f"SELECT name, next_value FROM id_sequences WHERE name IN ({placeholders})",
+                        [f"rows:{table}" for table in COUNTED_TABLES]).fetchall()
+    counts = {name[len('rows:'):]: value for name, value in rows}
+    return {table: counts.get(table, 0) for table in COUNTED_TABLES}
+
+
+def wants_archive(args):
+    """True when a list request asked for archived history (?archived=1)."""
+    return args.get('archived', '').lower() in ('1', 'true', 'yes')
+
+
+# --- Chunk Moves ---
+# Each takes (conn, emp_no, cutoff, limit), moves up to ``limit`` rows of
+# one employee older than ``cutoff`` and returns how many it moved.
+def move_attendance(conn, emp_no, cutoff_day, limit):
+    rows = conn.execute(
+        '''DELETE FROM attendance_records WHERE id IN (
+               SELECT id FROM attendance_records WHERE emp_no = ? AND day < ? LIMIT ?)
+           RETURNING emp_no, day, login_s, id, uuid, logout_s, work_location, updated_ms''',
+        (emp_no, cutoff_day, limit)
+    ).fetchall()
+    conn.executemany(
+        '''INSERT INTO attendance_archive (emp_no, day, login_s, id, uuid, logout_s, work_location, updated_ms)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+        rows
+    )
+    return len(rows)
+
+
+def move_notifications(conn, emp_no, cutoff_s, limit):
+    rows = conn.execute(
+        '''DELETE FROM notifications WHERE id IN (
+               SELECT id FROM notifications WHERE emp_no = ? AND created_s < ? AND is_read = 1 LIMIT ?)
+           RETURNING emp_no, created_s, id, uuid, message, broadcast_id, updated_ms''',
+        (emp_no, cutoff_s, limit)
+    ).fetchall()
+    # Broadcast rows carry no text of their own (message = '').
+    messages = {(row['message'],) for row in rows if row['broadcast_id'] is None}
+    conn.executemany("INSERT OR IGNORE INTO archive_messages (message) VALUES (?)", messages)
+    conn.executemany(
+        '''INSERT INTO notification_archive (emp_no, created_s, id, uuid, message_id, broadcast_id, updated_ms)
+           VALUES (?, ?, ?, ?, (SELECT id FROM archive_messages WHERE message = ?), ?, ?)''',
+        [(row['emp_no'], row['created_s'], row['id'], row['uuid'],
+          row['message'] if row['broadcast_id'] is None else None, row['broadcast_id'], row['updated_ms'])
+         for row in rows]
+    )
+    return len(rows)
+
+
+# --- Job ---
+class RetentionJob:
+    """Moves old rows into the archive tables in short write transactions.
+
+    Read notifications older than ``notification_days`` and attendance from
+    years before the last ``attendance_years`` closed ones are archived,
+    employee by employee. Each transaction does at most ``chunk_size``
+    units of work (a moved row, or an employee with nothing to move) and
+    the job sleeps ``pause`` seconds between them, so request writers
+    waiting on the lock get in. With ``interval`` set, each worker process
+    starts a daemon thread, but only the one holding the leader lock file
+    runs the job; the others keep trying, so one takes over if that
+    process exits. run_exclusive() also skips a run while another process
+    is in the middle of one.
+    """
+
+    def __init__(self, app, notification_days=90, attendance_years=1, chunk_size=500, pause=0.05,
+                 interval=None):
+        self.app = app
+        self.notification_days = notification_days
+        self.attendance_years = attendance_years
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.interval = interval
+        self.last_run = None
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _lock_path(self, name):
+        return f"{self.app.config['DATABASE']}.retention-{name}"
+
+    def cutoffs(self, today=None):
+        """(attendance day ordinal, notification Unix seconds) before which rows are archived."""
+        today = today or date.today()
+        first_kept = date(today.year - self.attendance_years, 1, 1)
+        since = datetime.combine(today - timedelta(days=self.notification_days), datetime.min.time())
+        return first_kept.toordinal(), int(since.replace(tzinfo=timezone.utc).timestamp())
+
+    def run_once(self, today=None):
+        """Archive everything past the cutoffs; returns what was moved."""
+        attendance_cutoff, notification_cutoff = self.cutoffs(today)
+        start = time.perf_counter()
+        report = {'attendance_records': 0, 'notifications': 0, 'transactions': 0}
+        for table, move, cutoff in (('attendance_records', move_attendance, attendance_cutoff),
+                                    ('notifications', move_notifications, notification_cutoff)):
+            moved, transactions = self._archive(move, cutoff)
+            report[table] += moved
+            report['transactions'] += transactions
+        report['seconds'] = round(time.perf_counter() - start, 3)
+        self.last_run = {'at': time.time(), **report}
+        if report['attendance_records'] or report['notifications']:
+            logger.info("Archived %s attendance rows and %s notifications in %s transactions",
+                        report['attendance_records'], report['notifications'], report['transactions'])
+        return report
+
+    def run_exclusive(self, today=None):
+        """run_once() unless another process is already running the job; then None."""
+        with db.file_lock(self._lock_path('run'), blocking=False) as held:
+            return self.run_once(today) if held else None
+
+    def _archive(self, move, cutoff):
+        with db.connection(self.app, readonly=True) as conn:
+            emp_nos = [row[0] for row in conn.execute("SELECT emp_no FROM employees ORDER BY emp_no")]
+        moved = transactions = index = 0
+        while index < len(emp_nos):
+            with db.connection(self.app) as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                budget = self.chunk_size
+                while budget > 0 and index < len(emp_nos):
+                    limit = budget
+                    count = move(conn, emp_nos[index], cutoff, limit)
+                    moved += count
+                    budget -= max(count, 1)
+                    # An employee is done once a move comes back short of its limit.
+                    if count < limit:
+                        index += 1
+                conn.commit()
+            transactions += 1
+            if index < len(emp_nos) and self.pause:
+                time.sleep(self.pause)
+        return moved, transactions
+
+    def ensure_started(self):
+        # Threads do not survive fork, so each worker process starts its own;
+        # _run() elects one of them to do the work.
+        if not self.interval or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='retention', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+        self._pid = None
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            with db.file_lock(self._lock_path('leader'), blocking=False) as leader:
+                if not leader:
+                    continue
+                # Held until this process stops, so one worker archives.
+                while True:
+                    try:
+                        self.run_exclusive()
+                    except Exception:
+                        logger.exception("Retention run failed")
+                    if self._stopping.wait(self.interval):
+                        return
+
+    def stats(self):
+        with db.connection(self.app, readonly=True) as conn:
+            counts = row_counts(conn)
+        return {'rows': counts, 'last_run': self.last_run}
+
+
+# --- Flask Integration ---
+def init_app(app):
+    app.config.setdefault('RETENTION_NOTIFICATION_DAYS', 90)
+    app.config.setdefault('RETENTION_ATTENDANCE_YEARS', 1)
+    app.config.setdefault('RETENTION_CHUNK_SIZE', 500)
+    app.config.setdefault('RETENTION_PAUSE_SECONDS', 0.05)
+    app.config.setdefault('RETENTION_INTERVAL_SECONDS', None)
+    job = RetentionJob(
+        app,
+        notification_days=app.config['RETENTION_NOTIFICATION_DAYS'],
+        attendance_years=app.config['RETENTION_ATTENDANCE_YEARS'],
+        chunk_size=app.config['RETENTION_CHUNK_SIZE'],
+        pause=app.config['RETENTION_PAUSE_SECONDS'],
+        interval=app.config['RETENTION_INTERVAL_SECONDS'],
+    )
+    app.extensions['retention'] = job
+    if job.interval:
+        app.before_request(job.ensure_started)
+    return job
+
+
+def get_retention(app=None):
+    return (app or current_app).extensions['retention']
@@ -0,0 +1,100 @@
+"""Fail if any hot endpoint query walks a whole table.
+
+Exercises the per-employee endpoints through the Flask test client against
+a scratch database, captures every statement they send to SQLite with a
+trace callback, then runs EXPLAIN QUERY PLAN on each one. Exits non-zero
+if a plan contains a full table SCAN.
+
+    python scripts/check_query_plans.py
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATABASE = os.path.join(tempfile.mkdtemp(prefix='hrms-plans-'), 'hrms.db')
+os.environ['HRMS_DATABASE'] = DATABASE
+
+import db  # noqa: E402
+
+captured = []
+db.connection_hooks.append(lambda conn: conn.set_trace_callback(captured.append))
+
+from app import create_app  # noqa: E402
+from migrations import explain, full_scans  # noqa: E402
+
+app = create_app()
+
+EMPLOYEE_ID = 'SSQ-1001'
+
+
+def seed():
+    conn = sqlite3.connect(DATABASE)
+    conn.execute(
+        "INSERT INTO employees (id, first_name, last_name, email, password) VALUES (?, ?, ?, ?, ?)",
+        (EMPLOYEE_ID, 'Plan', 'Check', 'plans@example.com', 'x')
+    )
+    conn.commit()
+    conn.close()
+
+
+def exercise(client):
+    record = client.post('/attendance/login', json={
+        "employee_id": EMPLOYEE_ID, "date": "2025-09-02",
+        "work_location": "Office", "employee_name": "Plan Check"
+    }).get_json()['record']
+    client.put(f"/attendance/logout/{record['record_id']}")
+    client.get(f'/attendance/{EMPLOYEE_ID}')
+    client.post('/leave-application', json={
+        "employee_id": EMPLOYEE_ID, "leave_type": "Sick Leave",
+        "from_date": "2025-09-03", "to_date": "2025-09-04", "description": "plan check"
+    })
+    client.get(f'/leave-applications/{EMPLOYEE_ID}')
+    client.get(f'/notifications/{EMPLOYEE_ID}')
+    client.get(f'/notifications/unread-count/{EMPLOYEE_ID}')
+    client.put(f'/notifications/mark-read/{EMPLOYEE_ID}')
+    client.get(f'/profile/{EMPLOYEE_ID}')
+    for path in ('attendance', 'leave-applications', 'notifications'):
+        first = client.get(f'/{path}/{EMPLOYEE_ID}?limit=1').get_json()
+        if first['next_cursor']:
+            client.get(f"/{path}/{EMPLOYEE_ID}?limit=1&after={first['next_cursor']}")
+        if first['watermark']:
+            client.get(f"/{path}/{EMPLOYEE_ID}?since={first['watermark']}")
+    for path in ('attendance', 'notifications'):
+        first = client.get(f'/{path}/{EMPLOYEE_ID}?archived=1&limit=1').get_json()
+        if first['next_cursor']:
+            client.get(f"/{path}/{EMPLOYEE_ID}?archived=1&limit=1&after={first['next_cursor']}")
+    client.post('/admin/retention/run')
+
+
+def main():
+    seed()
+    del captured[:]
+    exercise(app.test_client())
+
+    conn = sqlite3.connect(DATABASE)
+    seen = set()
+    failures = 0
+    for sql in captured:
+        statement = sql.strip()
+        # The R*Tree module reads its shadow tables (and sqlite_stat1) when
+        # a connection first opens it; those are not the app's queries.
+        if "'main'." in statement:
+            continue
+        if statement in seen or statement.split(None, 1)[0].upper() not in ('SELECT', 'UPDATE', 'DELETE'):
+            continue
+        seen.add(statement)
+        plan = explain(conn, statement)
+        scans = full_scans(plan)
+        failures += bool(scans)
+        print(f"{'FULL SCAN' if scans else 'ok':<9} {' '.join(statement.split())}")
+        for detail in plan:
+            print(f"          {detail}")
+    conn.close()
+    print(f"\n{len(seen)} statements checked, {failures} with full table scans")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,40 @@
+"""Run the retention job once against HRMS_DATABASE, e.g. from cron.
+
+Moves read notifications older than RETENTION_NOTIFICATION_DAYS and
+attendance from before the last RETENTION_ATTENDANCE_YEARS closed years
+into the archive tables, in short chunked transactions, and prints what
+it moved. Safe to run while the app is serving requests.
+
+    python scripts/run_retention.py
+    python scripts/run_retention.py --notification-days 30 --chunk-size 200
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from retention import get_retention  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--notification-days', type=int)
+    parser.add_argument('--attendance-years', type=int)
+    parser.add_argument('--chunk-size', type=int)
+    parser.add_argument('--pause', type=float, help="seconds to sleep between chunks")
+    args = parser.parse_args()
+    job = get_retention(create_app())
+    for option in ('notification_days', 'attendance_years', 'chunk_size', 'pause'):
+        if getattr(args, option) is not None:
+            setattr(job, option, getattr(args, option))
+    report = job.run_exclusive()
+    if report is None:
+        sys.exit("A retention run is already in progress.")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
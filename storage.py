@@ -0,0 +1,441 @@
+import os
+import sqlite3
+import threading
+
+from flask import current_app, g
+
+from attendance_rollups import TOTAL_COLUMNS
+from compact_storage import new_uuid
+from db import get_db
+from retention import ARCHIVE_FEEDS
+
+# Employee columns that are plain data (what imports and exports carry).
+EMPLOYEE_FIELDS = [
+    'first_name', 'last_name', 'email', 'gender', 'dob', 'permanent_address',
+    'current_address', 'pan_number', 'aadhar_number', 'contactnumber',
+    'alternate_contact_number', 'alternate_contact_person', 'alternate_contact_relation',
+    'emergency_number', 'account_number', 'ifsc_code', 'account_holder_name', 'branch',
+    'department', 'reporting_manager1', 'reporting_manager1_mail', 'reporting_manager2',
+    'reporting_manager2_mail', 'employee_role', 'employment_status', 'join_date',
+]
+# Columns a profile update may change: everything but the identity and
+# credential columns (id, emp_no, email, password).
+PROFILE_FIELDS = tuple(field for field in EMPLOYEE_FIELDS if field != 'email') + ('user_type',)
+INSERT_FIELDS = ('id', *EMPLOYEE_FIELDS, 'password')
+
+
+class StorageError(Exception):
+    """A backend failure; adapters raise it in place of their driver's errors."""
+
+
+# Helpers still written against the SQLite connection (mail outbox, rollups,
+# leave overlap checks) raise sqlite3.Error, so routes catch both.
+DB_ERRORS = (StorageError, sqlite3.Error)
+
+
+# --- SQLite Statements ---
+# Every operation is one constant statement with named parameters, so each
+# connection prepares it once and reuses it from its statement cache.
+# storage_sqlalchemy.py builds the same set as SQLAlchemy Core constructs.
+EMP_NO = "(SELECT emp_no FROM employees WHERE id = :employee_id)"
+
+SQLITE_STATEMENTS = {
+    'employee_by_id': "SELECT * FROM employees WHERE id = :employee_id",
+    'employee_by_email': "SELECT * FROM employees WHERE email = :email",
+    'employee_profile_version': "SELECT profile_version FROM employees WHERE id = :employee_id",
+    'employee_insert': f'''INSERT INTO employees ({', '.join(INSERT_FIELDS)})
+                           VALUES ({', '.join(':' + field for field in INSERT_FIELDS)})''',
+    # Each column is rewritten with its own value unless its set_ flag is
+    # on, so one statement covers any combination of changed fields.
+    'employee_update_profile': f'''UPDATE employees SET {', '.join(
+        f"{field} = CASE WHEN :set_{field} THEN :new_{field} ELSE {field} END" for field in PROFILE_FIELDS)}
+        WHERE id = :employee_id RETURNING *''',
+    # With :expected set, only replaces that hash (a compare-and-set).
+    'employee_set_password': '''UPDATE employees SET password = :password
+                                WHERE id = :employee_id AND (:expected IS NULL OR password = :expected)''',
+    'attendance_clock_in': '''INSERT INTO attendance_records (uuid, emp_no, day, login_s, work_location)
+                              SELECT :uuid, emp_no, :day, :login_s, :work_location FROM employees
+                              WHERE id = :employee_id''',
+    'attendance_clock_out': '''UPDATE attendance_records SET logout_s = :logout_s
+                               WHERE uuid = :record_uuid AND logout_s IS NULL
+                               RETURNING (SELECT id FROM employees WHERE emp_no = attendance_records.emp_no)
+                                         AS employee_id, day, login_s, work_location''',
+    'notification_insert': '''INSERT INTO notifications (uuid, emp_no, message)
+                              SELECT :uuid, emp_no, :message FROM employees WHERE id = :employee_id''',
+    'notification_unread_count': f"SELECT COUNT(*) AS unread FROM notifications WHERE emp_no = {EMP_NO} AND is_read = 0",
+    'notification_mark_read': f"UPDATE notifications SET is_read = 1 WHERE emp_no = {EMP_NO} AND is_read = 0",
+    'leave_insert': '''INSERT INTO leave_applications (uuid, emp_no, leave_type, from_day, to_day, description,
+                                                      leave_days)
+                       SELECT :uuid, emp_no, :leave_type, :from_day, :to_day, :description, :leave_days
+                       FROM employees WHERE id = :employee_id''',
+    # The R*Tree drives: days and employee are all range constraints on it.
+    'leave_overlaps': f'''SELECT l.record_id, l.leave_type, l.from_date, l.to_date, l.status
+                          FROM leave_intervals i JOIN leave_feed l ON l.id = i.id
+                          WHERE i.start_day <= :end_day AND i.end_day >= :start_day
+                            AND i.min_emp <= {EMP_NO} AND i.max_emp >= {EMP_NO}
+                          ORDER BY l.from_day''',
+    'team_on_leave': '''SELECT e.id AS employee_id, e.first_name, e.last_name, l.leave_type, l.from_date,
+                               l.to_date, l.status
+                        FROM leave_intervals i
+                        JOIN leave_feed l ON l.id = i.id
+                        JOIN employees e ON e.emp_no = l.emp_no
+                        WHERE i.start_day <= :day AND i.end_day >= :day AND e.department = :department
+                        ORDER BY e.id''',
+    'team_size': "SELECT COUNT(*) AS team_size FROM employees WHERE department = :department",
+    'report_month': f'''SELECT department, {', '.join(TOTAL_COLUMNS)} FROM attendance_monthly
+                        WHERE month = :month ORDER BY department''',
+    'report_department': f'''SELECT {', '.join(TOTAL_COLUMNS)} FROM attendance_monthly
+                             WHERE month = :month AND department = :department''',
+}
+
+
+# --- History Lists ---
+class HistoryList:
+    """How one per-employee history endpoint reads its feed view.
+
+    Columns are (table, column, label), where table is 'feed' or
+    'employees' (joined on emp_no only when selected); ``columns`` are read
+    for the whole list and ``page_columns`` for a page. ``sort`` (newest
+    first) and ``change`` (oldest change first) are feed columns, matched
+    by the :after_<n> and :since_<n> cursor parameters. ``table`` is the
+    live table whose newest change is a first page's watermark.
+    """
+
+    def __init__(self, name, feed, table, columns, page_columns, sort, change):
+        self.name = name
+        self.feed = feed
+        self.archive = ARCHIVE_FEEDS.get(feed)
+        self.table = table
+        self.columns = columns
+        self.page_columns = page_columns
+        self.sort = sort
+        self.change = change
+
+    def label(self, column):
+        return next(label for table, name, label in self.page_columns if table == 'feed' and name == column)
+
+    def statement_names(self):
+        """(statement name, mode, archived) for each of this list's statements."""
+        names = []
+        for mode in LIST_MODES:
+            names.append((f"{self.name}_{mode}", mode, False))
+            if self.archive:
+                names.append((f"{self.name}_{mode}_archived", mode, True))
+        return names
+
+
+def _feed_columns(*names):
+    return [('feed', name, name) for name in names]
+
+
+LIST_MODES = ('all', 'first', 'after', 'changes')
+_LEAVE_COLUMNS = _feed_columns('uuid', 'employee_id', 'leave_type', 'from_date', 'to_date', 'description', 'status',
+                               'submitted_at', 'updated_at', 'leave_days')
+_NOTIFICATION_PAGE = _feed_columns('uuid', 'message', 'is_read', 'timestamp', 'updated_at', 'created_s', 'seq',
+                                   'updated_ms')
+# Ids are formatted in Python (uuid_text), which is much cheaper than in the
+# views. The sort columns are always selected: a UNION ALL with the archive
+# can only be ordered by result columns.
+_ATTENDANCE_COLUMNS = [*_feed_columns('uuid', 'date', 'login_time', 'work_location', 'logout_time', 'updated_at',
+                                      'day', 'login_s'),
+                       ('feed', 'id', 'seq'), ('feed', 'updated_ms', 'updated_ms'),
+                       ('employees', 'first_name', 'first_name'), ('employees', 'last_name', 'last_name')]
+HISTORY_LISTS = {
+    history.name: history for history in (
+        HistoryList('notification_list', 'notification_feed', 'notifications',
+                    _feed_columns('message', 'is_read', 'created_s', 'seq'), _NOTIFICATION_PAGE,
+                    sort=('created_s', 'seq'), change=('updated_ms', 'seq')),
+        HistoryList('attendance_list', 'attendance_feed', 'attendance_records',
+                    _ATTENDANCE_COLUMNS, _ATTENDANCE_COLUMNS,
+                    sort=('day', 'login_s', 'id'), change=('updated_ms', 'id')),
+        HistoryList('leave_list', 'leave_feed', 'leave_applications',
+                    _LEAVE_COLUMNS, [*_LEAVE_COLUMNS, *_feed_columns('submitted_s', 'id', 'updated_ms')],
+                    sort=('submitted_s', 'id'), change=('updated_ms', 'id')),
+    )
+}
+
+
+def _sqlite_list(history, mode, archived):
+    columns = history.columns if mode == 'all' else history.page_columns
+    select = ', '.join(f"{'e' if table == 'employees' else 'f'}.{name}" + (f" AS {label}" if label != name else '')
+                       for table, name, label in columns)
+    join = " JOIN employees e ON e.emp_no = f.emp_no" if any(table == 'employees' for table, _, _ in columns) else ''
+    where = f"f.emp_no = {EMP_NO}"
+    keys, order = history.sort, 'DESC'
+    if mode == 'after':
+        where += f" AND ({', '.join('f.' + key for key in keys)}) < ({', '.join(_cursor_params('after', keys))})"
+    elif mode == 'changes':
+        keys, order = history.change, 'ASC'
+        where += f" AND ({', '.join('f.' + key for key in keys)}) > ({', '.join(_cursor_params('since', keys))})"
+    feeds = [history.feed, history.archive] if archived else [history.feed]
+    sql = ' UNION ALL '.join(f"SELECT {select} FROM {feed} f{join} WHERE {where}" for feed in feeds)
+    sql += " ORDER BY " + ', '.join(f"{history.label(key)} {order}" for key in keys)
+    return sql if mode == 'all' else sql + " LIMIT :limit"
+
+
+def _cursor_params(prefix, keys):
+    return [f':{prefix}_{n}' for n in range(len(keys))]
+
+
+def _sqlite_lists():
+    statements = {}
+    for history in HISTORY_LISTS.values():
+        for name, mode, archived in history.statement_names():
+            statements[name] = _sqlite_list(history, mode, archived)
+        statements[f"{history.name}_latest"] = f'''SELECT updated_ms, id FROM {history.table}
+            WHERE emp_no = {EMP_NO} ORDER BY updated_ms DESC, id DESC LIMIT 1'''
+    return statements
+
+
+SQLITE_STATEMENTS.update(_sqlite_lists())
+
+
+def list_statement(name, employee_id, page=None, archived=False):
+    """(statement name, params) reading one page of a HISTORY_LISTS list; ``page`` None means all of it."""
+    params = {'employee_id': employee_id}
+    if page is None:
+        mode = 'all'
+    elif page.incremental:
+        mode = 'changes'
+        params.update((f'since_{n}', value) for n, value in enumerate(page.since))
+    elif page.after:
+        mode = 'after'
+        params.update((f'after_{n}', value) for n, value in enumerate(page.after))
+    else:
+        mode = 'first'
+    if page is not None:
+        params['limit'] = page.limit + 1
+    if archived and HISTORY_LISTS[name].archive:
+        return f"{name}_{mode}_archived", params
+    return f"{name}_{mode}", params
+
+
+# --- Adapters ---
+# An adapter runs the named statements on one connection and owns its
+# transaction: execute(name, params) -> (rows as dicts, rowcount),
+# execute_many(name, params_list) -> rowcount, begin_write(), commit(),
+# rollback(), and ``connection``, the DB-API connection in the same
+# transaction for helpers that have not moved behind the repository.
+class SQLiteAdapter:
+    def __init__(self, conn):
+        self.connection = conn
+
+    def execute(self, name, params):
+        try:
+            cursor = self.connection.execute(SQLITE_STATEMENTS[name], params)
+            rows = [dict(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            raise StorageError(str(e)) from e
+        return rows, cursor.rowcount
+
+    def execute_many(self, name, params_list):
+        try:
+            return self.connection.executemany(SQLITE_STATEMENTS[name], params_list).rowcount
+        except sqlite3.Error as e:
+            raise StorageError(str(e)) from e
+
+    def begin_write(self):
+        # Take the write lock up front so a check-then-insert cannot interleave.
+        self.connection.execute("BEGIN IMMEDIATE")
+
+    def commit(self):
+        self.connection.commit()
+
+    def rollback(self):
+        self.connection.rollback()
+
+
+# --- Repository ---
+class Repository:
+    """The employees, attendance, notifications and leave operations the routes use.
+
+    Backend-neutral: it only builds parameters and shapes results, and
+    the adapter supplies the statements. Rows come back as plain dicts.
+    """
+
+    def __init__(self, adapter):
+        self.adapter = adapter
+
+    @property
+    def connection(self):
+        return self.adapter.connection
+
+    def begin_write(self):
+        self.adapter.begin_write()
+
+    def commit(self):
+        self.adapter.commit()
+
+    def rollback(self):
+        self.adapter.rollback()
+
+    def _one(self, name, params):
+        rows, _ = self.adapter.execute(name, params)
+        return rows[0] if rows else None
+
+    # Employees
+    def employee(self, employee_id):
+        return self._one('employee_by_id', {'employee_id': employee_id})
+
+    def employee_by_email(self, email):
+        return self._one('employee_by_email', {'email': email})
+
+    def profile_version(self, employee_id):
+        """The row's profile_version (bumped on every update), or None if there is no such employee."""
+        row = self._one('employee_profile_version', {'employee_id': employee_id})
+        return row['profile_version'] if row else None
+
+    def add_employees(self, employees):
+        """Insert employee dicts in one batch; each needs id and a hashed password."""
+        return self.adapter.execute_many(
+            'employee_insert', [{field: employee.get(field) for field in INSERT_FIELDS} for employee in employees])
+
+    def update_profile(self, employee_id, changes):
+        """Apply the PROFILE_FIELDS in ``changes``; returns the updated row, or None if there is no such employee."""
+        params = {'employee_id': employee_id}
+        for field in PROFILE_FIELDS:
+            params[f'set_{field}'] = field in changes
+            params[f'new_{field}'] = changes.get(field)
+        return self._one('employee_update_profile', params)
+
+    def set_password(self, employee_id, password_hash, expected=None):
+        """Store a new hash; with ``expected``, only if that is still the current one. True if written."""
+        _, count = self.adapter.execute('employee_set_password', {
+            'employee_id': employee_id, 'password': password_hash, 'expected': expected})
+        return count > 0
+
+    # Attendance
+    def clock_in(self, record_uuid, employee_id, day, login_s, work_location):
+        """False if there is no such employee."""
+        return self.clock_in_many([(record_uuid, employee_id, day, login_s, work_location)]) > 0
+
+    def clock_in_many(self, sessions):
+        """Batch of (uuid, employee_id, day, login_s, work_location); returns rows inserted."""
+        return self.adapter.execute_many('attendance_clock_in', [
+            {'uuid': record_uuid.bytes, 'employee_id': employee_id, 'day': day, 'login_s': login_s,
+             'work_location': work_location}
+            for record_uuid, employee_id, day, login_s, work_location in sessions])
+
+    def clock_out(self, record_uuid_bytes, logout_s):
+        """The closed session (employee_id, day, login_s, work_location), or None if not open."""
+        return self._one('attendance_clock_out', {'record_uuid': record_uuid_bytes, 'logout_s': logout_s})
+
+    # Notifications
+    def add_notification(self, employee_id, message):
+        return self.add_notifications([(employee_id, message)]) > 0
+
+    def add_notifications(self, notifications):
+        """Batch of (employee_id, message); returns rows inserted."""
+        return self.adapter.execute_many('notification_insert', [
+            {'uuid': new_uuid().bytes, 'employee_id': employee_id, 'message': message}
+            for employee_id, message in notifications])
+
+    def unread_count(self, employee_id):
+        return self._one('notification_unread_count', {'employee_id': employee_id})['unread']
+
+    def mark_all_read(self, employee_id):
+        _, count = self.adapter.execute('notification_mark_read', {'employee_id': employee_id})
+        return count
+
+    # History lists (notification_list, attendance_list, leave_list)
+    def history(self, name, employee_id, page=None, archived=False):
+        """One page of an employee's history (see list_statement), as row dicts with the cursor columns."""
+        rows, _ = self.adapter.execute(*list_statement(name, employee_id, page, archived))
+        return rows
+
+    def latest_change(self, name, employee_id):
+        """(updated_ms, id) of the employee's most recently changed live row in list ``name``, or None."""
+        row = self._one(f"{name}_latest", {'employee_id': employee_id})
+        return (row['updated_ms'], row['id']) if row else None
+
+    # Leave
+    def submit_leave(self, employee_id, leave_type, start, end, description, leave_days):
+        """False if there is no such employee."""
+        _, count = self.adapter.execute('leave_insert', {
+            'uuid': new_uuid().bytes, 'employee_id': employee_id, 'leave_type': leave_type,
+            'from_day': start.toordinal(), 'to_day': end.toordinal(), 'description': description,
+            'leave_days': leave_days})
+        return count > 0
+
+    def overlapping_leaves(self, employee_id, start, end):
+        """Active leave/WFH records of ``employee_id`` that intersect [start, end]."""
+        rows, _ = self.adapter.execute('leave_overlaps', {
+            'employee_id': employee_id, 'start_day': start.toordinal(), 'end_day': end.toordinal()})
+        return rows
+
+    def team_on_leave(self, department, day):
+        """Leave/WFH records covering ``day`` for everyone in ``department``, by employee id."""
+        rows, _ = self.adapter.execute('team_on_leave', {'department': department, 'day': day.toordinal()})
+        return rows
+
+    def team_size(self, department):
+        return self._one('team_size', {'department': department})['team_size']
+
+    # Reports
+    def month_totals(self, month):
+        """attendance_monthly rows for ``month``, one per department."""
+        rows, _ = self.adapter.execute('report_month', {'month': month})
+        return rows
+
+    def department_totals(self, month, department):
+        return self._one('report_department', {'month': month, 'department': department})
+
+
+# --- Flask Integration ---
+_engine_lock = threading.Lock()
+
+
+def init_app(app):
+    app.config.setdefault('STORAGE_BACKEND', 'sqlite')
+    app.config.setdefault('STORAGE_URL', None)
+    if app.config['STORAGE_BACKEND'] not in ('sqlite', 'sqlalchemy'):
+        raise ValueError(f"Unknown STORAGE_BACKEND {app.config['STORAGE_BACKEND']!r}")
+    app.teardown_appcontext(_close_adapter)
+
+
+def separate_storage(app):
+    """True when the repository runs on a database other than the DATABASE file (see app.ensure_schema)."""
+    url = app.config['STORAGE_URL']
+    return app.config['STORAGE_BACKEND'] == 'sqlalchemy' and bool(url) and not _names_file(url, app.config['DATABASE'])
+
+
+def _names_file(url, path):
+    # sqlite:///relative or sqlite:////absolute, with an optional +driver and ?options.
+    scheme, separator, rest = url.partition(':///')
+    if not separator or scheme.split('+', 1)[0] != 'sqlite':
+        return False
+    return os.path.realpath(rest.split('?', 1)[0]) == os.path.realpath(path)
+
+
+def get_repository(readonly=False):
+    """The request's repository on the configured backend.
+
+    'sqlite' wraps the request's pooled connection (see db.get_db).
+    'sqlalchemy' uses one connection per app context from an engine on
+    STORAGE_URL (default: the DATABASE file), released at teardown.
+    """
+    app = current_app._get_current_object()
+    if app.config['STORAGE_BACKEND'] == 'sqlite':
+        return Repository(SQLiteAdapter(get_db(readonly=readonly)))
+    if 'storage_adapter' not in g:
+        from storage_sqlalchemy import SQLAlchemyAdapter
+        g.storage_adapter = SQLAlchemyAdapter(_engine(app).connect())
+    return Repository(g.storage_adapter)
+
+
+def _engine(app):
+    # Engines hold pooled connections, which must not cross a fork.
+    engine = app.extensions.get('storage_engine')
+    if engine is None or engine[0] != os.getpid():
+        with _engine_lock:
+            engine = app.extensions.get('storage_engine')
+            if engine is None or engine[0] != os.getpid():
+                from storage_sqlalchemy import create_engine_for
+                engine = app.extensions['storage_engine'] = (os.getpid(), create_engine_for(app))
+    return engine[1]
+
+
+def _close_adapter(exception=None):
+    adapter = g.pop('storage_adapter', None)
+    if adapter is not None:
+        adapter.close()
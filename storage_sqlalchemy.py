@@ -0,0 +1,263 @@
+import sqlite3
+
+from sqlalchemy import (Column, Integer, LargeBinary, MetaData, String, Table, Text, bindparam, case, create_engine,
+                        event, func, insert, literal_column, or_, select, tuple_, union_all, update)
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.pool import StaticPool
+
+import db
+from attendance_rollups import TOTAL_COLUMNS
+from storage import EMPLOYEE_FIELDS, HISTORY_LISTS, INSERT_FIELDS, PROFILE_FIELDS, StorageError
+
+# The columns the repository touches. The schema itself is still created
+# by migrations.py; these only describe it to SQLAlchemy.
+metadata = MetaData()
+employees = Table(
+    'employees', metadata,
+    Column('id', Text, primary_key=True),
+    Column('emp_no', Integer),
+    *(Column(field, Text) for field in EMPLOYEE_FIELDS),
+    Column('password', Text),
+    Column('user_type', Text),
+    Column('profile_version', Integer),
+)
+attendance_records = Table(
+    'attendance_records', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('uuid', LargeBinary),
+    Column('emp_no', Integer),
+    Column('day', Integer),
+    Column('login_s', Integer),
+    Column('logout_s', Integer),
+    Column('work_location', Text),
+    Column('updated_ms', Integer),
+)
+notifications = Table(
+    'notifications', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('uuid', LargeBinary),
+    Column('emp_no', Integer),
+    Column('message', Text),
+    Column('is_read', Integer),
+    Column('updated_ms', Integer),
+)
+leave_applications = Table(
+    'leave_applications', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('uuid', LargeBinary),
+    Column('emp_no', Integer),
+    Column('leave_type', Text),
+    Column('from_day', Integer),
+    Column('to_day', Integer),
+    Column('description', Text),
+    Column('leave_days', Integer),
+    Column('updated_ms', Integer),
+)
+# R*Tree of active leave: one (start_day, end_day, min_emp, max_emp) box per application.
+leave_intervals = Table(
+    'leave_intervals', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('start_day', Integer),
+    Column('end_day', Integer),
+    Column('min_emp', Integer),
+    Column('max_emp', Integer),
+)
+attendance_monthly = Table(
+    'attendance_monthly', metadata,
+    Column('month', Text, primary_key=True),
+    Column('department', Text, primary_key=True),
+    *(Column(column, Integer) for column in TOTAL_COLUMNS),
+)
+
+
+def _view(name, history, *extra):
+    # A feed view as SQLAlchemy sees it: the columns its list reads, and ``extra``.
+    names = {'emp_no', *history.sort, *history.change, *extra}
+    names.update(column for table, column, _ in [*history.columns, *history.page_columns] if table == 'feed')
+    return Table(name, metadata, *(Column(column) for column in sorted(names)))
+
+
+feeds = {}
+for _history in HISTORY_LISTS.values():
+    for _name in filter(None, (_history.feed, _history.archive)):
+        # The leave checks also read the leave feed.
+        feeds[_name] = _view(_name, _history, *(('record_id', 'from_day') if _name == 'leave_feed' else ()))
+leave_feed = feeds['leave_feed']
+
+
+def _emp_no(employee_id='employee_id'):
+    return select(employees.c.emp_no).where(employees.c.id == bindparam(employee_id, type_=String)).scalar_subquery()
+
+
+def _history_list(history, mode, archived):
+    """storage._sqlite_list() as a Core construct."""
+    columns = history.columns if mode == 'all' else history.page_columns
+    keys, descending = history.sort, True
+    if mode == 'changes':
+        keys, descending = history.change, False
+
+    def arm(feed):
+        query = select(*((employees if table == 'employees' else feed).c[column].label(label)
+                         for table, column, label in columns))
+        if any(table == 'employees' for table, _, _ in columns):
+            query = query.select_from(feed.join(employees, employees.c.emp_no == feed.c.emp_no))
+        query = query.where(feed.c.emp_no == _emp_no())
+        cursor = tuple_(*(feed.c[key] for key in keys))
+        if mode == 'after':
+            query = query.where(cursor < tuple_(*(bindparam(f'after_{n}') for n in range(len(keys)))))
+        elif mode == 'changes':
+            query = query.where(cursor > tuple_(*(bindparam(f'since_{n}') for n in range(len(keys)))))
+        return query
+
+    query = union_all(arm(feeds[history.feed]), arm(feeds[history.archive])) if archived else arm(feeds[history.feed])
+    # Result columns, so the ORDER BY also covers both arms of a UNION ALL.
+    order = [literal_column(history.label(key)) for key in keys]
+    query = query.order_by(*(column.desc() if descending else column for column in order))
+    return query if mode == 'all' else query.limit(bindparam('limit', type_=Integer))
+
+
+def _latest_change(history):
+    table = metadata.tables[history.table]
+    return select(table.c.updated_ms, table.c.id).where(table.c.emp_no == _emp_no()).order_by(
+        table.c.updated_ms.desc(), table.c.id.desc()).limit(1)
+
+
+def _from_employee(table, values):
+    """INSERT INTO table SELECT <values>, emp_no FROM employees WHERE id = :employee_id."""
+    columns = [*values, 'emp_no']
+    source = select(*(bindparam(name, type_=table.c[name].type) for name in values), employees.c.emp_no)
+    return insert(table).from_select(columns, source.where(employees.c.id == bindparam('employee_id', type_=String)))
+
+
+# --- Statements ---
+# The same operations and parameter names as storage.SQLITE_STATEMENTS.
+# Built once; SQLAlchemy caches each compiled form per dialect.
+STATEMENTS = {
+    'employee_by_id': select(employees).where(employees.c.id == bindparam('employee_id')),
+    'employee_by_email': select(employees).where(employees.c.email == bindparam('email')),
+    'employee_profile_version': select(employees.c.profile_version).where(employees.c.id == bindparam('employee_id')),
+    'employee_insert': insert(employees).values({field: bindparam(field) for field in INSERT_FIELDS}),
+    'employee_update_profile': update(employees).where(employees.c.id == bindparam('employee_id')).values({
+        field: case((bindparam(f'set_{field}', type_=Integer) == 1, bindparam(f'new_{field}', type_=Text)),
+                    else_=employees.c[field])
+        for field in PROFILE_FIELDS
+    }).returning(*employees.c),
+    'employee_set_password': update(employees).where(
+        employees.c.id == bindparam('employee_id'),
+        or_(bindparam('expected', type_=Text).is_(None), employees.c.password == bindparam('expected', type_=Text)),
+    ).values(password=bindparam('password')),
+    'attendance_clock_in': _from_employee(attendance_records, ['uuid', 'day', 'login_s', 'work_location']),
+    'attendance_clock_out': update(attendance_records).where(
+        attendance_records.c.uuid == bindparam('record_uuid'), attendance_records.c.logout_s.is_(None),
+    ).values(logout_s=bindparam('logout_s')).returning(
+        select(employees.c.id).where(employees.c.emp_no == attendance_records.c.emp_no)
+        .scalar_subquery().label('employee_id'),
+        attendance_records.c.day, attendance_records.c.login_s, attendance_records.c.work_location,
+    ),
+    'notification_insert': _from_employee(notifications, ['uuid', 'message']),
+    'notification_unread_count': select(func.count().label('unread')).select_from(notifications).where(
+        notifications.c.emp_no == _emp_no(), notifications.c.is_read == 0),
+    'notification_mark_read': update(notifications).where(
+        notifications.c.emp_no == _emp_no(), notifications.c.is_read == 0).values(is_read=literal_column('1')),
+    'leave_insert': _from_employee(leave_applications,
+                                   ['uuid', 'leave_type', 'from_day', 'to_day', 'description', 'leave_days']),
+    'leave_overlaps': select(leave_feed.c.record_id, leave_feed.c.leave_type, leave_feed.c.from_date,
+                             leave_feed.c.to_date, leave_feed.c.status).select_from(
+        leave_intervals.join(leave_feed, leave_feed.c.id == leave_intervals.c.id)).where(
+        leave_intervals.c.start_day <= bindparam('end_day'), leave_intervals.c.end_day >= bindparam('start_day'),
+        leave_intervals.c.min_emp <= _emp_no(), leave_intervals.c.max_emp >= _emp_no(),
+    ).order_by(leave_feed.c.from_day),
+    'team_on_leave': select(employees.c.id.label('employee_id'), employees.c.first_name, employees.c.last_name,
+                            leave_feed.c.leave_type, leave_feed.c.from_date, leave_feed.c.to_date,
+                            leave_feed.c.status).select_from(
+        leave_intervals.join(leave_feed, leave_feed.c.id == leave_intervals.c.id)
+        .join(employees, employees.c.emp_no == leave_feed.c.emp_no)).where(
+        leave_intervals.c.start_day <= bindparam('day'), leave_intervals.c.end_day >= bindparam('day'),
+        employees.c.department == bindparam('department'),
+    ).order_by(employees.c.id),
+    'team_size': select(func.count().label('team_size')).select_from(employees).where(
+        employees.c.department == bindparam('department')),
+    'report_month': select(*(attendance_monthly.c[column] for column in ['department', *TOTAL_COLUMNS])).where(
+        attendance_monthly.c.month == bindparam('month')).order_by(attendance_monthly.c.department),
+    'report_department': select(*(attendance_monthly.c[column] for column in TOTAL_COLUMNS)).where(
+        attendance_monthly.c.month == bindparam('month'), attendance_monthly.c.department == bindparam('department')),
+}
+for _history in HISTORY_LISTS.values():
+    for _name, _mode, _archived in _history.statement_names():
+        STATEMENTS[_name] = _history_list(_history, _mode, _archived)
+    STATEMENTS[f"{_history.name}_latest"] = _latest_change(_history)
+
+
+# --- Adapter ---
+class SQLAlchemyAdapter:
+    """storage.SQLiteAdapter's interface on a SQLAlchemy Core connection."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    @property
+    def connection(self):
+        return self.conn.connection.dbapi_connection
+
+    def execute(self, name, params):
+        try:
+            result = self.conn.execute(STATEMENTS[name], _flags(params))
+            rows = [dict(row._mapping) for row in result] if result.returns_rows else []
+        except SQLAlchemyError as e:
+            raise StorageError(str(getattr(e, 'orig', None) or e)) from e
+        return rows, result.rowcount
+
+    def execute_many(self, name, params_list):
+        if not params_list:
+            return 0
+        try:
+            return self.conn.execute(STATEMENTS[name], [_flags(params) for params in params_list]).rowcount
+        except SQLAlchemyError as e:
+            raise StorageError(str(getattr(e, 'orig', None) or e)) from e
+
+    def begin_write(self):
+        # SQLite takes its write lock at BEGIN IMMEDIATE; server databases
+        # lock the rows they write, so there is nothing to do up front.
+        if self.conn.dialect.name == 'sqlite':
+            self.conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        self.conn.close()
+
+
+def _flags(params):
+    # Booleans go over as 0/1 so the CASE comparisons work on every backend.
+    return {key: int(value) if isinstance(value, bool) else value for key, value in params.items()}
+
+
+def create_engine_for(app):
+    """Engine for STORAGE_URL, defaulting to the app's SQLite DATABASE file.
+
+    An in-memory SQLite URL (``sqlite://``) gets one connection shared by
+    every thread, so the process sees a single database.
+    """
+    url = make_url(app.config['STORAGE_URL'] or f"sqlite:///{app.config['DATABASE']}")
+    connect_args = {'factory': db.connection_factory(app)} if url.get_backend_name() == 'sqlite' else {}
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        connect_args['check_same_thread'] = False
+        engine = create_engine(url, poolclass=StaticPool, connect_args=connect_args)
+    else:
+        engine = create_engine(url, pool_size=app.config['DB_READER_POOL_SIZE'], connect_args=connect_args)
+    if engine.dialect.name == 'sqlite':
+        @event.listens_for(engine, 'connect')
+        def _configure(dbapi_conn, record):
+            # Same settings as db.ConnectionPool, and Row objects for the helpers
+            # that receive the raw connection.
+            dbapi_conn.row_factory = sqlite3.Row
+            for name, value in db.DEFAULT_PRAGMAS.items():
+                dbapi_conn.execute(f"PRAGMA {name} = {value}")
+            for hook in db.connection_hooks:
+                hook(dbapi_conn)
+    return engine
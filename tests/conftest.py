@@ -0,0 +1,41 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def shipped_db(tmp_path):
+    """A scratch copy of the hrms.db shipped in the repository (schema version 0)."""
+    path = tmp_path / 'hrms.db'
+    shutil.copyfile(os.path.join(ROOT, 'hrms.db'), path)
+    return str(path)
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """create_app() on a scratch database; pools are closed afterwards."""
+    import db
+    from app import create_app
+
+    apps = []
+
+    def make(database=None, **config):
+        app = create_app({
+            'DATABASE': database or str(tmp_path / 'test.db'),
+            'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+            'PASSWORD_HASH_WORKERS': 0,
+            'MAIL_TRANSPORT': 'file',
+            'MAIL_OUTBOX_DIR': str(tmp_path / 'mail'),
+            **config,
+        })
+        apps.append(app)
+        return app
+
+    yield make
+    for app in apps:
+        db.close_pools(app)
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import sqlite3
+from urllib.parse import urlsplit
+
+import pytest
+
+from async_api import AsyncApi
+from metrics import get_metrics
+
+EMPLOYEE = 'SSQ-1001'
+# Values that differ between any two runs (fresh uuids, the current time,
+# cursors that encode either).
+VOLATILE = {'record_id', 'login_time', 'logout_time', 'timestamp', 'notification_id', 'updated_at',
+            'elapsed_ms', 'next_cursor', 'watermark'}
+
+
+class FlaskCaller:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def __call__(self, method, url, body=None):
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        response = self.client.open(url, method=method, data=body, headers=headers)
+        return response.status_code, response.get_json()
+
+    def close(self):
+        pass
+
+
+class AsgiCaller:
+    """Drives an AsyncApi directly with ASGI messages, on one event loop."""
+
+    def __init__(self, app):
+        self.api = AsyncApi(app)
+        self.loop = asyncio.new_event_loop()
+
+    def __call__(self, method, url, body=None):
+        return self.loop.run_until_complete(self._request(method, url, body))
+
+    async def _request(self, method, url, body):
+        parts = urlsplit(url)
+        payload = (body or '').encode()
+        # As a server sends them; the WSGI fallback needs the content length.
+        headers = [(b'content-length', str(len(payload)).encode())]
+        if body is not None:
+            headers.append((b'content-type', b'application/json'))
+        scope = {'type': 'http', 'method': method, 'path': parts.path, 'query_string': parts.query.encode(),
+                 'headers': headers, 'root_path': '', 'scheme': 'http', 'server': ('localhost', 80),
+                 'http_version': '1.1'}
+        sent, received = [], False
+
+        async def receive():
+            nonlocal received
+            if received:
+                await asyncio.sleep(3600)
+            received = True
+            return {'type': 'http.request', 'body': payload, 'more_body': False}
+
+        async def send(message):
+            sent.append(message)
+
+        await self.api(scope, receive, send)
+        status = sent[0]['status']
+        content = b''.join(message.get('body', b'') for message in sent[1:])
+        return status, json.loads(content) if content else None
+
+    def close(self):
+        self.loop.run_until_complete(self.api.close())
+        self.loop.close()
+
+
+def normalized(value):
+    if isinstance(value, dict):
+        return {key: '<volatile>' if key in VOLATILE else normalized(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalized(item) for item in value]
+    return value
+
+
+# --- Scenarios ---
+# Each takes a caller and returns the responses it saw.
+def clock_in_and_out(call):
+    body = json.dumps({"employee_id": EMPLOYEE, "date": "2026-03-02", "work_location": "Office",
+                       "employee_name": "Rohith"})
+    status, login = call('POST', '/attendance/login', body)
+    responses = [(status, login)]
+    record_id = login['record']['record_id']
+    responses.append(call('PUT', f"/attendance/logout/{record_id}"))
+    responses.append(call('PUT', f"/attendance/logout/{record_id}"))
+    return responses
+
+
+def clock_in_errors(call):
+    return [
+        call('POST', '/attendance/login', json.dumps({"employee_id": EMPLOYEE})),
+        call('POST', '/attendance/login', json.dumps({"employee_id": EMPLOYEE, "date": "02/03/2026",
+                                                      "work_location": "Office", "employee_name": "R"})),
+        call('POST', '/attendance/login', json.dumps({"employee_id": "SSQ-0", "date": "2026-03-02",
+                                                      "work_location": "Office", "employee_name": "R"})),
+        call('POST', '/attendance/login', json.dumps(["not", "an", "object"])),
+        call('POST', '/attendance/login', 'not json'),
+        call('PUT', '/attendance/logout/not-a-uuid'),
+        call('PUT', '/attendance/logout/00000000-0000-0000-0000-000000000000'),
+    ]
+
+
+def notifications(call):
+    responses = [call('GET', f"/notifications/{EMPLOYEE}"), call('GET', f"/notifications/unread-count/{EMPLOYEE}")]
+    responses.append(call('POST', '/admin/notifications/broadcast', json.dumps({"message": "Office closed Friday"})))
+    responses += [
+        call('GET', f"/notifications/{EMPLOYEE}?limit=2"),
+        call('GET', f"/notifications/{EMPLOYEE}?limit=2&archived=1"),
+        call('GET', f"/notifications/unread-count/{EMPLOYEE}"),
+        call('PUT', f"/notifications/mark-read/{EMPLOYEE}"),
+        call('GET', f"/notifications/unread-count/{EMPLOYEE}"),
+        call('GET', "/notifications/unread-count/SSQ-0"),
+        call('GET', f"/notifications/{EMPLOYEE}?limit=0"),
+        call('GET', f"/notifications/{EMPLOYEE}?after=bogus"),
+    ]
+    status, page = call('GET', f"/notifications/{EMPLOYEE}?limit=1")
+    responses.append((status, page))
+    if page.get('next_cursor'):
+        responses.append(call('GET', f"/notifications/{EMPLOYEE}?limit=1&after={page['next_cursor']}"))
+    return responses
+
+
+def rollups(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT employee_id, date, sessions FROM attendance_daily ORDER BY 1, 2").fetchall()
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize('scenario', [clock_in_and_out, clock_in_errors, notifications])
+def test_asgi_path_answers_like_the_flask_app(scenario, make_app, shipped_db, tmp_path):
+    results = {}
+    for name, caller in (('flask', FlaskCaller), ('asgi', AsgiCaller)):
+        path = str(tmp_path / f'{name}.db')
+        with open(shipped_db, 'rb') as src, open(path, 'wb') as dst:
+            dst.write(src.read())
+        call = caller(make_app(path))
+        try:
+            results[name] = (normalized(scenario(call)), rollups(path))
+        finally:
+            call.close()
+    assert results['asgi'] == results['flask']
+
+
+def test_asgi_requests_are_timed_in_metrics(make_app, shipped_db):
+    app = make_app(shipped_db, METRICS_ENABLED=True)
+    call = AsgiCaller(app)
+    try:
+        assert call('GET', f"/notifications/unread-count/{EMPLOYEE}")[0] == 200
+    finally:
+        call.close()
+    rendered = get_metrics(app).render()
+    assert ('hrms_http_request_duration_seconds_count{endpoint="api.get_unread_notification_count",'
+            'method="GET",status="200"} 1') in rendered
@@ -0,0 +1,72 @@
+import db
+from attendance_rollups import record_session, rebuild_rollups
+from compact_storage import new_uuid, to_day
+
+# (employee, date, login, logout, location), folded in this order: some days
+# get an earlier session after a later one, which moves their late flag.
+SESSIONS = [
+    ('SSQ-1001', '2026-01-05', '09:00:00', '12:00:00', 'Office'),
+    ('SSQ-1001', '2026-01-05', '13:00:00', '17:30:00', 'Home'),
+    ('SSQ-1001', '2026-01-06', '10:15:00', '18:00:00', 'Office'),
+    ('SSQ-1001', '2026-01-06', '08:45:00', '09:45:00', 'Client site'),
+    ('SSQ-2001', '2026-01-05', '09:45:00', '18:00:00', 'Remote'),
+    ('SSQ-2001', '2026-01-31', '22:00:00', '02:00:00', 'Office'),
+    ('SSQ-2001', '2026-02-02', '09:29:59', '17:00:00', 'Office'),
+    ('SSQ-3001', '2026-02-02', '11:00:00', '15:00:00', 'Home'),
+]
+
+
+def add_employee(conn, employee_id, department):
+    conn.execute("INSERT INTO employees (id, first_name, last_name, email, department, password, user_type) "
+                 "VALUES (?, 'Test', 'User', ?, ?, 'x', 'employee')",
+                 (employee_id, f"{employee_id.lower()}@example.com", department))
+
+
+def fold(conn, employee_id, date, login, logout, location):
+    # Clock-in then clock-out, as the attendance routes do.
+    to_seconds = lambda t: sum(int(part) * unit for part, unit in zip(t.split(':'), (3600, 60, 1)))
+    conn.execute("INSERT INTO attendance_records (uuid, emp_no, day, login_s, logout_s, work_location) "
+                 "SELECT ?, emp_no, ?, ?, ?, ? FROM employees WHERE id = ?",
+                 (new_uuid().bytes, to_day(date), to_seconds(login), to_seconds(logout), location, employee_id))
+    record_session(conn, employee_id, date, login, logout, location)
+
+
+def rollups(conn):
+    return (conn.execute("SELECT * FROM attendance_daily ORDER BY employee_id, date").fetchall(),
+            conn.execute("SELECT * FROM attendance_monthly ORDER BY month, department").fetchall())
+
+
+def test_incremental_rollups_match_a_full_rebuild(make_app, shipped_db):
+    app = make_app(shipped_db)
+    with db.connection(app) as conn:
+        conn.execute("DELETE FROM attendance_records")
+        rebuild_rollups(conn)
+        add_employee(conn, 'SSQ-2001', 'software')
+        add_employee(conn, 'SSQ-3001', '')
+        for session in SESSIONS:
+            fold(conn, *session)
+        incremental = [list(map(tuple, rows)) for rows in rollups(conn)]
+        rebuild_rollups(conn)
+        rebuilt = [list(map(tuple, rows)) for rows in rollups(conn)]
+        conn.rollback()
+    assert incremental == rebuilt
+    departments = {row[1] for row in incremental[1]}
+    assert departments == {'software', 'Unassigned'}
+
+
+def test_department_change_mid_day_stays_in_the_first_department(make_app, shipped_db):
+    app = make_app(shipped_db)
+    with db.connection(app) as conn:
+        conn.execute("DELETE FROM attendance_records")
+        rebuild_rollups(conn)
+        fold(conn, 'SSQ-1001', '2026-03-02', '10:00:00', '12:00:00', 'Office')
+        conn.execute("UPDATE employees SET department = 'finance' WHERE id = 'SSQ-1001'")
+        # An earlier session folded later clears the day's late flag.
+        fold(conn, 'SSQ-1001', '2026-03-02', '08:00:00', '09:00:00', 'Office')
+        monthly = {row['department']: dict(row) for row in
+                   conn.execute("SELECT * FROM attendance_monthly WHERE month = '2026-03'")}
+        conn.rollback()
+    assert list(monthly) == ['software']
+    assert monthly['software']['employee_days'] == 1
+    assert monthly['software']['late_days'] == 0
+    assert monthly['software']['sessions'] == 2
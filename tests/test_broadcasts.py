@@ -0,0 +1,20 @@
+import pytest
+
+
+@pytest.fixture
+def client(make_app, shipped_db):
+    return make_app(shipped_db).test_client()
+
+
+def test_broadcast_reaches_matching_employees(client):
+    response = client.post('/admin/notifications/broadcast', json={"message": "  Office closed Friday  "})
+    assert response.status_code == 201
+    assert response.get_json()['recipients'] >= 1
+    items = client.get('/notifications/SSQ-1001').get_json()
+    assert items[0]['message'] == 'Office closed Friday'
+
+
+@pytest.mark.parametrize('body', [{"message": 42}, {"message": ["hi"]}, {"message": {"text": "hi"}},
+                                  {"message": "   "}, {}, ["hi"]])
+def test_invalid_broadcast_bodies_get_400(client, body):
+    assert client.post('/admin/notifications/broadcast', json=body).status_code == 400
@@ -0,0 +1,103 @@
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import db
+from db import ConnectionPool
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / 'pool.db'), size=2, timeout=0.05)
+    yield pool
+    pool.close_all()
+
+
+def test_exhausted_pool_times_out(pool):
+    held = [pool.acquire(), pool.acquire()]
+    started = time.monotonic()
+    with pytest.raises(sqlite3.OperationalError, match="Timed out"):
+        pool.acquire()
+    assert time.monotonic() - started >= pool.timeout
+    assert pool._opened == 2
+    for conn in held:
+        pool.release(conn)
+
+
+def test_waiter_gets_the_released_connection(pool):
+    pool.timeout = 5.0
+    held = [pool.acquire(), pool.acquire()]
+    threading.Timer(0.05, pool.release, (held[0],)).start()
+    assert pool.acquire() is held[0]
+    assert pool._opened == 2
+
+
+def test_release_rolls_back_an_open_transaction(pool):
+    conn = pool.acquire()
+    conn.execute("CREATE TABLE t (x)")
+    conn.commit()
+    conn.execute("INSERT INTO t VALUES (1)")
+    pool.release(conn)
+    again = pool.acquire()
+    assert again is conn and not again.in_transaction
+    assert again.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+
+def test_broken_connection_is_dropped(pool):
+    conn = pool.acquire()
+    conn.close()
+    pool.release(conn)
+    assert pool._opened == 0
+    fresh = pool.acquire()
+    assert fresh is not conn
+    assert fresh.execute("SELECT 1").fetchone()[0] == 1
+
+
+def test_failed_connect_frees_its_slot(tmp_path):
+    pool = ConnectionPool(str(tmp_path / 'missing' / 'pool.db'), size=1, timeout=0.05)
+    for _ in range(2):
+        with pytest.raises(sqlite3.OperationalError, match="unable to open"):
+            pool.acquire()
+    assert pool._opened == 0
+
+
+def test_reader_pool_is_query_only(tmp_path):
+    pool = ConnectionPool(str(tmp_path / 'pool.db'), readonly=True)
+    conn = pool.acquire()
+    with pytest.raises(sqlite3.OperationalError, match="readonly"):
+        conn.execute("CREATE TABLE t (x)")
+    pool.release(conn)
+    pool.close_all()
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs fork")
+def test_forked_worker_opens_its_own_pools(make_app):
+    app = make_app()
+    with app.app_context():
+        parent_reader, parent_writer = db.get_pools(app)
+        parent_conn = parent_reader.acquire()
+        parent_reader.release(parent_conn)
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            os.close(read_end)
+            reader, writer = db.get_pools(app)
+            conn = reader.acquire()
+            fresh = (reader is not parent_reader and writer is not parent_writer and conn is not parent_conn
+                     and db.get_pools(app) == (reader, writer))
+            status = 0 if fresh and conn.execute("SELECT 1").fetchone()[0] == 1 else 2
+        finally:
+            os.write(write_end, bytes([status]))
+            os._exit(0)
+    os.close(write_end)
+    try:
+        assert os.read(read_end, 1) == b'\x00'
+    finally:
+        os.close(read_end)
+        os.waitpid(pid, 0)
+    assert db.get_pools(app) == (parent_reader, parent_writer)
@@ -0,0 +1,106 @@
+import json
+
+import pytest
+
+EXISTING = ('SSQ-1001', 'rohith@gmail.com')
+HEADER = 'id,first_name,last_name,email,password\n'
+
+
+@pytest.fixture
+def client(make_app, shipped_db):
+    return make_app(shipped_db).test_client()
+
+
+def upload_csv(client, text, **args):
+    return client.post('/admin/employees/import', query_string=args, data=text.encode(),
+                       content_type='text/csv')
+
+
+def upload_ndjson(client, records):
+    lines = [record if isinstance(record, str) else json.dumps(record) for record in records]
+    return client.post('/admin/employees/import', data='\n'.join(lines).encode(),
+                       content_type='application/x-ndjson')
+
+
+def errors_by_line(report):
+    return {error['line']: error['errors'] for error in report['errors']}
+
+
+def test_bad_csv_rows_are_reported_by_line(client):
+    response = upload_csv(client, HEADER
+                          + ',Asha,Rao,asha@example.com,pw\n'
+                          + ',Bilal,,bilal@example.com,pw\n'
+                          + ',Chen,Li,not-an-email,pw\n'
+                          + ',Dev,Nair,dev@example.com,pw,extra\n'
+                          + ',Esha,Roy,esha@example.com,pw\n')
+    assert response.status_code == 201
+    report = response.get_json()
+    assert report['imported'] == 2 and report['failed'] == 3
+    assert [employee['line'] for employee in report['employees']] == [2, 6]
+    assert errors_by_line(report) == {
+        3: ["last_name is required"],
+        4: ["email is not a valid address"],
+        5: ["Row has more values than the header"],
+    }
+    assert report['errors_truncated'] is False
+
+
+def test_bad_ndjson_lines_are_reported_by_line(client):
+    response = upload_ndjson(client, [
+        {"first_name": "Asha", "last_name": "Rao", "email": "asha@example.com", "password": "pw"},
+        '{"first_name": ',
+        '["not", "an", "object"]',
+        {"first_name": "Dev", "last_name": ["Nair"], "email": "dev@example.com"},
+    ])
+    assert response.status_code == 201
+    errors = errors_by_line(response.get_json())
+    assert errors[2][0].startswith("Invalid JSON")
+    assert errors[3] == ["Each line must be a JSON object"]
+    assert errors[4] == ["last_name must be a scalar value", "last_name is required"]
+
+
+def test_duplicate_emails(client):
+    response = upload_csv(client, HEADER
+                          + f',Rohith,K,{EXISTING[1]},pw\n'
+                          + ',Asha,Rao,asha@example.com,pw\n'
+                          + ',Asha,Again,asha@example.com,pw\n')
+    report = response.get_json()
+    assert report['imported'] == 1
+    assert errors_by_line(report) == {2: ["Email already exists"], 4: ["Duplicate email in upload"]}
+    # A second upload of the same row now clashes with the stored employee.
+    report = upload_csv(client, HEADER + ',Asha,Rao,asha@example.com,pw\n').get_json()
+    assert errors_by_line(report) == {2: ["Email already exists"]}
+
+
+def test_uploaded_ids_are_ignored(client):
+    # Ids are always allocated from id_sequences, so repeated or existing ids
+    # in the upload cannot collide with each other or with stored rows.
+    response = upload_csv(client, HEADER
+                          + f'{EXISTING[0]},Asha,Rao,asha@example.com,pw\n'
+                          + f'{EXISTING[0]},Bilal,Khan,bilal@example.com,pw\n')
+    assert response.status_code == 201
+    ids = [employee['id'] for employee in response.get_json()['employees']]
+    assert len(set(ids)) == 2 and EXISTING[0] not in ids
+    assert client.get(f'/profile/{EXISTING[0]}').get_json()['email'] == EXISTING[1]
+
+
+def test_rows_span_chunks(client):
+    rows = ''.join(f',Name{n},Last,user{n}@example.com,pw\n' for n in range(5))
+    report = upload_csv(client, HEADER + rows + ',Dup,Last,user0@example.com,pw\n', chunk_size=2).get_json()
+    assert report['imported'] == 5
+    assert [employee['line'] for employee in report['employees']] == [2, 3, 4, 5, 6]
+    numbers = [int(employee['id'].split('-')[1]) for employee in report['employees']]
+    assert numbers == list(range(numbers[0], numbers[0] + 5))
+    assert errors_by_line(report) == {7: ["Duplicate email in upload"]}
+
+
+@pytest.mark.parametrize('chunk_size', ['0', '-1', '1001', 'many'])
+def test_chunk_size_out_of_range(client, chunk_size):
+    response = upload_csv(client, HEADER + ',Asha,Rao,asha@example.com,pw\n', chunk_size=chunk_size)
+    assert response.status_code == 400
+    assert 'chunk_size' in response.get_json()['message']
+
+
+def test_largest_chunk_size_is_accepted(client):
+    response = upload_csv(client, HEADER + ',Asha,Rao,asha@example.com,pw\n', chunk_size='1000')
+    assert response.status_code == 201
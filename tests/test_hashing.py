@@ -0,0 +1,90 @@
+import sqlite3
+
+import pytest
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from hashing import HasherBusy, PasswordHasher, get_hasher
+
+EMAIL = 'rohith@gmail.com'
+OLD_METHOD = 'pbkdf2:sha256:500'
+
+
+def store_password(path, pwhash):
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("UPDATE employees SET password = ? WHERE email = ?", (pwhash, EMAIL))
+    conn.close()
+
+
+def stored_password(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT password FROM employees WHERE email = ?", (EMAIL,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def login(client, password='secret'):
+    return client.post('/login', json={"username": EMAIL, "password": password, "user_type": "employee"})
+
+
+@pytest.fixture
+def app(make_app, shipped_db):
+    app = make_app(shipped_db)
+    store_password(shipped_db, generate_password_hash('secret', app.config['PASSWORD_HASH_METHOD']))
+    return app
+
+
+def test_full_queue_raises_busy():
+    hasher = PasswordHasher('pbkdf2:sha256:1000', workers=0, max_pending=1, timeout=0.01)
+    hasher._slots.acquire()
+    with pytest.raises(HasherBusy):
+        hasher.hash('secret')
+    hasher._slots.release()
+    assert hasher.verify(hasher.hash('secret'), 'secret')
+    assert hasher.stats()['rejected'] == 1
+
+
+def test_full_queue_returns_503(app):
+    hasher = get_hasher(app)
+    hasher.timeout = 0.01
+    for _ in range(hasher.max_pending):
+        hasher._slots.acquire()
+    try:
+        response = login(app.test_client())
+    finally:
+        for _ in range(hasher.max_pending):
+            hasher._slots.release()
+    assert response.status_code == 503
+    assert login(app.test_client()).status_code == 200
+
+
+def test_login_rehashes_under_a_new_policy(app, shipped_db):
+    store_password(shipped_db, generate_password_hash('secret', OLD_METHOD))
+    client = app.test_client()
+    assert login(client).status_code == 200
+    upgraded = stored_password(shipped_db)
+    assert upgraded.startswith(app.config['PASSWORD_HASH_METHOD'] + '$')
+    assert check_password_hash(upgraded, 'secret')
+    assert get_hasher(app).stats()['rehashes'] == 1
+    # Already under the current policy: nothing more to do.
+    assert login(client).status_code == 200
+    assert stored_password(shipped_db) == upgraded
+    assert get_hasher(app).stats()['rehashes'] == 1
+
+
+def test_rehash_loses_to_a_concurrent_password_change(app, shipped_db, monkeypatch):
+    store_password(shipped_db, generate_password_hash('secret', OLD_METHOD))
+    changed = generate_password_hash('changed', app.config['PASSWORD_HASH_METHOD'])
+    hasher = get_hasher(app)
+    hash_password = hasher.hash
+
+    def hash_during_change(password):
+        # The password is changed elsewhere while the rehash is computed.
+        store_password(shipped_db, changed)
+        return hash_password(password)
+
+    monkeypatch.setattr(hasher, 'hash', hash_during_change)
+    assert login(app.test_client()).status_code == 200
+    assert stored_password(shipped_db) == changed
+    assert hasher.stats()['rehashes'] == 0
@@ -0,0 +1,30 @@
+import pytest
+
+EMPLOYEE = 'SSQ-1001'
+
+
+@pytest.fixture
+def client(make_app, shipped_db):
+    return make_app(shipped_db).test_client()
+
+
+def test_last_representable_year_is_served(client):
+    response = client.get('/leave-calendar/working-days?from_date=9999-12-30&to_date=9999-12-31')
+    assert response.status_code == 200
+    assert response.get_json()['working_days'] == 2
+    assert client.get(f'/team-availability?employee_id={EMPLOYEE}&date=9999-12-31').status_code == 200
+    response = client.post('/leave-application', json={
+        "employee_id": EMPLOYEE, "leave_type": "Sick Leave", "from_date": "9999-12-30", "to_date": "9999-12-31"})
+    assert response.status_code == 201
+    assert response.get_json()['leave_days'] == 2
+
+
+@pytest.mark.parametrize('dates', [
+    {"from_date": 20250101},
+    {"from_date": "2025-01-01", "to_date": 20250102},
+    {"from_date": ["2025-01-01"]},
+])
+def test_non_string_dates_are_rejected(client, dates):
+    response = client.post('/leave-application', json={"employee_id": EMPLOYEE, "leave_type": "Sick Leave", **dates})
+    assert response.status_code == 400
+    assert 'YYYY-MM-DD' in response.get_json()['message']
@@ -0,0 +1,117 @@
+import pytest
+
+import db
+import mailer
+from mailer import MailOutbox
+
+BACKOFF = 10.0
+LEASE = 60.0
+
+
+class Crash(BaseException):
+    """Stands in for a worker dying between the claim and the send."""
+
+
+class FakeTransport:
+    def __init__(self):
+        self.sent = []
+        self.fail_with = None
+
+    def send_batch(self, messages):
+        if isinstance(self.fail_with, BaseException) and not isinstance(self.fail_with, Exception):
+            raise self.fail_with
+        self.sent.extend(messages)
+        return [self.fail_with] * len(messages)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(mailer.time, 'time', clock)
+    monkeypatch.setattr(mailer.random, 'uniform', lambda low, high: 1.0)
+    return clock
+
+
+@pytest.fixture
+def outbox(make_app, clock):
+    app = make_app(MAIL_WORKERS=0)
+    return MailOutbox(app, FakeTransport(), workers=0, max_attempts=3, backoff_seconds=BACKOFF,
+                      lease_seconds=LEASE)
+
+
+def enqueue(outbox):
+    with db.connection(outbox.app) as conn:
+        message_id = outbox.enqueue(conn, ['asha@example.com'], 'Welcome', 'temporary password: x')
+        conn.commit()
+    return message_id
+
+
+def row(outbox, message_id):
+    with db.connection(outbox.app, readonly=True) as conn:
+        return dict(conn.execute("SELECT * FROM mail_outbox WHERE id = ?", (message_id,)).fetchone())
+
+
+def test_sent_message_drops_its_body(outbox):
+    message_id = enqueue(outbox)
+    assert outbox.process_once() == 1
+    assert [message['recipients'] for message in outbox.transport.sent] == [['asha@example.com']]
+    sent = row(outbox, message_id)
+    assert (sent['status'], sent['body'], sent['attempts']) == ('sent', None, 1)
+    assert outbox.process_once() == 0
+
+
+def test_failures_back_off_exponentially_then_give_up(outbox, clock):
+    outbox.transport.fail_with = OSError("connection refused")
+    message_id = enqueue(outbox)
+    for attempt, delay in ((1, BACKOFF), (2, 2 * BACKOFF)):
+        assert outbox.process_once() == 1
+        pending = row(outbox, message_id)
+        assert (pending['status'], pending['attempts']) == ('pending', attempt)
+        assert pending['next_attempt_at'] == clock.now + delay
+        assert pending['last_error'] == "connection refused"
+        clock.now += delay - 1
+        assert outbox.process_once() == 0
+        clock.now += 1
+    assert outbox.process_once() == 1
+    failed = row(outbox, message_id)
+    assert (failed['status'], failed['attempts'], failed['body']) == ('failed', 3, None)
+    assert outbox.counters == {'sent': 0, 'retried': 2, 'failed': 1}
+    clock.now += 1000 * BACKOFF
+    assert outbox.process_once() == 0
+
+
+def test_batch_level_error_retries_every_message(outbox):
+    class Broken:
+        def send_batch(self, messages):
+            raise ConnectionError("SMTP server went away")
+
+    outbox.transport = Broken()
+    ids = [enqueue(outbox), enqueue(outbox)]
+    assert outbox.process_once() == 2
+    assert [row(outbox, message_id)['status'] for message_id in ids] == ['pending', 'pending']
+    assert outbox.counters['retried'] == 2
+
+
+def test_expired_lease_is_reclaimed(outbox, clock):
+    message_id = enqueue(outbox)
+    outbox.transport.fail_with = Crash()
+    with pytest.raises(Crash):
+        outbox.process_once()
+    assert row(outbox, message_id)['status'] == 'sending'
+
+    outbox.transport.fail_with = None
+    clock.now += LEASE - 1
+    assert outbox.process_once() == 0
+    clock.now += 2
+    assert outbox.process_once() == 1
+    sent = row(outbox, message_id)
+    assert (sent['status'], sent['attempts']) == ('sent', 2)
+    assert len(outbox.transport.sent) == 1
@@ -0,0 +1,64 @@
+import re
+import sqlite3
+
+import db
+import metrics
+
+
+def series(text):
+    """{name{labels}: value} for every sample line of a Prometheus text page."""
+    return {line.rsplit(' ', 1)[0]: float(line.rsplit(' ', 1)[1])
+            for line in text.splitlines() if line and not line.startswith('#')}
+
+
+def test_metrics_page_names_and_labels(make_app, shipped_db):
+    client = make_app(shipped_db, METRICS_ENABLED=True).test_client()
+    assert client.get('/notifications/SSQ-1001').status_code == 200
+    assert client.get('/notifications/unread-count/SSQ-1001').status_code == 200
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    text = response.get_data(as_text=True)
+    samples = series(text)
+
+    for name, kind in (('hrms_http_request_duration_seconds', 'histogram'),
+                       ('hrms_http_request_sql_statements_total', 'counter'),
+                       ('hrms_http_request_sql_seconds_total', 'counter'),
+                       ('hrms_sql_statement_duration_seconds', 'histogram'),
+                       ('hrms_span_duration_seconds', 'histogram'),
+                       ('hrms_slow_queries_total', 'counter'),
+                       ('hrms_sse_subscribers', 'gauge'),
+                       ('hrms_profile_cache_entries', 'gauge')):
+        assert f"# TYPE {name} {kind}" in text
+    labels = 'endpoint="api.get_notifications",method="GET",status="200"'
+    assert samples[f'hrms_http_request_duration_seconds_count{{{labels}}}'] == 1
+    assert samples[f'hrms_http_request_duration_seconds_bucket{{{labels},le="+Inf"}}'] == 1
+    assert samples['hrms_http_request_sql_statements_total{endpoint="api.get_notifications"}'] >= 1
+    assert samples['hrms_sql_statement_duration_seconds_count{verb="SELECT"}'] >= 2
+    buckets = [line for line in text.splitlines()
+               if line.startswith('hrms_http_request_duration_seconds_bucket{' + labels)]
+    assert all(re.search(r'le="[0-9.]+"|le="\+Inf"', line) for line in buckets)
+
+
+def test_timed_connections_are_scoped_to_the_metrics_app(make_app, tmp_path):
+    timed = make_app(str(tmp_path / 'timed.db'), METRICS_ENABLED=True)
+    plain = make_app(str(tmp_path / 'plain.db'))
+    with db.connection(timed, readonly=True) as conn:
+        assert isinstance(conn, metrics.TimedConnection)
+    with db.connection(plain, readonly=True) as conn:
+        assert type(conn) is sqlite3.Connection
+
+
+def test_every_way_of_reading_rows_is_timed(monkeypatch):
+    fetches = []
+    monkeypatch.setattr(metrics, '_record_fetch', fetches.append)
+    conn = sqlite3.connect(':memory:', factory=metrics.TimedConnection)
+    conn.execute("CREATE TABLE t (x)")
+    conn.executemany("INSERT INTO t VALUES (?)", [(1,), (2,), (3,)])
+    conn.execute("SELECT x FROM t").fetchone()
+    conn.execute("SELECT x FROM t").fetchmany(2)
+    conn.execute("SELECT x FROM t").fetchall()
+    assert len(fetches) == 3
+    assert [row[0] for row in conn.execute("SELECT x FROM t")] == [1, 2, 3]
+    # One per row plus the final step that finds no more.
+    assert len(fetches) == 7
+    conn.close()
@@ -0,0 +1,163 @@
+import sqlite3
+
+import pytest
+
+import db
+from migrations import MIGRATIONS, apply_migrations, schema_version
+
+LATEST = MIGRATIONS[-1][0]
+
+
+def legacy_rows(path):
+    """Rows of the TEXT-keyed tables, as the API has always exposed them."""
+    conn = sqlite3.connect(path)
+    try:
+        return {
+            'employees': set(conn.execute("SELECT id, email FROM employees")),
+            'attendance_records': set(conn.execute(
+                "SELECT record_id, employee_id, date, login_time, logout_time, work_location "
+                "FROM attendance_records")),
+            'notifications': set(conn.execute(
+                "SELECT notification_id, employee_id, message, is_read FROM notifications")),
+            'leave_applications': set(conn.execute(
+                "SELECT record_id, employee_id, leave_type, from_date, to_date, status FROM leave_applications")),
+        }
+    finally:
+        conn.close()
+
+
+def migrated_rows(app):
+    with db.connection(app, readonly=True) as conn:
+        return {
+            'employees': {tuple(row) for row in conn.execute("SELECT id, email FROM employees")},
+            'attendance_records': {tuple(row) for row in conn.execute(
+                "SELECT record_id, employee_id, date, login_time, logout_time, work_location "
+                "FROM attendance_feed")},
+            'notifications': {tuple(row) for row in conn.execute(
+                "SELECT notification_id, employee_id, message, is_read FROM notification_feed")},
+            'leave_applications': {tuple(row) for row in conn.execute(
+                "SELECT record_id, employee_id, leave_type, from_date, to_date, status FROM leave_feed")},
+        }
+
+
+def test_shipped_database_migrates_with_rows_and_keys_intact(shipped_db, make_app):
+    before = legacy_rows(shipped_db)
+    app = make_app(shipped_db)
+    after = migrated_rows(app)
+
+    for table, rows in before.items():
+        assert len(after[table]) == len(rows), table
+        assert after[table] == rows, table
+    with db.connection(app, readonly=True) as conn:
+        assert schema_version(conn) == LATEST
+        assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+        emp_nos = [row[0] for row in conn.execute("SELECT emp_no FROM employees")]
+        assert None not in emp_nos and len(set(emp_nos)) == len(emp_nos)
+        assert conn.execute("SELECT emp_no FROM employees WHERE id = 'SSQ-1001'").fetchone()[0] == 1001
+
+
+def test_zero_padded_ids_do_not_collide(shipped_db, make_app):
+    conn = sqlite3.connect(shipped_db)
+    for n, employee_id in enumerate(('SSQ-0007', 'SSQ-7', 'SSQ-007')):
+        conn.execute("INSERT INTO employees (id, first_name, last_name, email, password) VALUES (?, 'P', 'Q', ?, 'x')",
+                     (employee_id, f"pad{n}@example.com"))
+        conn.execute("INSERT INTO attendance_records (record_id, employee_id, date, login_time, work_location) "
+                     "VALUES (?, ?, '2025-03-03', '09:00:00', 'Office')",
+                     (f"00000000-0000-4000-8000-00000000000{n}", employee_id))
+    conn.commit()
+    conn.close()
+    before = legacy_rows(shipped_db)
+
+    app = make_app(shipped_db)
+    assert migrated_rows(app)['attendance_records'] == before['attendance_records']
+    with db.connection(app) as conn:
+        numbers = dict(conn.execute("SELECT id, emp_no FROM employees WHERE id GLOB 'SSQ-*7'").fetchall())
+        assert numbers['SSQ-0007'] == 7
+        assert numbers['SSQ-7'] < 0 and numbers['SSQ-007'] < 0 and numbers['SSQ-7'] != numbers['SSQ-007']
+        # New rows go through the insert trigger, which skips taken numbers the same way.
+        for n, employee_id in enumerate(('SSQ-0008', 'SSQ-8')):
+            conn.execute("INSERT INTO employees (id, first_name, last_name, email, password) "
+                         "VALUES (?, 'P', 'Q', ?, 'x')", (employee_id, f"new{n}@example.com"))
+        conn.commit()
+        numbers = dict(conn.execute("SELECT id, emp_no FROM employees WHERE id GLOB 'SSQ-*8'").fetchall())
+        assert numbers['SSQ-0008'] == 8 and numbers['SSQ-8'] < 0
+
+
+def test_failed_callable_step_rolls_the_migration_back(tmp_path):
+    def boom(conn):
+        raise RuntimeError("step failed")
+
+    conn = sqlite3.connect(tmp_path / 'scratch.db')
+    with pytest.raises(RuntimeError):
+        apply_migrations(conn, [(1, "Half-applied", ["CREATE TABLE half (a)", boom])])
+    assert not conn.in_transaction
+    assert schema_version(conn) == 0
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'half'").fetchone() is None
+    conn.close()
+
+
+def schema(conn):
+    return sorted(tuple(row) for row in conn.execute(
+        "SELECT type, name, tbl_name, sql FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'"))
+
+
+def contents(conn):
+    tables = ('id_sequences', 'attendance_daily', 'attendance_monthly', 'leave_intervals')
+    return {table: sorted(tuple(row) for row in conn.execute(f"SELECT * FROM {table}")) for table in tables}
+
+
+@pytest.fixture
+def migrated_from_zero(shipped_db, tmp_path):
+    path = str(tmp_path / 'direct.db')
+    conn = sqlite3.connect(shipped_db)
+    conn.execute(f"VACUUM INTO '{path}'")
+    conn.close()
+    conn = sqlite3.connect(path)
+    assert schema_version(conn) == 0
+    apply_migrations(conn)
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize('start', range(1, LATEST))
+def test_upgrade_from_every_intermediate_version(start, shipped_db, make_app, migrated_from_zero):
+    before = legacy_rows(shipped_db)
+    conn = sqlite3.connect(shipped_db)
+    assert apply_migrations(conn, target=start) == list(range(1, start + 1))
+    conn.close()
+
+    app = make_app(shipped_db)
+    assert migrated_rows(app) == before
+    with db.connection(app, readonly=True) as conn:
+        assert schema_version(conn) == LATEST
+        assert schema(conn) == schema(migrated_from_zero)
+        assert contents(conn) == contents(migrated_from_zero)
+
+
+def test_empty_database_migrates_from_version_zero(make_app, tmp_path):
+    app = make_app(str(tmp_path / 'empty.db'))
+    with db.connection(app, readonly=True) as conn:
+        assert schema_version(conn) == LATEST
+    response = app.test_client().post('/register', json={
+        "first_name": "Asha", "last_name": "Rao", "email": "asha@example.com", "password": "pw"})
+    assert response.status_code == 201
+
+
+def test_failed_step_in_a_real_migration_leaves_the_previous_version(shipped_db, make_app):
+    def boom(conn):
+        raise RuntimeError("step failed")
+
+    version, description, steps = MIGRATIONS[-1]
+    conn = sqlite3.connect(shipped_db)
+    apply_migrations(conn, target=version - 1)
+    with pytest.raises(RuntimeError):
+        apply_migrations(conn, MIGRATIONS[:-1] + [(version, description, [*steps, boom])])
+    assert not conn.in_transaction
+    assert schema_version(conn) == version - 1
+    assert 'profile_version' not in [row[1] for row in conn.execute("PRAGMA table_info(employees)")]
+    conn.close()
+
+    # The next start retries it from a clean state.
+    app = make_app(shipped_db)
+    with db.connection(app, readonly=True) as conn:
+        assert schema_version(conn) == version
@@ -0,0 +1,84 @@
+import json
+import sqlite3
+
+from events import NotificationHub, get_hub, get_stream_slots
+
+
+def any_employee_id(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT id FROM employees ORDER BY id LIMIT 1").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_streams_past_the_limit_are_refused_until_one_closes(make_app, shipped_db):
+    app = make_app(shipped_db, SSE_MAX_STREAMS=2)
+    url = f"/notifications/stream/{any_employee_id(shipped_db)}"
+    client = app.test_client()
+    first = client.get(url, buffered=False)
+    second = client.get(url, buffered=False)
+    assert (first.status_code, second.status_code) == (200, 200)
+
+    refused = client.get(url, buffered=False)
+    assert refused.status_code == 503
+    assert refused.headers['Retry-After'] == '30'
+
+    first.close()
+    third = client.get(url, buffered=False)
+    assert third.status_code == 200
+    second.close()
+    third.close()
+
+
+def test_hub_fans_out_to_every_subscriber_of_an_employee():
+    hub = NotificationHub()
+    first, second = hub.subscribe('A'), hub.subscribe('A')
+    other = hub.subscribe('B')
+    hub.publish('A')
+    assert first.is_set() and second.is_set() and not other.is_set()
+    hub.publish('nobody')
+    hub.publish_all()
+    assert other.is_set()
+
+    hub.unsubscribe('A', first)
+    first.clear()
+    hub.publish('A')
+    assert not first.is_set()
+    hub.unsubscribe('A', second)
+    hub.unsubscribe('B', other)
+    hub.unsubscribe('B', other)
+    assert hub.subscriber_count() == 0 and not hub._subscribers
+
+
+def read_until_event(chunks):
+    for chunk in chunks:
+        text = chunk.decode()
+        if 'event: notification' in text:
+            return json.loads(text.split('data: ', 1)[1])
+    raise AssertionError("stream ended without a notification")
+
+
+def test_broadcast_reaches_every_open_stream_and_disconnect_frees_the_slot(make_app, shipped_db):
+    app = make_app(shipped_db, SSE_MAX_STREAMS=2, SSE_HEARTBEAT_SECONDS=0.05)
+    url = f"/notifications/stream/{any_employee_id(shipped_db)}"
+    client = app.test_client()
+    streams = [client.get(url, buffered=False) for _ in range(2)]
+    chunks = [iter(stream.response) for stream in streams]
+    assert [next(stream).decode() for stream in chunks] == ["retry: 5000\n\n"] * 2
+    hub = get_hub(app)
+    assert hub.subscriber_count() == 2
+
+    response = client.post('/admin/notifications/broadcast', json={"message": "Office closed Friday"})
+    assert response.status_code == 201
+    assert [read_until_event(stream)['message'] for stream in chunks] == ["Office closed Friday"] * 2
+
+    streams[0].close()
+    assert hub.subscriber_count() == 1
+    replacement = client.get(url, buffered=False)
+    assert replacement.status_code == 200
+    streams[1].close()
+    replacement.close()
+    assert hub.subscriber_count() == 0
+    slots = get_stream_slots(app)
+    assert all(slots.acquire(blocking=False) for _ in range(2))
@@ -0,0 +1,149 @@
+import base64
+import sqlite3
+
+import pytest
+
+from pagination import MAX_LIMIT, decode_cursor, encode_cursor, parse_page_request
+
+EMPLOYEE = 'SSQ-1001'
+EMP_NO = "(SELECT emp_no FROM employees WHERE id = 'SSQ-1001')"
+
+
+def raw_cursor(text):
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip('=')
+
+
+# --- Cursors ---
+@pytest.mark.parametrize('values', [[0, 0], [1, 2, 3], [-5, 2 ** 62]])
+def test_cursor_round_trip(values):
+    token = encode_cursor(values)
+    assert '=' not in token
+    assert decode_cursor(token, len(values)) == values
+
+
+@pytest.mark.parametrize('token', [
+    'garbage!', 'AAAA', raw_cursor('{"a": 1}'), raw_cursor('[1]'), raw_cursor('[1, 2, 3]'),
+    raw_cursor('["2026-01-01", 1]'), raw_cursor('[1.5, 2]'), raw_cursor('[true, 1]'), raw_cursor('[1, null]'),
+])
+def test_bad_cursor_is_rejected(token):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(token, 2)
+
+
+@pytest.mark.parametrize('args, message', [
+    ({'limit': 'ten'}, "limit must be an integer"),
+    ({'limit': '0'}, "limit must be between"),
+    ({'limit': str(MAX_LIMIT + 1)}, "limit must be between"),
+    ({'after': encode_cursor([1, 2]), 'since': encode_cursor([1, 2])}, "cannot be combined"),
+])
+def test_bad_page_request(args, message):
+    with pytest.raises(ValueError, match=message):
+        parse_page_request(args, sort_size=2)
+
+
+def test_plain_list_without_paging_parameters():
+    assert parse_page_request({'archived': '1'}, sort_size=2) is None
+
+
+# --- Endpoints ---
+@pytest.fixture
+def app(make_app, shipped_db):
+    return make_app(shipped_db)
+
+
+@pytest.fixture
+def conn(app, shipped_db):
+    conn = sqlite3.connect(shipped_db, isolation_level=None)
+    yield conn
+    conn.close()
+
+
+def seed_notifications(conn):
+    conn.execute(f"DELETE FROM notifications WHERE emp_no = {EMP_NO}")
+    # Pairs of rows share created_s and every row shares updated_ms, so
+    # pages can only be told apart by the id tie-breaker.
+    for n in range(9):
+        conn.execute(f'''INSERT INTO notifications (uuid, emp_no, message, created_s, updated_ms)
+                         VALUES (randomblob(16), {EMP_NO}, ?, ?, 5000)''', (f'n{n}', 1000 + n // 2))
+
+
+def seed_attendance(conn):
+    conn.execute(f"DELETE FROM attendance_records WHERE emp_no = {EMP_NO}")
+    for n in range(9):
+        conn.execute(f'''INSERT INTO attendance_records (uuid, emp_no, day, login_s, work_location, updated_ms)
+                         VALUES (randomblob(16), {EMP_NO}, ?, ?, ?, 5000)''', (20000 + n // 4, 3600 * (n % 2), f'w{n}'))
+
+
+ENDPOINTS = {
+    'notifications': (f'/notifications/{EMPLOYEE}', 'message', 2, seed_notifications),
+    'attendance': (f'/attendance/{EMPLOYEE}', 'work_location', 3, seed_attendance),
+}
+
+
+def walk(client, url, key, **args):
+    """Follow next_cursor to the end; returns the items' ``key`` values and the last response."""
+    values, cursor_arg = [], 'since' if 'since' in args else 'after'
+    while True:
+        body = client.get(url, query_string=args).get_json()
+        values += [item[key] for item in body['items']]
+        if not body['next_cursor']:
+            return values, body
+        args[cursor_arg] = body['next_cursor']
+
+
+@pytest.fixture(params=sorted(ENDPOINTS))
+def endpoint(request, conn):
+    url, key, sort_size, seed = ENDPOINTS[request.param]
+    seed(conn)
+    return url, key, sort_size
+
+
+@pytest.mark.parametrize('limit', [1, 2, 3, 4, 9, 10])
+def test_pages_cover_every_row_once(app, endpoint, limit):
+    url, key, _ = endpoint
+    client = app.test_client()
+    everything = [item[key] for item in client.get(url).get_json()]
+    assert len(everything) == 9
+    values, _ = walk(client, url, key, limit=limit)
+    assert values == everything
+
+
+def test_tampered_cursor_is_rejected(app, endpoint):
+    url, _, sort_size = endpoint
+    client = app.test_client()
+    first = client.get(url, query_string={'limit': 2}).get_json()
+    for param, cursor, size in (('after', first['next_cursor'], sort_size), ('since', first['watermark'], 2)):
+        values = decode_cursor(cursor, size)
+        for tampered in ('not-a-cursor', cursor[:-3], encode_cursor(values[:-1]), encode_cursor(values + [1]),
+                         encode_cursor([str(value) for value in values])):
+            response = client.get(url, query_string={'limit': 2, param: tampered})
+            assert response.status_code == 400, (param, tampered)
+            assert response.get_json()['message'] == "Invalid cursor"
+
+
+def test_since_returns_each_change_once_across_ties(app, endpoint, conn):
+    url, key, _ = endpoint
+    table = 'notifications' if 'notifications' in url else 'attendance_records'
+    client = app.test_client()
+    first = client.get(url, query_string={'limit': 4}).get_json()
+    # Nothing has changed since the watermark of a fresh first page.
+    assert walk(client, url, key, since=first['watermark'], limit=2)[0] == []
+
+    # Every row shares updated_ms, so the incremental order is by id alone.
+    ids = [row[0] for row in conn.execute(f"SELECT id FROM {table} WHERE emp_no = {EMP_NO} ORDER BY id")]
+    changes, last = walk(client, url, key, since=encode_cursor([0, 0]), limit=2)
+    assert len(changes) == 9 and len(set(changes)) == 9
+    assert decode_cursor(last['watermark'], 2) == [5000, ids[-1]]
+
+    # A watermark taken part way through the tie resumes right after its id.
+    half = client.get(url, query_string={'since': encode_cursor([0, 0]), 'limit': 4}).get_json()['watermark']
+    assert decode_cursor(half, 2) == [5000, ids[3]]
+    assert walk(client, url, key, since=half, limit=2)[0] == changes[4:]
+
+    # Rows changed later come after the tie, oldest change first.
+    conn.execute(f"UPDATE {table} SET updated_ms = 6000 WHERE id = ?", (ids[1],))
+    conn.execute(f"UPDATE {table} SET updated_ms = 7000 WHERE id = ?", (ids[0],))
+    latest, body = walk(client, url, key, since=half, limit=2)
+    assert latest == changes[4:] + [changes[1], changes[0]]
+    assert decode_cursor(body['watermark'], 2) == [7000, ids[0]]
+    assert walk(client, url, key, since=body['watermark'], limit=2)[0] == []
@@ -0,0 +1,38 @@
+import pytest
+
+EMPLOYEE = 'SSQ-1001'
+
+
+@pytest.fixture
+def workers(make_app, shipped_db):
+    # Two apps on one database stand in for two worker processes, each with
+    # its own in-process cache.
+    first = make_app(shipped_db)
+    return first.test_client(), make_app(shipped_db).test_client()
+
+
+def test_write_in_another_worker_is_seen_immediately(workers):
+    a, b = workers
+    before = a.get(f'/profile/{EMPLOYEE}')
+    assert before.status_code == 200
+    assert a.get(f'/profile/{EMPLOYEE}', headers={'If-None-Match': before.headers['ETag']}).status_code == 304
+
+    assert b.put(f'/profile/{EMPLOYEE}', json={"contactnumber": "555-0100"}).status_code == 200
+
+    after = a.get(f'/profile/{EMPLOYEE}', headers={'If-None-Match': before.headers['ETag']})
+    assert after.status_code == 200
+    assert after.get_json()['contactnumber'] == '555-0100'
+    assert after.headers['ETag'] != before.headers['ETag']
+
+
+def test_unchanged_profile_is_served_from_the_cache(workers):
+    a, _ = workers
+    first = a.get(f'/profile/{EMPLOYEE}')
+    second = a.get(f'/profile/{EMPLOYEE}')
+    assert second.get_data() == first.get_data()
+    assert 'profile_version' not in first.get_json()
+    assert a.application.extensions['profile_cache'].stats()['hits'] == 1
+
+
+def test_unknown_employee(workers):
+    assert workers[0].get('/profile/SSQ-0').status_code == 404
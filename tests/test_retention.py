@@ -0,0 +1,34 @@
+from datetime import date
+
+import db
+from retention import COUNTED_TABLES, get_retention
+
+
+def exact_counts(app):
+    with db.connection(app, readonly=True) as conn:
+        return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in COUNTED_TABLES}
+
+
+def test_stats_counters_follow_archive_moves(make_app, shipped_db):
+    app = make_app(shipped_db)
+    job = get_retention(app)
+    before = exact_counts(app)
+    assert job.stats()['rows'] == before
+
+    report = job.run_exclusive(today=date(2100, 1, 1))
+    assert report['attendance_records'] + report['notifications'] > 0
+    after = exact_counts(app)
+    assert job.stats()['rows'] == after
+    assert after['attendance_archive'] == before['attendance_archive'] + report['attendance_records']
+    assert after['notification_archive'] == before['notification_archive'] + report['notifications']
+
+
+def test_run_is_skipped_while_another_process_runs_it(make_app):
+    app = make_app()
+    job = get_retention(app)
+    with db.file_lock(app.config['DATABASE'] + '.retention-run') as held:
+        assert held
+        assert job.run_exclusive() is None
+        response = app.test_client().post('/admin/retention/run')
+        assert response.status_code == 409
+    assert job.run_exclusive() is not None
@@ -0,0 +1,98 @@
+import json
+
+import pytest
+from flask import Flask
+
+import storage
+
+# Values that differ between any two runs (fresh uuids, the current time,
+# cursors that encode either).
+VOLATILE = {'record_id', 'notification_id', 'login_time', 'logout_time', 'timestamp', 'updated_at', 'submitted_at',
+            'next_cursor', 'watermark'}
+# (STORAGE_BACKEND, STORAGE_URL); {other} is a second database file.
+TARGETS = [('sqlite', None), ('sqlalchemy', None), ('sqlalchemy', 'sqlite://'), ('sqlalchemy', 'sqlite:///{other}')]
+
+
+def storage_app(database, **config):
+    app = Flask(__name__)
+    app.config.update({'DATABASE': database, 'STORAGE_BACKEND': 'sqlalchemy', **config})
+    storage.init_app(app)
+    return app
+
+
+@pytest.mark.parametrize('url', ['sqlite:///{db}', 'sqlite+pysqlite:///{db}?timeout=5', None, '', 'sqlite://',
+                                 'sqlite:///{other}'])
+def test_storage_url_is_accepted(tmp_path, url):
+    database = str(tmp_path / 'hrms.db')
+    app = storage_app(database, STORAGE_URL=url and url.format(db=database, other=tmp_path / 'other.db'))
+    assert storage.separate_storage(app) == (url in ('sqlite://', 'sqlite:///{other}'))
+
+
+def test_unknown_backend_is_rejected_at_startup(tmp_path):
+    with pytest.raises(ValueError, match='Unknown STORAGE_BACKEND'):
+        storage_app(str(tmp_path / 'hrms.db'), STORAGE_BACKEND='mongodb')
+
+
+def normalized(value):
+    if isinstance(value, dict):
+        return {key: '<volatile>' if key in VOLATILE else normalized(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [normalized(item) for item in value]
+    return value
+
+
+def route_flows(client):
+    """Every response of a register / clock-in / leave / notifications session, in order."""
+    responses = []
+
+    def call(method, url, body=None):
+        response = client.open(url, method=method, json=body)
+        responses.append((response.status_code, normalized(response.get_json())))
+        return response.get_json()
+
+    employee_id = call('POST', '/register', {"first_name": "Asha", "last_name": "Rao", "email": "asha@example.com",
+                                             "password": "s3cret", "department": "software"})['id']
+    call('POST', '/register', {"first_name": "Asha", "last_name": "Rao", "email": "asha@example.com",
+                               "password": "other"})
+    call('POST', '/login', {"username": "asha@example.com", "password": "s3cret", "user_type": "employee"})
+    call('POST', '/login', {"username": "asha@example.com", "password": "wrong", "user_type": "employee"})
+    for date in ('2026-03-02', '2026-03-03'):
+        record = call('POST', '/attendance/login', {"employee_id": employee_id, "date": date,
+                                                    "work_location": "Office", "employee_name": "Asha"})['record']
+        call('PUT', f"/attendance/logout/{record['record_id']}")
+    call('PUT', f"/attendance/logout/{record['record_id']}")
+    call('GET', f'/attendance/{employee_id}')
+    page = call('GET', f'/attendance/{employee_id}?limit=1')
+    call('GET', f"/attendance/{employee_id}?limit=1&after={page['next_cursor']}")
+    call('POST', '/leave-application', {"employee_id": employee_id, "leave_type": "Sick Leave",
+                                        "from_date": "2026-03-09", "to_date": "2026-03-11", "description": "Flu"})
+    call('POST', '/leave-application', {"employee_id": employee_id, "leave_type": "Casual Leave",
+                                        "from_date": "2026-03-11", "to_date": "2026-03-12", "description": "Trip"})
+    call('POST', '/leave-application', {"employee_id": employee_id, "leave_type": "Casual Leave",
+                                        "from_date": "2026-03-16", "to_date": "2026-03-16", "description": "Trip"})
+    call('GET', f'/leave-applications/{employee_id}')
+    page = call('GET', f'/leave-applications/{employee_id}?limit=1')
+    call('GET', f"/leave-applications/{employee_id}?limit=1&after={page['next_cursor']}")
+    call('GET', f'/leave-calendar/working-days?employee_id={employee_id}&from_date=2026-03-09&to_date=2026-03-13')
+    call('GET', '/team-availability?department=software&date=2026-03-10')
+    call('GET', '/admin/reports/attendance/2026-03')
+    call('GET', '/admin/reports/attendance/2026-03/software')
+    call('GET', f'/notifications/{employee_id}')
+    page = call('GET', f'/notifications/{employee_id}?limit=1')
+    call('GET', f"/notifications/{employee_id}?limit=1&after={page['next_cursor']}")
+    call('GET', f"/notifications/{employee_id}?since={page['watermark']}")
+    call('GET', f'/notifications/unread-count/{employee_id}')
+    call('PUT', f'/notifications/mark-read/{employee_id}')
+    call('GET', f'/notifications/unread-count/{employee_id}')
+    return responses
+
+
+def test_storage_backends_answer_the_route_flows_alike(make_app, tmp_path):
+    results = []
+    for n, (backend, url) in enumerate(TARGETS):
+        app = make_app(str(tmp_path / f'{n}.db'), STORAGE_BACKEND=backend,
+                       STORAGE_URL=url and url.format(other=tmp_path / f'{n}-storage.db'))
+        results.append(route_flows(app.test_client()))
+    assert [status for status, _ in results[0]].count(409) == 2
+    for result in results[1:]:
+        assert result == results[0]
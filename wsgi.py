@@ -0,0 +1,13 @@
+"""WSGI entry point: ``gunicorn wsgi:app`` (settings in gunicorn.conf.py).
+
+The environment, including a .env file, is read once here. With
+preload_app the master builds the app, running any pending migrations,
+and the workers inherit it when they fork.
+"""
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app import create_app  # noqa: E402
+
+app = create_app()